@@ -1,19 +1,38 @@
 from dotenv import load_dotenv
 load_dotenv()
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, status
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Query, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, EmailStr, validator
 from sqlalchemy import create_engine, Column, Integer, String, DateTime
 from sqlalchemy.orm import declarative_base, sessionmaker, Session
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
-from typing import Optional, List, Set
+from typing import Callable, Dict, Optional, List, Set
 
 # ✅ KEEP: Import services (now actually used)
 from services.pdf_service import extract_text_from_pdf
 from services.qwen_service import extract_skills_with_qwen
 from services.skill_service import post_process_skills
+from services.embedding_store import EmbeddingStore, load_embedding_store, load_embedding_matrix
+from services.mutable_store import load_logged_store
+from services.embedding_cache import EmbeddingCache, canonical_skill_key
+from services.skill_vectors import compose_skill_set_vector
+from services.vector_index import load_vector_index
+from services.reduced_index import top_k_indices
+from services.attribute_filter import AttributeBitmaps
+from services.set_cover import greedy_weighted_cover
+from services.fuzzy_skills import TrigramSkillResolver
+from services.skill_matrix import SkillSetIndex, pairwise_matched_counts, popcount_rows
+from services.encoder_service import (
+    LazyEncoder, EncoderNotReadyError, EMBEDDING_MODEL_NAME, load_embedding_model
+)
+from services.embedding_manifest import manifest_hash, manifest_path, validate_manifest
+from services.embedding_texts import build_job_text, build_course_text, build_cv_text
+from services.skill_taxonomy import (
+    SkillTaxonomy, get_taxonomy, set_taxonomy, load_taxonomy
+)
 
 import json
 import numpy as np
@@ -24,8 +43,6 @@ import logging
 import hashlib
 import jwt
 import re
-from sklearn.metrics.pairwise import cosine_similarity
-from sentence_transformers import SentenceTransformer
 
 # ==================================================
 # LOGGING
@@ -42,6 +59,59 @@ logger = logging.getLogger(__name__)
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))
+# "model": encode cả tập skills bằng bge-m3 | "compose": pool từ bảng vector từng skill
+SKILL_VECTOR_MODE = os.getenv("SKILL_VECTOR_MODE", "model").lower()
+# Micro-batching encoder: gom các lời gọi encode đồng thời thành một batch
+ENCODER_MAX_BATCH = int(os.getenv("ENCODER_MAX_BATCH", "32"))
+ENCODER_MAX_WAIT_MS = float(os.getenv("ENCODER_MAX_WAIT_MS", "5"))
+TORCH_NUM_THREADS = int(os.getenv("TORCH_NUM_THREADS", "0")) or None
+# "torch" (SentenceTransformer) | "onnx" (ONNX Runtime, xem scripts/export_onnx.py)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+# Định dạng matrix trên đĩa: "float32" | "float16" | "int8" (scripts/compact_embeddings.py)
+EMBEDDING_STORAGE = os.getenv("EMBEDDING_STORAGE", "float32").lower()
+# mmap → nhiều uvicorn worker dùng chung page cache thay vì mỗi process một bản copy
+EMBEDDING_MMAP = os.getenv("EMBEDDING_MMAP", "1") != "0"
+# Vector index cho top-k: "auto" (hnsw → ivf → pca, file đầu tiên dùng được; không có
+# thì exact, có log cảnh báo) | "exact" | "pca" | "ivf" | "hnsw" — file index được
+# build bởi scripts/embed.py (ANN_INDEX, mặc định ivf) hoặc scripts/build_vector_index.py
+VECTOR_INDEX = os.getenv("VECTOR_INDEX", "auto").lower()
+VECTOR_INDEX_NPROBE = int(os.getenv("VECTOR_INDEX_NPROBE", "8"))
+VECTOR_INDEX_EF = int(os.getenv("VECTOR_INDEX_EF", "64"))
+# pca: quét COURSE_INDEX_DIMS chiều rồi rerank chính xác COURSE_INDEX_CANDIDATES row
+COURSE_INDEX_DIMS = int(os.getenv("COURSE_INDEX_DIMS", "256"))
+COURSE_INDEX_CANDIDATES = int(os.getenv("COURSE_INDEX_CANDIDATES", "100"))
+# Xếp hạng job cho một CV: score = w * semantic + (1 - w) * skill coverage,
+# chỉ chấm điểm đầy đủ trên JOB_RANK_CANDIDATES job (top semantic ∪ top coverage)
+JOB_RANK_SEMANTIC_WEIGHT = float(os.getenv("JOB_RANK_SEMANTIC_WEIGHT", "0.5"))
+JOB_RANK_CANDIDATES = int(os.getenv("JOB_RANK_CANDIDATES", "200"))
+# Xếp hạng CV mẫu cho một job: score = w * semantic (cv_emb) + (1 - w) * skill coverage
+CV_RANK_SEMANTIC_WEIGHT = float(os.getenv("CV_RANK_SEMANTIC_WEIGHT", "0.5"))
+# Gợi ý course: ứng viên = course dạy skill cần học (inverted index, tối đa
+# COURSE_LEXICAL_CANDIDATES) ∪ top COURSE_ANN_CANDIDATES theo vector index,
+# rerank bằng w * semantic + (1 - w) * tỉ lệ skill cần học mà course dạy
+COURSE_RANK_SEMANTIC_WEIGHT = float(os.getenv("COURSE_RANK_SEMANTIC_WEIGHT", "0.7"))
+COURSE_LEXICAL_CANDIDATES = int(os.getenv("COURSE_LEXICAL_CANDIDATES", "200"))
+COURSE_ANN_CANDIDATES = int(os.getenv("COURSE_ANN_CANDIDATES", "50"))
+# course_mode="cover": greedy weighted set cover trên inverted index skill → course,
+# trọng số = (COURSE_COVER_MIN_RELEVANCE + cosine) × rating × level, dừng sau
+# COURSE_COVER_BUDGET_MS hoặc COURSE_COVER_MAX_COURSES course
+COURSE_COVER_BUDGET_MS = float(os.getenv("COURSE_COVER_BUDGET_MS", "20"))
+COURSE_COVER_MAX_COURSES = int(os.getenv("COURSE_COVER_MAX_COURSES", "10"))
+COURSE_COVER_MIN_RELEVANCE = 0.1
+# Rating của course chưa có rating, dùng chung cho filter min_rating và set cover
+COURSE_DEFAULT_RATING = float(os.getenv("COURSE_DEFAULT_RATING", "4.0"))
+# Người học đang thiếu skill → ưu tiên course nhập môn hơn
+COURSE_LEVEL_WEIGHTS = {"beginner": 1.0, "intermediate": 0.9, "advanced": 0.8}
+# Số job_id / cv_id tối đa trong một request batch matching
+BATCH_MATCH_MAX_IDS = int(os.getenv("BATCH_MATCH_MAX_IDS", "1000"))
+# Skill LLM ngoài taxonomy/catalog được map về skill đã biết nếu độ giống
+# trigram (Dice) ≥ ngưỡng này, không thì báo trong skills_by_source["unresolved"]
+SKILL_FUZZY_THRESHOLD = float(os.getenv("SKILL_FUZZY_THRESHOLD", "0.7"))
+# Email được gọi các endpoint /admin (phân cách bởi dấu phẩy)
+ADMIN_EMAILS = {e.strip().lower() for e in os.getenv("ADMIN_EMAILS", "").split(",") if e.strip()}
+# "0": worker không load bge-m3 (chỉ phục vụ catalog/auth + SKILL_VECTOR_MODE=compose)
+LOAD_EMBEDDING_MODEL = os.getenv("LOAD_EMBEDDING_MODEL", "1") != "0"
 
 # ==================================================
 # APP
@@ -155,6 +225,11 @@ def get_current_user(
     
     return user
 
+def get_admin_user(current_user: User = Depends(get_current_user)):
+    if current_user.email.lower() not in ADMIN_EMAILS:
+        raise HTTPException(status_code=403, detail="Không có quyền admin")
+    return current_user
+
 # ==================================================
 # PATHS
 # ==================================================
@@ -162,6 +237,7 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 DATA_DIR = os.path.join(BASE_DIR, "data")
 EMB_DIR = os.path.join(BASE_DIR, "embeddings")
+META_DIR = os.path.join(BASE_DIR, "metadata")
 UPLOAD_DIR = os.path.join(BASE_DIR, "uploads")
 
 for directory in [DATA_DIR, EMB_DIR, UPLOAD_DIR]:
@@ -179,170 +255,143 @@ JOB_EMB_FILE = os.path.join(EMB_DIR, "job_embeddings.npy")
 COURSE_EMB_FILE = os.path.join(EMB_DIR, "course_embeddings.npy")
 CV_EMB_FILE = os.path.join(EMB_DIR, "cv_embeddings.npy")
 USER_CV_EMB_FILE = os.path.join(EMB_DIR, "user_cv_embeddings.npy")
+SKILL_EMB_FILE = os.path.join(EMB_DIR, "skill_embeddings.npy")
+
+JOB_META_FILE = os.path.join(META_DIR, "job_metadata.json")
+SKILL_META_FILE = os.path.join(META_DIR, "skill_metadata.json")
 
 # ==================================================
-# LOAD MODELS
+# LOAD MODELS (BACKGROUND)
 # ==================================================
-logger.info("🔧 Loading embedding model: BAAI/bge-m3")
-try:
-    model = SentenceTransformer("BAAI/bge-m3")
+def load_model():
+    logger.info(f"🔧 Loading embedding model: BAAI/bge-m3 ({EMBEDDING_BACKEND})")
+    # Import torch/onnxruntime nằm trong load_embedding_model (mất vài giây)
+    model = load_embedding_model(EMBEDDING_BACKEND, num_threads=TORCH_NUM_THREADS)
     logger.info("✔ Embedding model loaded successfully")
-except Exception as e:
-    logger.error(f"❌ Failed to load embedding model: {e}")
-    raise
+    return model
+
+# Model được load trong background sau khi app start → /jobs, /login, /health
+# phục vụ ngay; mọi request encode đi qua encoder này (503 cho tới khi ready)
+encoder = LazyEncoder(
+    load_model,
+    max_batch_size=ENCODER_MAX_BATCH,
+    max_wait_ms=ENCODER_MAX_WAIT_MS
+)
+
+@app.on_event("startup")
+def start_encoder():
+    if LOAD_EMBEDDING_MODEL:
+        encoder.start()
+    else:
+        encoder.state = "disabled"
+        logger.info("⏭️ Embedding model disabled (LOAD_EMBEDDING_MODEL=0)")
+
+@app.on_event("shutdown")
+def shutdown_encoder():
+    encoder.close()
+
+@app.exception_handler(EncoderNotReadyError)
+async def encoder_not_ready_handler(request, exc: EncoderNotReadyError):
+    return JSONResponse(
+        status_code=503,
+        content={
+            "detail": "Embedding model chưa sẵn sàng, vui lòng thử lại sau",
+            "model_state": encoder.state
+        },
+        headers={"Retry-After": "10"}
+    )
+
+def embeddings_ready() -> bool:
+    """Có thể tạo vector cho tập skills không (model ready hoặc compose từ bảng skill)"""
+    if encoder.ready:
+        return True
+    return SKILL_VECTOR_MODE == "compose" and skill_table is not None
+
+def require_embeddings():
+    """Trả 503 sớm cho endpoint cần embedding khi model chưa sẵn sàng"""
+    if not embeddings_ready():
+        raise EncoderNotReadyError(f"Embedding model is {encoder.state}")
 
 # ==================================================
-# SKILL DATABASE & NORMALIZATION
+# QUERY EMBEDDING CACHE
 # ==================================================
+skill_set_cache = EmbeddingCache(max_size=EMBEDDING_CACHE_SIZE)
+
+def encode_skills_individually(skills: List[str]) -> np.ndarray:
+    """Encode từng skill riêng lẻ (dùng cho skill ngoài bảng vector), có cache; skill chưa có được encode chung một lần"""
+    vectors = [skill_set_cache.get((s,)) for s in skills]
+    missing = [n for n, vec in enumerate(vectors) if vec is None]
+    if missing:
+        encoded = encoder.encode([skills[n] for n in missing], normalize_embeddings=True)
+        for n, vec in zip(missing, encoded):
+            vectors[n] = skill_set_cache.put((skills[n],), vec)
+    return np.vstack(vectors)
+
+def encode_skill_set(skills) -> np.ndarray:
+    """Encode một tập skills, cache theo tập đã chuẩn hóa (không phụ thuộc thứ tự)"""
+    key = canonical_skill_key(skills)
+
+    if SKILL_VECTOR_MODE == "compose" and skill_table is not None:
+        # Model chưa sẵn sàng → bỏ qua skill ngoài bảng thay vì trả 503
+        vec = compose_skill_set_vector(
+            skill_table, key,
+            encode_oov=encode_skills_individually if encoder.ready else None
+        )
+        if vec is not None:
+            return vec
 
-# Technical Skills Database
-TECHNICAL_SKILLS = {
-    # Programming Languages
-    "python", "java", "javascript", "typescript", "c++", "cpp", "c#", "csharp",
-    "php", "ruby", "go", "golang", "rust", "kotlin", "swift", "r", "scala",
-    "perl", "bash", "shell", "powershell", "matlab", "vba",
-    
-    # Web Development
-    "html", "html5", "css", "css3", "sass", "scss", "less",
-    "react", "reactjs", "react.js", "angular", "vue", "vuejs", "vue.js",
-    "nodejs", "node.js", "express", "expressjs", "nestjs",
-    "django", "flask", "fastapi", "spring", "spring boot",
-    "laravel", "symfony", "rails", "ruby on rails", "asp.net",
-    "next.js", "nextjs", "nuxt.js", "gatsby", "svelte",
-    "jquery", "bootstrap", "tailwind", "webpack", "vite",
-    
-    # Mobile Development
-    "android", "ios", "react native", "flutter", "xamarin", "ionic",
-    "swift", "kotlin", "objective-c", "cordova",
-    
-    # Databases
-    "sql", "mysql", "postgresql", "postgres", "mongodb", "redis",
-    "oracle", "sql server", "mariadb", "sqlite", "cassandra",
-    "dynamodb", "elasticsearch", "neo4j", "couchdb", "firebase",
-    "nosql", "database", "db2",
-    
-    # Data Science & AI/ML
-    "machine learning", "ml", "deep learning", "artificial intelligence", "ai",
-    "nlp", "natural language processing", "computer vision", "cv",
-    "tensorflow", "pytorch", "keras", "scikit-learn", "sklearn",
-    "pandas", "numpy", "matplotlib", "seaborn", "plotly", "jupyter",
-    "data analysis", "data science", "statistics", "statistical analysis",
-    "data mining", "data visualization", "big data", "spark", "hadoop",
-    "r programming", "sas", "spss",
-    
-    # Cloud & DevOps
-    "aws", "amazon web services", "azure", "microsoft azure", "gcp", "google cloud",
-    "docker", "kubernetes", "k8s", "jenkins", "gitlab", "github actions",
-    "terraform", "ansible", "puppet", "chef", "vagrant",
-    "ci/cd", "cicd", "devops", "linux", "unix", "windows server",
-    "nginx", "apache", "tomcat", "heroku", "digitalocean",
-    
-    # Business & Analytics Tools
-    "excel", "microsoft excel", "power bi", "powerbi", "tableau",
-    "google analytics", "seo", "sem", "digital marketing",
-    "business intelligence", "bi", "data visualization",
-    "looker", "qlik", "sap", "erp", "crm", "salesforce",
-    
-    # Design & Multimedia
-    "photoshop", "adobe photoshop", "illustrator", "figma", "sketch",
-    "adobe xd", "indesign", "premiere pro", "after effects",
-    "ui", "ux", "ui/ux", "user interface", "user experience",
-    "graphic design", "web design", "video editing",
-    
-    # Version Control & Collaboration
-    "git", "github", "gitlab", "bitbucket", "svn", "mercurial",
-    "jira", "confluence", "trello", "asana", "slack", "teams",
-    
-    # APIs & Architecture
-    "rest", "restful", "rest api", "graphql", "soap", "microservices",
-    "api", "api development", "webhooks", "grpc",
-    
-    # Testing & QA
-    "testing", "unit testing", "integration testing", "e2e testing",
-    "jest", "pytest", "selenium", "cypress", "junit",
-    "test automation", "qa", "quality assurance",
-    
-    # Security
-    "security", "cybersecurity", "encryption", "authentication",
-    "oauth", "jwt", "ssl", "tls", "penetration testing",
-    
-    # Other Technical
-    "blockchain", "cryptocurrency", "iot", "embedded systems",
-    "robotics", "ar", "vr", "augmented reality", "virtual reality",
-}
-
-# Soft Skills Database
-SOFT_SKILLS = {
-    "communication", "teamwork", "team work", "leadership", "problem solving",
-    "critical thinking", "creativity", "time management", "project management",
-    "collaboration", "adaptability", "flexibility", "attention to detail",
-    "analytical", "organizational", "presentation", "negotiation",
-    "conflict resolution", "decision making", "emotional intelligence",
-    "work ethic", "interpersonal", "multitasking", "planning",
-    "strategic thinking", "initiative", "self-motivated", "customer service",
-}
-
-# Methodologies
-METHODOLOGIES = {
-    "agile", "scrum", "kanban", "waterfall", "lean", "six sigma",
-    "devops", "design thinking", "tdd", "bdd", "continuous integration",
-}
-
-# All Skills Combined
-ALL_SKILLS = TECHNICAL_SKILLS | SOFT_SKILLS | METHODOLOGIES
-
-# Skill Normalization Map
-SKILL_NORMALIZATION = {
-    "powerbi": "power bi",
-    "power-bi": "power bi",
-    "ml": "machine learning",
-    "ai": "artificial intelligence",
-    "js": "javascript",
-    "ts": "typescript",
-    "k8s": "kubernetes",
-    "ci/cd": "cicd",
-    "cicd": "ci/cd",
-    "bi": "business intelligence",
-    "vue.js": "vue",
-    "node.js": "nodejs",
-    "nodejs": "node.js",
-    "react.js": "react",
-    "reactjs": "react",
-    "c++": "cpp",
-    "c#": "csharp",
-    "ui/ux": "ui ux",
-}
-
-def normalize_skill(skill: str) -> str:
-    """Chuẩn hóa skill về dạng chính thức"""
-    skill_lower = skill.lower().strip()
-    return SKILL_NORMALIZATION.get(skill_lower, skill_lower)
-
-def normalize_skill_list(skills: list) -> set:
-    """Chuẩn hóa danh sách skills thành set"""
-    return set(normalize_skill(s.strip()) for s in skills if s and isinstance(s, str))
+    return skill_set_cache.get_or_compute(
+        key, lambda: encoder.encode(" ".join(key), normalize_embeddings=True)
+    )
+
+def encode_skill_sets(skill_sets: List[Set[str]]) -> np.ndarray:
+    """
+    Vector của nhiều tập skills (cùng kết quả với encode_skill_set từng tập),
+    nhưng mọi tập / skill chưa có trong cache được encode chung một lần
+    """
+    keys = [canonical_skill_key(skills) for skills in skill_sets]
+    vectors = [None] * len(keys)
+
+    if SKILL_VECTOR_MODE == "compose" and skill_table is not None:
+        encode_oov = encode_skills_individually if encoder.ready else None
+        if encode_oov is not None:
+            # Skill ngoài bảng của mọi tập vào cache trước → compose từng tập chỉ đọc cache
+            oov = sorted({s for key in keys for s in key if s not in skill_table})
+            if oov:
+                encode_oov(oov)
+        for n, key in enumerate(keys):
+            vectors[n] = compose_skill_set_vector(skill_table, key, encode_oov=encode_oov)
+
+    missing: Dict[tuple, List[int]] = {}
+    for n, key in enumerate(keys):
+        if vectors[n] is None:
+            vectors[n] = skill_set_cache.get(key)
+            if vectors[n] is None:
+                missing.setdefault(key, []).append(n)
+    if missing:
+        encoded = encoder.encode([" ".join(key) for key in missing], normalize_embeddings=True)
+        for key, vec in zip(missing, encoded):
+            vec = skill_set_cache.put(key, vec)
+            for n in missing[key]:
+                vectors[n] = vec
+    return np.vstack(vectors).astype(np.float32)
 
 # ==================================================
 # 🎯 RULE-BASED SKILL EXTRACTION HELPERS
 # ==================================================
+# Taxonomy được compile sẵn thành matcher (skill_snapshot.taxonomy.matcher) → mỗi CV chỉ
+# quét text một lượt thay vì một regex \b<skill>\b cho từng skill
 
 def extract_skills_keyword_matching(text: str) -> Set[str]:
     """Trích xuất skills bằng keyword matching"""
-    text_lower = text.lower()
-    found_skills = set()
-    
-    for skill in ALL_SKILLS:
-        pattern = r'\b' + re.escape(skill) + r'\b'
-        if re.search(pattern, text_lower):
-            normalized_skill = normalize_skill(skill)
-            found_skills.add(normalized_skill)
-    
-    return found_skills
+    taxonomy = skill_snapshot.taxonomy
+    return {taxonomy.normalize(skill) for skill in taxonomy.matcher.find(text.lower())}
 
 
 def extract_skills_section_parsing(text: str) -> Set[str]:
     """Trích xuất skills từ section 'Skills' trong CV"""
     found_skills = set()
+    taxonomy = skill_snapshot.taxonomy
     
     section_patterns = [
         r'(?i)(?:^|\n)(?:technical\s+)?skills?\s*:?\s*\n(.*?)(?=\n(?:[A-Z][^:]*:|$))',
@@ -365,31 +414,32 @@ def extract_skills_section_parsing(text: str) -> Set[str]:
                     continue
                 
                 item_lower = item.lower()
-                normalized = normalize_skill(item_lower)
+                normalized = taxonomy.normalize(item_lower)
                 
-                if normalized in ALL_SKILLS or item_lower in ALL_SKILLS:
+                if normalized in taxonomy.all_skills or item_lower in taxonomy.all_skills:
                     found_skills.add(normalized)
     
     return found_skills
 
 
+# Câu ngữ cảnh ("experience with ...", "tools: ...") được compile sẵn lúc load
+SKILL_CONTEXT_PATTERNS = [
+    re.compile(r'(?i)(?:experience|proficient|skilled|knowledge|expertise|familiar)\s+(?:with|in)\s+([^.;:\n]+)'),
+    re.compile(r'(?i)(?:technologies|tools|languages)\s*:?\s*([^.;:\n]+)'),
+    re.compile(r'(?i)(?:strong|good|excellent)\s+(?:knowledge|understanding)\s+of\s+([^.;:\n]+)'),
+    re.compile(r'(?i)(?:working\s+)?(?:knowledge|experience)\s+(?:of|in|with)\s+([^.;:\n]+)'),
+]
+SKILL_LIST_SEPARATORS = re.compile(r'[,;&]')
+
 def extract_skills_regex_patterns(text: str) -> Set[str]:
     """Trích xuất skills bằng regex patterns"""
     found_skills = set()
+    taxonomy = skill_snapshot.taxonomy
     
-    context_patterns = [
-        r'(?i)(?:experience|proficient|skilled|knowledge|expertise|familiar)\s+(?:with|in)\s+([^.;:\n]+)',
-        r'(?i)(?:technologies|tools|languages)\s*:?\s*([^.;:\n]+)',
-        r'(?i)(?:strong|good|excellent)\s+(?:knowledge|understanding)\s+of\s+([^.;:\n]+)',
-        r'(?i)(?:working\s+)?(?:knowledge|experience)\s+(?:of|in|with)\s+([^.;:\n]+)',
-    ]
-    
-    for pattern in context_patterns:
-        matches = re.finditer(pattern, text)
-        
-        for match in matches:
+    for pattern in SKILL_CONTEXT_PATTERNS:
+        for match in pattern.finditer(text):
             skills_text = match.group(1)
-            potential_skills = re.split(r'[,;&]', skills_text)
+            potential_skills = SKILL_LIST_SEPARATORS.split(skills_text)
             
             for item in potential_skills:
                 item = item.strip().lower()
@@ -397,10 +447,9 @@ def extract_skills_regex_patterns(text: str) -> Set[str]:
                 if not item or len(item) < 2:
                     continue
                 
-                for skill in ALL_SKILLS:
-                    if skill in item:
-                        normalized = normalize_skill(skill)
-                        found_skills.add(normalized)
+                # Tra n-gram token trong taxonomy → "r" không khớp bên trong "react"
+                for skill in taxonomy.matcher.lookup(item):
+                    found_skills.add(taxonomy.normalize(skill))
     
     return found_skills
 
@@ -409,6 +458,32 @@ def extract_skills_regex_patterns(text: str) -> Set[str]:
 # 🚀 HYBRID SKILL EXTRACTION (LLM + RULES)
 # ==================================================
 
+def resolve_llm_skills(raw_skills: list) -> dict:
+    """
+    Chuẩn hóa skill từ LLM; chuỗi ngoài taxonomy / catalog ("java script",
+    "Postgre SQL", "ReactJS 18") được map về skill đã biết bằng trigram.
+    Chuỗi không map được vẫn giữ lại và được trả về trong "unresolved".
+    """
+    # Taxonomy và resolver lấy từ cùng một snapshot (reload không xen giữa được)
+    snap = skill_snapshot
+    taxonomy, resolver = snap.taxonomy, snap.resolver
+    skills, fuzzy, unresolved = set(), {}, set()
+    for raw in raw_skills:
+        if not raw or not isinstance(raw, str):
+            continue
+        name = taxonomy.normalize(raw)
+        if not name:
+            continue
+        if name not in resolver:
+            match = resolver.resolve(raw)
+            if match is None:
+                unresolved.add(raw.strip())
+            else:
+                fuzzy[raw.strip()] = match
+                name = match
+        skills.add(name)
+    return {"skills": skills, "fuzzy": fuzzy, "unresolved": sorted(unresolved)}
+
 def extract_skills_hybrid(pdf_path: str) -> dict:
     """
     🎯 HYBRID SKILL EXTRACTION PIPELINE
@@ -436,15 +511,21 @@ def extract_skills_hybrid(pdf_path: str) -> dict:
     
     # ===== STEP 2: LLM Extraction (Qwen) =====
     skills_llm = set()
+    llm_fuzzy, llm_unresolved = {}, []
     llm_success = False
     
     logger.info("🤖 Extracting skills with Qwen LLM...")
     try:
         llm_result = extract_skills_with_qwen(text)
         raw_llm_skills = llm_result.get("skills", [])
-        skills_llm = set(normalize_skill(s) for s in raw_llm_skills if s)
+        resolved = resolve_llm_skills(raw_llm_skills)
+        skills_llm = resolved["skills"]
+        llm_fuzzy, llm_unresolved = resolved["fuzzy"], resolved["unresolved"]
         llm_success = True
-        logger.info(f"✅ Qwen extracted {len(skills_llm)} skills")
+        logger.info(
+            f"✅ Qwen extracted {len(skills_llm)} skills "
+            f"({len(llm_fuzzy)} fuzzy-resolved, {len(llm_unresolved)} unresolved)"
+        )
     except Exception as e:
         logger.warning(f"⚠️ Qwen extraction failed: {e}")
         logger.info("📋 Falling back to rule-based extraction only")
@@ -487,6 +568,8 @@ def extract_skills_hybrid(pdf_path: str) -> dict:
         "from_keyword": len(skills_keyword),
         "from_section": len(skills_section),
         "from_regex": len(skills_regex),
+        "llm_fuzzy_resolved": len(llm_fuzzy),
+        "llm_unresolved": len(llm_unresolved),
         "text_length": len(text),
         "llm_success": llm_success,
         "extraction_method": "hybrid-llm-rules" if llm_success else "rules-only"
@@ -503,7 +586,10 @@ def extract_skills_hybrid(pdf_path: str) -> dict:
             "rules": sorted(list(skills_rules)),
             "keyword": sorted(list(skills_keyword)),
             "section": sorted(list(skills_section)),
-            "regex": sorted(list(skills_regex))
+            "regex": sorted(list(skills_regex)),
+            # Chuỗi LLM → skill đã biết (trigram) và chuỗi chưa có trong taxonomy
+            "llm_fuzzy": llm_fuzzy,
+            "unresolved": llm_unresolved
         }
     }
 
@@ -539,13 +625,282 @@ courses = load_json(COURSES_FILE)
 demo_cvs = load_json(CVS_FILE)
 user_cvs = load_json(USER_CVS_FILE)
 
-job_emb = np.load(JOB_EMB_FILE) if os.path.exists(JOB_EMB_FILE) else None
-course_emb = np.load(COURSE_EMB_FILE) if os.path.exists(COURSE_EMB_FILE) else None
-cv_emb = np.load(CV_EMB_FILE) if os.path.exists(CV_EMB_FILE) else None
-user_cv_emb = np.load(USER_CV_EMB_FILE) if os.path.exists(USER_CV_EMB_FILE) else None
+# Tra cứu O(1) theo id thay vì quét list mỗi request
+job_by_id = {j["job_id"]: j for j in jobs}
+course_by_id = {c.get("course_id"): c for c in courses}
+demo_cv_by_id = {c.get("cv_id"): c for c in demo_cvs}
+
+# Hash manifest của từng matrix: bản compact / index build từ matrix cũ bị bỏ qua
+emb_source_hash = {kind: manifest_hash(manifest_path(META_DIR, kind)) for kind in ("job", "course", "cv")}
+
+# Job vectors được build sẵn bởi scripts/embed.py, tra cứu theo job_id
+job_store = load_embedding_store(
+    JOB_EMB_FILE, JOB_META_FILE, "job_id",
+    storage=EMBEDDING_STORAGE, mmap=EMBEDDING_MMAP, source_hash=emb_source_hash["job"]
+)
+job_index = load_vector_index(
+    JOB_EMB_FILE, job_store.matrix, VECTOR_INDEX,
+    nprobe=VECTOR_INDEX_NPROBE, ef=VECTOR_INDEX_EF, source_hash=emb_source_hash["job"]
+) if job_store is not None else None
+# Course/CV matrix chỉ đọc → mở dạng compact + mmap (course_emb.scores(q) = matrix @ q)
+course_emb = load_embedding_matrix(COURSE_EMB_FILE, EMBEDDING_STORAGE, EMBEDDING_MMAP, emb_source_hash["course"])
+cv_emb = load_embedding_matrix(CV_EMB_FILE, EMBEDDING_STORAGE, EMBEDDING_MMAP, emb_source_hash["cv"])
+course_index = load_vector_index(
+    COURSE_EMB_FILE, course_emb, VECTOR_INDEX,
+    dims=COURSE_INDEX_DIMS, candidates=COURSE_INDEX_CANDIDATES,
+    nprobe=VECTOR_INDEX_NPROBE, ef=VECTOR_INDEX_EF, source_hash=emb_source_hash["course"]
+)
+
+# Matrix lệch với data (thiếu/thừa/đảo row, khác model) → EmbeddingManifestError,
+# server từ chối khởi động thay vì âm thầm trả vector sai record
+for emb_path, matrix, kind, records, id_field, build_text in [
+    (JOB_EMB_FILE, job_store, "job", jobs, "job_id", build_job_text),
+    (COURSE_EMB_FILE, course_emb, "course", courses, "course_id", build_course_text),
+    (CV_EMB_FILE, cv_emb, "cv", demo_cvs, "cv_id", build_cv_text),
+]:
+    if matrix is not None:
+        validate_manifest(
+            emb_path,
+            len(matrix),
+            manifest_path(META_DIR, kind),
+            [r.get(id_field) for r in records],
+            EMBEDDING_MODEL_NAME,
+            texts=[build_text(r) for r in records]
+        )
+# Row của course matrix → course_id (đã được manifest xác nhận khớp thứ tự courses.json)
+course_store = (
+    EmbeddingStore([c.get("course_id") for c in courses], course_emb)
+    if course_emb is not None and len(course_emb) == len(courses) else None
+)
+
+# User CV vectors: snapshot (.npz: cv_id + vector) + log append-only (.log).
+# Upload/xóa chỉ append 1 record vào log → chi phí không tăng theo số CV đã lưu;
+# checkpoint nền gộp log vào snapshot. File .npy cũ chỉ được nhận nếu số row khớp;
+# CV chưa có vector được encode lại (backfill khi model ready, hoặc lúc match)
+user_cv_store = load_logged_store(
+    USER_CV_EMB_FILE,
+    legacy_ids=[cv.get("cv_id") for cv in user_cvs],
+    checkpoint_every=int(os.getenv("USER_CV_CHECKPOINT_EVERY", "256"))
+)
+
+@app.on_event("shutdown")
+def checkpoint_user_cv_store():
+    if user_cv_store.log_records:
+        user_cv_store.checkpoint()
+
+def user_cv_vectors(cvs: List[dict], skill_sets: List[Set[str]]) -> np.ndarray:
+    """
+    Vector của CV user, lấy từ user_cv_store theo cv_id. CV chưa có vector được
+    encode chung một lần; chỉ ghi vào store khi model ready (vector compose khi
+    model chưa load thiếu skill ngoài bảng)
+    """
+    vectors = [user_cv_store.get(cv["cv_id"]) for cv in cvs]
+    missing = [n for n, vec in enumerate(vectors) if vec is None]
+    if missing:
+        require_embeddings()
+        store = encoder.ready
+        encoded = encode_skill_sets([skill_sets[n] for n in missing])
+        for n, vec in zip(missing, encoded):
+            vectors[n] = vec
+            if store:
+                user_cv_store.put(cvs[n]["cv_id"], vec)
+    return np.vstack(vectors).astype(np.float32)
+
+def user_cvs_without_vector() -> List[dict]:
+    return [cv for cv in user_cvs if cv.get("cv_id") and cv["cv_id"] not in user_cv_store]
+
+def backfill_user_cv_vectors():
+    """Encode các CV user chưa có vector (vd. .npy cũ lệch số row với user_cvs.json)"""
+    pending = user_cvs_without_vector()
+    if not pending:
+        return
+    normalize = skill_snapshot.taxonomy.normalize_list
+    user_cv_vectors(pending, [normalize(cv.get("skills", [])) for cv in pending])
+    logger.info(f"✅ Backfilled {len(pending)} user CV vectors")
+
+@app.on_event("startup")
+def schedule_user_cv_backfill():
+    pending = len(user_cvs_without_vector())
+    if pending:
+        logger.warning(
+            f"⚠️ {pending} user CVs have no stored vector, "
+            "re-encoding once the embedding model is ready"
+        )
+        encoder.on_ready(backfill_user_cv_vectors)
+
+# Skill của job / CV mẫu / course được chuẩn hóa một lần lúc load, lưu dạng bitset
+# trên cùng một bộ skill id → coverage của 1 CV với mọi job (hoặc mọi CV với 1 job)
+# là một phép & + popcount thay vì chuẩn hóa + set ∩ mỗi request.
+# Skill id = id của taxonomy (taxonomy.vocab), dùng chung cho mọi catalog
+def build_skill_indexes(taxonomy: SkillTaxonomy):
+    """(job, CV mẫu, course) SkillSetIndex theo một taxonomy"""
+    vocab = taxonomy.vocab
+    normalize = taxonomy.normalize_list
+    return (
+        SkillSetIndex([
+            normalize(j.get("requirements", {}).get("skills_required", [])) for j in jobs
+        ], vocab),
+        SkillSetIndex([normalize(c.get("skills", [])) for c in demo_cvs], vocab),
+        SkillSetIndex([normalize(c.get("skills_outcomes", [])) for c in courses], vocab),
+    )
+
+def build_skill_resolver(taxonomy: SkillTaxonomy) -> TrigramSkillResolver:
+    """Fuzzy resolver về skill đã biết: taxonomy (kể cả alias) + skill của catalog"""
+    surfaces = {name: name for name in taxonomy.vocab.skills}
+    surfaces.update(taxonomy.aliases)
+    return TrigramSkillResolver(surfaces, SKILL_FUZZY_THRESHOLD)
+
+class SkillSnapshot:
+    """
+    Taxonomy + skill index của catalog + fuzzy resolver, build từ cùng một taxonomy.
+    Reload thay cả snapshot bằng một phép gán; mỗi request đọc skill_snapshot một
+    lần nên không thấy index của taxonomy mới đi với resolver của taxonomy cũ.
+    """
+
+    def __init__(self, taxonomy: SkillTaxonomy):
+        self.taxonomy = taxonomy
+        self.jobs, self.demo_cvs, self.courses = build_skill_indexes(taxonomy)
+        # Build sau các index → vocab đã có đủ skill của catalog
+        self.resolver = build_skill_resolver(taxonomy)
+
+skill_snapshot = SkillSnapshot(get_taxonomy())
+job_pos = {j["job_id"]: i for i, j in enumerate(jobs)}
+demo_cv_pos = {c.get("cv_id"): i for i, c in enumerate(demo_cvs)}
+course_pos = {c.get("course_id"): i for i, c in enumerate(courses)}
+
+# Bitmap level / provider / rating của course → filter được đẩy vào vector search.
+# Course chưa có rating được tính là COURSE_DEFAULT_RATING (như trong set cover)
+course_filters = AttributeBitmaps(
+    courses, categorical=("level", "provider"), numeric=("rating",),
+    defaults={"rating": COURSE_DEFAULT_RATING}
+)
+
+def course_filter_mask(
+    level: Optional[str] = None,
+    provider: Optional[str] = None,
+    min_rating: Optional[float] = None
+) -> Optional[np.ndarray]:
+    """Mask các course qua filter (None = không filter)"""
+    return course_filters.mask(
+        equals={"level": level, "provider": provider},
+        minimum={"rating": min_rating}
+    )
+
+# Trọng số chất lượng cố định của từng course cho set cover (rating / 5 × level)
+course_quality = (
+    course_filters.numbers["rating"] / 5
+    * np.array([COURSE_LEVEL_WEIGHTS.get(str(c.get("level", "")).lower(), 0.9) for c in courses])
+)
+
+def course_skills_of(course: dict) -> Set[str]:
+    """Skill outcomes đã chuẩn hóa của một course (tính sẵn lúc load)"""
+    return skill_snapshot.courses.sets[course_pos[course.get("course_id")]]
+
+# cv_emb được manifest xác nhận cùng thứ tự với cvs.json → row i = demo_cvs[i]
+demo_cv_vectors = cv_emb if cv_emb is not None and len(cv_emb) == len(demo_cvs) else None
+
+# job_vec_rows[i] = row của jobs[i] trong job_store (-1 nếu job chưa có vector)
+job_vec_rows = np.array([
+    job_store.row_of(j["job_id"]) if job_store is not None and j["job_id"] in job_store else -1
+    for j in jobs
+], dtype=np.int64)
+
+# Bảng vector từng skill (scripts/embed_skills.py), dùng cho SKILL_VECTOR_MODE=compose
+skill_table = load_embedding_store(SKILL_EMB_FILE, SKILL_META_FILE, "skill")
 
 logger.info(f"✅ Jobs: {len(jobs)}, Courses: {len(courses)}, Demo CVs: {len(demo_cvs)}, User CVs: {len(user_cvs)}")
 
+def course_at(row: int) -> Optional[dict]:
+    """Course của một row trong course matrix (None nếu row không map được)"""
+    if course_store is None or row >= len(course_store):
+        return None
+    return course_by_id.get(course_store.ids[row])
+
+def search_courses(query_vec: np.ndarray, k: int = 5, mask: Optional[np.ndarray] = None):
+    """Top-k course theo cosine qua course_index → (row indices, scores), tốt nhất trước"""
+    return course_index.search(query_vec, k, mask)
+
+def recommend_course_rows(
+    skills: Set[str],
+    query_vec: Optional[np.ndarray],
+    k: int = 5,
+    mask: Optional[np.ndarray] = None
+):
+    """
+    Top-k course cho một tập skill cần học → (row indices, blended scores), tốt nhất trước.
+
+    Ứng viên = course có skills_outcomes chứa skill cần học (inverted index) ∪ top ANN,
+    chỉ các ứng viên này được chấm điểm chính xác. course_store dựng từ courses.json
+    nên row của course matrix = vị trí trong courses / course index của skill_snapshot.
+    mask (course_filter_mask) được áp dụng trước top-k ở cả hai nguồn ứng viên.
+    query_vec = None (model chưa sẵn sàng) → chỉ ứng viên inverted index, điểm = coverage.
+    """
+    snap = skill_snapshot
+    lexical_rows, hits = snap.courses.postings.candidates(snap.courses.vocab.encode(skills))
+    if mask is not None:
+        keep = mask[lexical_rows]
+        lexical_rows, hits = lexical_rows[keep], hits[keep]
+    lexical_rows = lexical_rows[top_k_indices(hits, COURSE_LEXICAL_CANDIDATES)]
+    if query_vec is None:
+        candidates = np.sort(lexical_rows)
+    else:
+        ann_rows, _ = search_courses(query_vec, max(k, COURSE_ANN_CANDIDATES), mask)
+        candidates = np.union1d(np.asarray(ann_rows, dtype=np.int64), lexical_rows)
+
+    query_bits = snap.courses.query(skills)
+    taught = popcount_rows(snap.courses.bits.words[candidates] & query_bits)
+    coverage = taught / len(skills) if skills else np.zeros(len(candidates))
+    if query_vec is None:
+        scores = coverage.astype(np.float64)
+    else:
+        semantic = course_emb[candidates] @ np.asarray(query_vec, dtype=np.float32)
+        scores = COURSE_RANK_SEMANTIC_WEIGHT * semantic + (1 - COURSE_RANK_SEMANTIC_WEIGHT) * coverage
+
+    top = top_k_indices(scores, k)
+    return candidates[top], scores[top]
+
+def cover_skill_gap(skills: Set[str], query_vec: np.ndarray) -> dict:
+    """
+    Tập course nhỏ nhất dạy hết các skill còn thiếu (greedy weighted set cover).
+
+    Ứng viên = course dạy ít nhất một skill thiếu (inverted index); mỗi vòng chọn
+    course có (số skill thiếu mới được dạy) × trọng số lớn nhất.
+    uncovered_skills = mọi skill chưa được dạy; truncated = dừng vì
+    COURSE_COVER_MAX_COURSES / COURSE_COVER_BUDGET_MS khi vẫn còn course dạy được
+    skill thiếu (truncated_skills = các skill đó, còn lại là skill không course nào dạy)
+    """
+    snap = skill_snapshot
+    rows, _ = snap.courses.postings.candidates(snap.courses.vocab.encode(skills))
+    relevance = np.clip(course_emb[rows] @ np.asarray(query_vec, dtype=np.float32), 0, None)
+    weights = (COURSE_COVER_MIN_RELEVANCE + relevance) * course_quality[rows]
+    cover = greedy_weighted_cover(
+        snap.courses.bits.words[rows], weights, snap.courses.query(skills),
+        COURSE_COVER_BUDGET_MS, COURSE_COVER_MAX_COURSES
+    )
+
+    picked = []
+    per_skill = {s: [] for s in sorted(skills)}
+    covered = set()
+    teachable = set().union(*(snap.courses.sets[r] for r in rows)) & skills
+    for i, _ in cover["picks"]:
+        c = courses[rows[i]]
+        relevant_skills = snap.courses.sets[rows[i]] & skills
+        for s in relevant_skills:
+            per_skill[s].append(c.get("course_id"))
+        picked.append((c, float(relevance[i]), relevant_skills, relevant_skills - covered))
+        covered |= relevant_skills
+
+    uncovered = [s for s, ids in per_skill.items() if not ids]
+    return {
+        "courses": picked,
+        "per_skill": per_skill,
+        "uncovered_skills": uncovered,
+        "truncated": cover["truncated"],
+        "truncated_skills": [s for s in uncovered if s in teachable],
+        "timed_out": cover["timed_out"],
+        "elapsed_ms": round(cover["elapsed_ms"], 3)
+    }
+
 # ==================================================
 # 🔴 FIX: PYDANTIC MODELS WITH VALIDATION
 # ==================================================
@@ -580,6 +935,14 @@ class DemoMatchRequest(BaseModel):
 class MatchUserCVRequest(BaseModel):
     job_id: str
     cv_id: str
+    # "top": top 5 course liên quan nhất | "cover": ít course nhất dạy hết skill thiếu
+    course_mode: str = "top"
+    
+    @validator('course_mode')
+    def check_course_mode(cls, v):
+        if v not in ("top", "cover"):
+            raise ValueError('course_mode phải là "top" hoặc "cover"')
+        return v
     
     @validator('job_id', 'cv_id')
     def check_not_empty(cls, v):
@@ -588,6 +951,22 @@ class MatchUserCVRequest(BaseModel):
             raise ValueError('Field không được để trống')
         return v.strip()
 
+class BatchMatchRequest(BaseModel):
+    job_ids: List[str]
+    cv_ids: List[str]
+    details: bool = False  # True → mỗi cặp một dòng kèm matched/missing skills
+    semantic: bool = True  # False → chỉ skill coverage, không cần embedding model
+
+    @validator('job_ids', 'cv_ids')
+    def check_ids(cls, v):
+        """Trim, bỏ trùng (giữ thứ tự) và giới hạn số lượng"""
+        ids = list(dict.fromkeys(i.strip() for i in v if i and i.strip()))
+        if not ids:
+            raise ValueError('Danh sách không được để trống')
+        if len(ids) > BATCH_MATCH_MAX_IDS:
+            raise ValueError(f'Tối đa {BATCH_MATCH_MAX_IDS} id mỗi danh sách')
+        return ids
+
 # ==================================================
 # HEALTH CHECK
 # ==================================================
@@ -604,17 +983,46 @@ def root():
 
 @app.get("/health")
 def health_check():
+    """Liveness luôn trả về; readiness phản ánh trạng thái embedding model"""
     return {
         "status": "healthy",
+        "live": True,
+        "ready": embeddings_ready(),
+        "model": encoder.stats(),
         "jobs": len(jobs),
         "courses": len(courses),
         "demo_cvs": len(demo_cvs),
         "user_cvs": len(user_cvs),
+        "job_vectors": len(job_store) if job_store is not None else 0,
+        "user_cv_vectors": user_cv_store.stats(),
+        "user_cvs_without_vector": len(user_cvs_without_vector()),
         "embedding_model": "BAAI/bge-m3",
+        "embedding_backend": EMBEDDING_BACKEND,
+        "embedding_storage": course_emb.storage if course_emb is not None else None,
+        "course_index": course_index.describe() if course_index is not None else None,
+        "job_index": job_index.describe() if job_index is not None else None,
         "skill_extraction": "hybrid-llm-rules",
-        "skills_database_size": len(ALL_SKILLS)
+        "skills_database_size": len(skill_snapshot.taxonomy.all_skills),
+        "embedding_cache": skill_set_cache.stats(),
+        "skill_vector_mode": SKILL_VECTOR_MODE,
+        "skill_vectors": len(skill_table) if skill_table is not None else 0
     }
 
+@app.get("/health/live")
+def liveness_check():
+    """Process đang chạy và phục vụ request (không phụ thuộc model)"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+def readiness_check():
+    """Sẵn sàng phục vụ endpoint cần embedding (model đã load + warm-up, hoặc compose từ bảng skill)"""
+    if embeddings_ready():
+        return {"status": "ready", "model": encoder.stats()}
+    return JSONResponse(
+        status_code=503,
+        content={"status": encoder.state, "model": encoder.stats()}
+    )
+
 # ==================================================
 # AUTH API
 # ==================================================
@@ -681,17 +1089,23 @@ def get_demo_cvs():
 
 @app.post("/match-demo")
 def match_demo(request: DemoMatchRequest):
-    """[PUBLIC] So sánh Job với CV mẫu"""
-    job = next((j for j in jobs if j["job_id"] == request.job_id), None)
+    """
+    [PUBLIC] So sánh Job với CV mẫu.
+    Model chưa sẵn sàng → vẫn trả phần skill match; semantic_fit_score = None nếu
+    thiếu vector, course được xếp theo coverage (course_ranking = "coverage")
+    """
+    snap = skill_snapshot
+    
+    job = job_by_id.get(request.job_id)
     if not job:
         raise HTTPException(404, "Công việc không tồn tại")
     
-    cv = next((c for c in demo_cvs if c.get("cv_id") == request.cv_id), None)
+    cv = demo_cv_by_id.get(request.cv_id)
     if not cv:
         raise HTTPException(404, "CV không tồn tại trong dataset demo")
     
-    job_skills = normalize_skill_list(job.get("requirements", {}).get("skills_required", []))
-    cv_skills = normalize_skill_list(cv.get("skills", []))
+    job_skills = snap.jobs.sets[job_pos[request.job_id]]
+    cv_skills = snap.demo_cvs.sets[demo_cv_pos[request.cv_id]]
     
     matched_skills = job_skills & cv_skills
     missing_skills = job_skills - cv_skills
@@ -711,20 +1125,33 @@ def match_demo(request: DemoMatchRequest):
         assessment = "Cần cải thiện đáng kể."
         level = "needs_improvement"
     
+    # Semantic: vector CV mẫu (cv_emb, không có thì encode tập skill) · vector job
+    # (store, hoặc encode khi model ready)
+    semantic_fit_score = None
+    pos = job_pos[request.job_id]
+    if job_vec_rows[pos] >= 0 or encoder.ready:
+        if demo_cv_vectors is not None:
+            cv_vec = np.asarray(demo_cv_vectors[demo_cv_pos[request.cv_id]], dtype=np.float32)
+        elif embeddings_ready():
+            cv_vec = encode_skill_set(cv_skills)
+        else:
+            cv_vec = None
+        if cv_vec is not None:
+            semantic_fit_score = round(float(np.dot(cv_vec, job_vector(job))), 3)
+    
     recommended_courses = []
+    semantic_courses = embeddings_ready()
     
     if missing_skills and course_emb is not None:
         try:
-            missing_text = " ".join(missing_skills)
-            missing_emb = model.encode(missing_text, normalize_embeddings=True)
+            missing_emb = encode_skill_set(missing_skills) if semantic_courses else None
             
-            sims = cosine_similarity(missing_emb.reshape(1, -1), course_emb)[0]
-            top_indices = sims.argsort()[-5:][::-1]
+            top_indices, top_scores = recommend_course_rows(missing_skills, missing_emb, 5)
             
-            for i in top_indices:
-                if i < len(courses):
-                    c = courses[i]
-                    course_skills = normalize_skill_list(c.get("skills_outcomes", []))
+            for i, score in zip(top_indices, top_scores):
+                c = course_at(i)
+                if c is not None:
+                    course_skills = course_skills_of(c)
                     relevant_skills = course_skills & missing_skills
                     
                     recommended_courses.append({
@@ -735,12 +1162,14 @@ def match_demo(request: DemoMatchRequest):
                         "rating": c.get("rating"),
                         "duration": c.get("duration"),
                         "level": c.get("level"),
-                        "relevance_score": round(float(sims[i]) * 100, 2),
+                        "relevance_score": round(float(score) * 100, 2),
                         "skills_outcomes": sorted(list(course_skills)),
                         "relevant_skills": sorted(list(relevant_skills)),
                         "skill_coverage": round(len(relevant_skills) / len(missing_skills) * 100, 2) if missing_skills else 0
                     })
             
+        except EncoderNotReadyError:
+            raise
         except Exception as e:
             logger.error(f"❌ Error recommending courses: {e}")
     
@@ -748,6 +1177,7 @@ def match_demo(request: DemoMatchRequest):
         "job_id": request.job_id,
         "cv_id": request.cv_id,
         "match_score": round(match_score, 2),
+        "semantic_fit_score": semantic_fit_score,
         "level": level,
         "assessment": assessment,
         "job_skills_required": sorted(list(job_skills)),
@@ -757,6 +1187,7 @@ def match_demo(request: DemoMatchRequest):
         "num_matched": len(matched_skills),
         "num_missing": len(missing_skills),
         "recommended_courses": recommended_courses,
+        "course_ranking": "semantic+coverage" if semantic_courses else "coverage",
         "type": "demo"
     }
 
@@ -783,6 +1214,8 @@ async def upload_cv(
     if not file.filename.lower().endswith('.pdf'):
         raise HTTPException(400, "Chỉ chấp nhận file PDF")
     
+    require_embeddings()
+    
     cv_id = str(uuid.uuid4())
     file_path = os.path.join(UPLOAD_DIR, f"{cv_id}.pdf")
     
@@ -811,17 +1244,10 @@ async def upload_cv(
         
         # Update embeddings
         try:
-            cv_text = " ".join(cv_data["skills"])
-            new_emb = model.encode(cv_text, normalize_embeddings=True)
-            
-            global user_cv_emb
-            if user_cv_emb is None:
-                user_cv_emb = new_emb.reshape(1, -1)
-            else:
-                user_cv_emb = np.vstack([user_cv_emb, new_emb])
+            new_emb = encode_skill_set(skill_snapshot.taxonomy.normalize_list(cv_data["skills"]))
             
-            np.save(USER_CV_EMB_FILE, user_cv_emb)
-            logger.info(f"✅ Embeddings updated: shape {user_cv_emb.shape}")
+            user_cv_store.put(cv_id, new_emb)
+            logger.info(f"✅ Embeddings updated: {len(user_cv_store)} user CV vectors")
         except Exception as e:
             logger.error(f"❌ Error updating embeddings: {e}")
         
@@ -850,7 +1276,7 @@ def delete_user_cv(
     current_user: User = Depends(get_current_user)
 ):
     """[PROTECTED] Xóa CV của user"""
-    global user_cvs, user_cv_emb
+    global user_cvs
     
     cv_index = next((i for i, cv in enumerate(user_cvs) 
                      if cv.get("cv_id") == cv_id and cv.get("user_id") == current_user.id), None)
@@ -867,10 +1293,8 @@ def delete_user_cv(
     if os.path.exists(file_path):
         os.remove(file_path)
     
-    # Update embeddings
-    if user_cv_emb is not None and cv_index < len(user_cv_emb):
-        user_cv_emb = np.delete(user_cv_emb, cv_index, axis=0)
-        np.save(USER_CV_EMB_FILE, user_cv_emb)
+    # Update embeddings (theo cv_id, không theo vị trí trong user_cvs)
+    user_cv_store.delete(cv_id)
     
     logger.info(f"✅ CV deleted: {cv_id} by user {current_user.id}")
     return {"message": "CV đã được xóa thành công"}
@@ -889,7 +1313,7 @@ def get_jobs():
 @app.get("/jobs/{job_id}")
 def get_job_detail(job_id: str):
     """[PUBLIC] Lấy chi tiết công việc"""
-    job = next((j for j in jobs if j["job_id"] == job_id), None)
+    job = job_by_id.get(job_id)
     if not job:
         raise HTTPException(404, "Công việc không tồn tại")
     return job
@@ -903,6 +1327,8 @@ def match_user_cv(
     current_user: User = Depends(get_current_user)
 ):
     """[PROTECTED] Advanced Job–CV Matching with NLP + Skill Gap Analysis"""
+    snap = skill_snapshot
+    require_embeddings()
 
     job_id = request.job_id
     cv_id = request.cv_id
@@ -910,7 +1336,7 @@ def match_user_cv(
     logger.info(f"🔍 Matching job_id={job_id}, cv_id={cv_id}, user={current_user.id}")
 
     # ===== 1. Validate Job =====
-    job = next((j for j in jobs if j["job_id"] == job_id), None)
+    job = job_by_id.get(job_id)
     if not job:
         raise HTTPException(404, "Công việc không tồn tại")
 
@@ -923,10 +1349,8 @@ def match_user_cv(
         raise HTTPException(404, "CV không tồn tại hoặc không thuộc quyền sở hữu")
 
     # ===== 3. Skill Normalization =====
-    job_skills = normalize_skill_list(
-        job.get("requirements", {}).get("skills_required", [])
-    )
-    cv_skills = normalize_skill_list(cv.get("skills", []))
+    job_skills = snap.jobs.sets[job_pos[job_id]]
+    cv_skills = snap.taxonomy.normalize_list(cv.get("skills", []))
 
     matched_skills = job_skills & cv_skills
     missing_skills = job_skills - cv_skills
@@ -938,21 +1362,15 @@ def match_user_cv(
     )
 
     # ===== 5. Semantic Matching (NLP + Embedding) =====
-    job_text = (
-        job.get("title", "") + " " +
-        job.get("description", "") + " " +
-        " ".join(job_skills)
-    )
-
-    cv_text = " ".join(cv_skills)
+    # Job vector lấy từ store build sẵn; job chưa có trong store được encode
+    # cùng text với lúc build (như best-cvs / batch)
+    job_vec = job_vector(job)
 
-    job_vec = model.encode(job_text, normalize_embeddings=True)
-    cv_vec = model.encode(cv_text, normalize_embeddings=True)
+    # CV vector lưu lúc upload (user_cv_store), CV thiếu vector mới encode
+    cv_vec = user_cv_vectors([cv], [cv_skills])[0]
 
-    semantic_fit_score = cosine_similarity(
-        cv_vec.reshape(1, -1),
-        job_vec.reshape(1, -1)
-    )[0][0]
+    # Cả hai vector đã normalize → cosine = dot product
+    semantic_fit_score = float(np.dot(cv_vec, job_vec))
 
     # ===== 6. Explainability =====
     explanations = []
@@ -985,25 +1403,41 @@ def match_user_cv(
 
     # ===== 7. Course Recommendation (Embedding-based) =====
     recommended_courses = []
+    skill_gap_coverage = None
 
-    if missing_skills and course_emb is not None:
+    if missing_skills and course_emb is not None and request.course_mode == "cover":
+        try:
+            cover = cover_skill_gap(missing_skills, encode_skill_set(missing_skills))
+            for c, relevance, relevant_skills, new_skills in cover.pop("courses"):
+                recommended_courses.append({
+                    "course_id": c.get("course_id"),
+                    "title": c.get("name"),
+                    "platform": c.get("provider"),
+                    "url": c.get("url"),
+                    "level": c.get("level"),
+                    "relevance_score": round(relevance * 100, 2),
+                    "skills_outcomes": sorted(course_skills_of(c)),
+                    "relevant_skills": sorted(relevant_skills),
+                    "new_skills": sorted(new_skills),
+                    "skill_coverage": round(len(relevant_skills) / len(missing_skills) * 100, 2)
+                })
+            skill_gap_coverage = cover
+
+        except EncoderNotReadyError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Course cover error: {e}")
+
+    elif missing_skills and course_emb is not None:
         try:
-            missing_text = " ".join(missing_skills)
-            missing_emb = model.encode(missing_text, normalize_embeddings=True)
-
-            sims = cosine_similarity(
-                missing_emb.reshape(1, -1),
-                course_emb
-            )[0]
-
-            top_indices = sims.argsort()[-5:][::-1]
-
-            for i in top_indices:
-                if i < len(courses):
-                    c = courses[i]
-                    course_skills = normalize_skill_list(
-                        c.get("skills_outcomes", [])
-                    )
+            missing_emb = encode_skill_set(missing_skills)
+
+            top_indices, top_scores = recommend_course_rows(missing_skills, missing_emb, 5)
+
+            for i, score in zip(top_indices, top_scores):
+                c = course_at(i)
+                if c is not None:
+                    course_skills = course_skills_of(c)
                     relevant_skills = course_skills & missing_skills
 
                     recommended_courses.append({
@@ -1012,7 +1446,7 @@ def match_user_cv(
                         "platform": c.get("provider"),
                         "url": c.get("url"),
                         "level": c.get("level"),
-                        "relevance_score": round(float(sims[i]) * 100, 2),
+                        "relevance_score": round(float(score) * 100, 2),
                         "skills_outcomes": sorted(list(course_skills)),
                         "relevant_skills": sorted(list(relevant_skills)),
                         "skill_coverage": round(
@@ -1020,6 +1454,8 @@ def match_user_cv(
                         ) if missing_skills else 0
                     })
 
+        except EncoderNotReadyError:
+            raise
         except Exception as e:
             logger.error(f"❌ Course recommendation error: {e}")
 
@@ -1047,6 +1483,8 @@ def match_user_cv(
 
         # Recommendations
         "recommended_courses": recommended_courses,
+        "course_mode": request.course_mode,
+        "skill_gap_coverage": skill_gap_coverage,
 
         # Metadata
         "extraction_stats": cv.get("stats", {}),
@@ -1054,25 +1492,307 @@ def match_user_cv(
     }
 
 
+# ==================================================
+# 🏆 BEST JOBS FOR A CV
+# ==================================================
+def rank_jobs_for_cv(
+    cv_skills: Set[str], page: int, page_size: int, cv_vec: Optional[np.ndarray] = None
+) -> dict:
+    """
+    Xếp hạng toàn bộ jobs cho một tập skill CV, trả về một trang kết quả.
+    cv_vec: vector lưu sẵn của CV (None → encode từ cv_skills nếu model sẵn sàng).
+    Không có vector và model chưa sẵn sàng → xếp hạng theo coverage (ranking = "coverage").
+    """
+    snap = skill_snapshot
+    need = page * page_size
+    pool = max(JOB_RANK_CANDIDATES, need)
+
+    # Coverage với mọi job trong một lần (bitset), ứng viên = top coverage ∪ top semantic
+    coverage = snap.jobs.coverage(cv_skills)
+    candidates = top_k_indices(coverage, pool)
+
+    semantic = None
+    if job_index is not None and cv_skills and (cv_vec is not None or embeddings_ready()):
+        if cv_vec is None:
+            cv_vec = encode_skill_set(cv_skills)
+        rows, _ = job_index.search(cv_vec, pool)
+        semantic_pos = [job_pos[job_store.ids[r]] for r in rows if job_store.ids[r] in job_pos]
+        candidates = np.union1d(candidates, np.array(semantic_pos, dtype=np.int64))
+
+        # Semantic chính xác cho ứng viên; job chưa có vector → 0
+        vec_rows = job_vec_rows[candidates]
+        has_vec = vec_rows >= 0
+        semantic = np.zeros(len(candidates), dtype=np.float32)
+        if has_vec.any():
+            semantic[has_vec] = np.asarray(job_store.matrix[vec_rows[has_vec]], dtype=np.float32) @ cv_vec
+        scores = JOB_RANK_SEMANTIC_WEIGHT * semantic + (1 - JOB_RANK_SEMANTIC_WEIGHT) * coverage[candidates]
+    else:
+        scores = coverage[candidates]
+
+    start = (page - 1) * page_size
+    results = []
+    for rank, i in enumerate(top_k_indices(scores, need)[start:], start=start + 1):
+        pos = candidates[i]
+        job = jobs[pos]
+        job_skills = snap.jobs.sets[pos]
+        results.append({
+            "rank": rank,
+            "job_id": job["job_id"],
+            "title": job.get("title"),
+            "company": job.get("company"),
+            "location": job.get("location"),
+            "match_score": round(float(scores[i]) * 100, 2),
+            "semantic_fit_score": round(float(semantic[i]), 3) if semantic is not None else None,
+            "skill_coverage_score": round(float(coverage[pos]) * 100, 2),
+            "matched_skills": sorted(job_skills & cv_skills),
+            "missing_skills": sorted(job_skills - cv_skills)
+        })
+
+    return {
+        "jobs": results,
+        "page": page,
+        "page_size": page_size,
+        # Pool ứng viên luôn ≥ page * page_size → mọi job đều xếp hạng được
+        "total": len(jobs),
+        "ranking": "semantic+coverage" if semantic is not None else "coverage"
+    }
+
+@app.get("/demo-cvs/{cv_id}/best-jobs")
+def best_jobs_for_demo_cv(
+    cv_id: str,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(10, ge=1, le=50)
+):
+    """[PUBLIC] Các job phù hợp nhất với một CV mẫu (phân trang)"""
+    if cv_id not in demo_cv_pos:
+        raise HTTPException(404, "CV không tồn tại trong dataset demo")
+
+    row = demo_cv_pos[cv_id]
+    cv_vec = demo_cv_vectors[row] if demo_cv_vectors is not None else None
+    result = rank_jobs_for_cv(skill_snapshot.demo_cvs.sets[row], page, page_size, cv_vec)
+    result.update({"cv_id": cv_id, "type": "demo"})
+    return result
+
+@app.get("/user-cvs/{cv_id}/best-jobs")
+def best_jobs_for_user_cv(
+    cv_id: str,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(10, ge=1, le=50),
+    current_user: User = Depends(get_current_user)
+):
+    """[PROTECTED] Các job phù hợp nhất với CV của user (phân trang)"""
+    cv = next(
+        (c for c in user_cvs if c.get("cv_id") == cv_id and c.get("user_id") == current_user.id),
+        None
+    )
+    if not cv:
+        raise HTTPException(404, "CV không tồn tại hoặc không thuộc quyền sở hữu")
+
+    cv_skills = skill_snapshot.taxonomy.normalize_list(cv.get("skills", []))
+    cv_vec = None
+    if cv_skills and (cv["cv_id"] in user_cv_store or embeddings_ready()):
+        cv_vec = user_cv_vectors([cv], [cv_skills])[0]
+    result = rank_jobs_for_cv(cv_skills, page, page_size, cv_vec)
+    result.update({"cv_id": cv_id, "type": "user"})
+    return result
+
+# ==================================================
+# 👥 BEST CANDIDATES FOR A JOB
+# ==================================================
+def job_vector(job: dict) -> np.ndarray:
+    """Vector của job: lấy từ job_store, nếu chưa có thì encode cùng text với lúc build"""
+    vec = job_store.get(job["job_id"]) if job_store is not None else None
+    if vec is None:
+        require_embeddings()
+        vec = encoder.encode(build_job_text(job), normalize_embeddings=True)
+    return np.asarray(vec, dtype=np.float32)
+
+@app.get("/jobs/{job_id}/best-cvs")
+def best_cvs_for_job(
+    job_id: str,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(10, ge=1, le=50)
+):
+    """[PUBLIC] Xếp hạng toàn bộ CV mẫu cho một job (phân trang)"""
+    snap = skill_snapshot
+    if job_id not in job_pos:
+        raise HTTPException(404, "Công việc không tồn tại")
+    job = jobs[job_pos[job_id]]
+    job_skills = snap.jobs.sets[job_pos[job_id]]
+
+    # Một lượt cho mọi CV: phần skill yêu cầu mà mỗi CV có (bitset CV × bitset job)
+    # và cosine với job (cv_emb @ job_vec)
+    coverage = snap.demo_cvs.covers(job_skills)
+    semantic = None
+    if demo_cv_vectors is not None:
+        semantic = demo_cv_vectors.scores(job_vector(job))
+        scores = CV_RANK_SEMANTIC_WEIGHT * semantic + (1 - CV_RANK_SEMANTIC_WEIGHT) * coverage
+    else:
+        scores = coverage
+
+    start = (page - 1) * page_size
+    results = []
+    for rank, i in enumerate(top_k_indices(scores, page * page_size)[start:], start=start + 1):
+        cv = demo_cvs[i]
+        cv_skills = snap.demo_cvs.sets[i]
+        results.append({
+            "rank": rank,
+            "cv_id": cv.get("cv_id"),
+            "student_name": cv.get("student_name"),
+            "target_job": cv.get("target_job"),
+            "match_score": round(float(scores[i]) * 100, 2),
+            "semantic_fit_score": round(float(semantic[i]), 3) if semantic is not None else None,
+            "skill_coverage_score": round(float(coverage[i]) * 100, 2),
+            "matched_skills": sorted(job_skills & cv_skills),
+            "missing_skills": sorted(job_skills - cv_skills)
+        })
+
+    return {
+        "job_id": job_id,
+        "cvs": results,
+        "page": page,
+        "page_size": page_size,
+        "total": len(demo_cvs),
+        "ranking": "semantic+coverage" if semantic is not None else "coverage",
+        "type": "demo"
+    }
+
+# ==================================================
+# 📦 BATCH MATCHING (NDJSON)
+# ==================================================
+def job_vectors(positions: List[int]) -> np.ndarray:
+    """Vector của nhiều job (vị trí trong jobs): lấy từ job_store, job thiếu được encode chung một lần"""
+    vectors = [None] * len(positions)
+    missing = []
+    for n, pos in enumerate(positions):
+        if job_vec_rows[pos] >= 0:
+            vectors[n] = np.asarray(job_store.matrix[job_vec_rows[pos]], dtype=np.float32)
+        else:
+            missing.append(n)
+    if missing:
+        require_embeddings()
+        encoded = encoder.encode(
+            [build_job_text(jobs[positions[n]]) for n in missing], normalize_embeddings=True
+        )
+        for n, vec in zip(missing, encoded):
+            vectors[n] = vec
+    return np.vstack(vectors).astype(np.float32)
+
+def ndjson_line(obj: dict) -> str:
+    return json.dumps(obj, ensure_ascii=False) + "\n"
+
+def stream_batch_match(
+    request: BatchMatchRequest,
+    cv_ids: List[str],
+    cv_skill_sets: List[Set[str]],
+    unknown_cv_ids: List[str],
+    cv_type: str,
+    cv_vectors: Optional[Callable[[], np.ndarray]] = None
+) -> StreamingResponse:
+    """Tính ma trận điểm Job × CV rồi stream NDJSON (header, rồi một dòng mỗi job hoặc mỗi cặp)"""
+    snap = skill_snapshot
+    job_ids = [j for j in request.job_ids if j in job_pos]
+    unknown_job_ids = [j for j in request.job_ids if j not in job_pos]
+    positions = [job_pos[j] for j in job_ids]
+
+    # Coverage J × C: bitset skill job & bitset skill CV (cùng layout của job index)
+    job_words = snap.jobs.bits.words[positions]
+    cv_words = np.zeros((len(cv_ids), job_words.shape[1]), dtype=np.uint64)
+    for b, skills in enumerate(cv_skill_sets):
+        cv_words[b] = snap.jobs.query(skills)
+    matched = pairwise_matched_counts(job_words, cv_words)
+    sizes = snap.jobs.bits.row_sizes[positions][:, None]
+    coverage = np.divide(matched, sizes, out=np.zeros(matched.shape), where=sizes > 0)
+
+    # Semantic J × C: mỗi job / CV chỉ lấy vector một lần, rồi một phép nhân ma trận.
+    # Tính xong trước khi stream → lỗi (vd. model chưa sẵn sàng) vẫn trả đúng status code
+    semantic = None
+    if request.semantic and job_ids and cv_ids:
+        if cv_vectors is not None:
+            # Vector lưu sẵn: cv_emb (CV mẫu) / user_cv_store (CV user)
+            cv_vecs = cv_vectors()
+        else:
+            require_embeddings()
+            cv_vecs = encode_skill_sets(cv_skill_sets)
+        semantic = job_vectors(positions) @ cv_vecs.T
+
+    def lines():
+        yield ndjson_line({
+            "type": "header",
+            "job_ids": job_ids,
+            "cv_ids": cv_ids,
+            "unknown_job_ids": unknown_job_ids,
+            "unknown_cv_ids": unknown_cv_ids,
+            "semantic": semantic is not None,
+            "cv_type": cv_type
+        })
+        for a, job_id in enumerate(job_ids):
+            if not request.details:
+                # Mặc định: một dòng mỗi job, điểm theo thứ tự cv_ids trong header
+                yield ndjson_line({
+                    "type": "row",
+                    "job_id": job_id,
+                    "skill_coverage_score": np.round(coverage[a] * 100, 2).tolist(),
+                    "semantic_fit_score": np.round(semantic[a].astype(np.float64), 3).tolist() if semantic is not None else None
+                })
+                continue
+            job_skills = snap.jobs.sets[positions[a]]
+            for b, cv_id in enumerate(cv_ids):
+                yield ndjson_line({
+                    "type": "pair",
+                    "job_id": job_id,
+                    "cv_id": cv_id,
+                    "skill_coverage_score": round(float(coverage[a, b]) * 100, 2),
+                    "semantic_fit_score": round(float(semantic[a, b]), 3) if semantic is not None else None,
+                    "matched_skills": sorted(job_skills & cv_skill_sets[b]),
+                    "missing_skills": sorted(job_skills - cv_skill_sets[b])
+                })
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.post("/match-demo/batch")
+def match_demo_batch(request: BatchMatchRequest):
+    """[PUBLIC] So sánh nhiều Job × nhiều CV mẫu trong một request (NDJSON)"""
+    cv_ids = [c for c in request.cv_ids if c in demo_cv_pos]
+    unknown_cv_ids = [c for c in request.cv_ids if c not in demo_cv_pos]
+    rows = [demo_cv_pos[c] for c in cv_ids]
+    cv_skill_sets = [skill_snapshot.demo_cvs.sets[i] for i in rows]
+    cv_vectors = (lambda: demo_cv_vectors[rows]) if demo_cv_vectors is not None else None
+    return stream_batch_match(request, cv_ids, cv_skill_sets, unknown_cv_ids, "demo", cv_vectors)
+
+@app.post("/match-user-cv/batch")
+def match_user_cv_batch(
+    request: BatchMatchRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """[PROTECTED] So sánh nhiều Job × nhiều CV của user trong một request (NDJSON)"""
+    own_cvs = {c.get("cv_id"): c for c in user_cvs if c.get("user_id") == current_user.id}
+    cv_ids = [c for c in request.cv_ids if c in own_cvs]
+    unknown_cv_ids = [c for c in request.cv_ids if c not in own_cvs]
+    cv_skill_sets = [skill_snapshot.taxonomy.normalize_list(own_cvs[c].get("skills", [])) for c in cv_ids]
+    cv_vectors = lambda: user_cv_vectors([own_cvs[c] for c in cv_ids], cv_skill_sets)
+    return stream_batch_match(request, cv_ids, cv_skill_sets, unknown_cv_ids, "user", cv_vectors)
+
 # ==================================================
 # 🎓 COURSE RECOMMENDATIONS
 # ==================================================
 @app.get("/courses")
 def get_courses(
     limit: int = 20,
+    provider: Optional[str] = None,
     platform: Optional[str] = None,
-    level: Optional[str] = None
+    level: Optional[str] = None,
+    min_rating: Optional[float] = None
 ):
-    """[PUBLIC] Lấy danh sách khóa học"""
-    filtered_courses = courses
-    
-    if platform:
-        filtered_courses = [c for c in filtered_courses 
-                           if c.get("platform", "").lower() == platform.lower()]
-    
-    if level:
-        filtered_courses = [c for c in filtered_courses 
-                           if c.get("level", "").lower() == level.lower()]
+    """
+    [PUBLIC] Lấy danh sách khóa học (platform = tên cũ của provider).
+    Course chưa có rating được tính là COURSE_DEFAULT_RATING khi lọc min_rating
+    """
+    mask = course_filter_mask(level, provider or platform, min_rating)
+    if mask is None:
+        filtered_courses = courses
+    else:
+        filtered_courses = [courses[i] for i in np.flatnonzero(mask)]
     
     return {
         "courses": filtered_courses[:limit],
@@ -1081,8 +1801,16 @@ def get_courses(
     }
 
 @app.post("/recommend-courses")
-def recommend_courses_by_skills(skills: List[str]):
-    """[PUBLIC] Gợi ý khóa học dựa trên danh sách skills"""
+def recommend_courses_by_skills(
+    skills: List[str],
+    level: Optional[str] = None,
+    provider: Optional[str] = None,
+    min_rating: Optional[float] = None
+):
+    """
+    [PUBLIC] Gợi ý khóa học dựa trên danh sách skills (lọc theo level / provider / rating).
+    Course chưa có rating được tính là COURSE_DEFAULT_RATING khi lọc min_rating
+    """
     
     if not skills:
         raise HTTPException(400, "Danh sách skills không được để trống")
@@ -1090,19 +1818,20 @@ def recommend_courses_by_skills(skills: List[str]):
     if course_emb is None:
         raise HTTPException(500, "Course embeddings chưa được tạo")
     
-    normalized_skills = normalize_skill_list(skills)
-    skills_text = " ".join(normalized_skills)
+    require_embeddings()
+    
+    normalized_skills = skill_snapshot.taxonomy.normalize_list(skills)
     
     try:
-        skills_emb = model.encode(skills_text, normalize_embeddings=True)
-        sims = cosine_similarity(skills_emb.reshape(1, -1), course_emb)[0]
-        top_indices = sims.argsort()[-5:][::-1]
+        skills_emb = encode_skill_set(normalized_skills)
+        mask = course_filter_mask(level, provider, min_rating)
+        top_indices, top_scores = recommend_course_rows(normalized_skills, skills_emb, 5, mask)
         
         recommended = []
-        for i in top_indices:
-            if i < len(courses):
-                c = courses[i]
-                course_skills = normalize_skill_list(c.get("skills_outcomes", []))
+        for i, score in zip(top_indices, top_scores):
+            c = course_at(i)
+            if c is not None:
+                course_skills = course_skills_of(c)
                 relevant_skills = course_skills & normalized_skills
                 
                 recommended.append({
@@ -1113,7 +1842,7 @@ def recommend_courses_by_skills(skills: List[str]):
                     "rating": c.get("rating"),
                     "duration": c.get("duration"),
                     "level": c.get("level"),
-                    "relevance_score": round(float(sims[i]) * 100, 2),
+                    "relevance_score": round(float(score) * 100, 2),
                     "skills_outcomes": sorted(list(course_skills)),
                     "relevant_skills": sorted(list(relevant_skills)),
                     "skill_coverage": round(len(relevant_skills) / len(normalized_skills) * 100, 2)
@@ -1122,9 +1851,13 @@ def recommend_courses_by_skills(skills: List[str]):
         return {
             "requested_skills": sorted(list(normalized_skills)),
             "recommended_courses": recommended,
-            "total_recommended": len(recommended)
+            "total_recommended": len(recommended),
+            "filters": {"level": level, "provider": provider, "min_rating": min_rating},
+            "total_matching_filters": len(courses) if mask is None else int(np.count_nonzero(mask))
         }
         
+    except EncoderNotReadyError:
+        raise
     except Exception as e:
         logger.error(f"❌ Error in course recommendation: {e}")
         raise HTTPException(500, f"Lỗi gợi ý khóa học: {str(e)}")
@@ -1135,23 +1868,50 @@ def recommend_courses_by_skills(skills: List[str]):
 @app.get("/skills/list")
 def get_all_skills():
     """[PUBLIC] Lấy danh sách tất cả skills trong database"""
+    taxonomy = skill_snapshot.taxonomy
     return {
-        "technical_skills": sorted(list(TECHNICAL_SKILLS)),
-        "soft_skills": sorted(list(SOFT_SKILLS)),
-        "methodologies": sorted(list(METHODOLOGIES)),
-        "total_skills": len(ALL_SKILLS)
+        "technical_skills": sorted(list(taxonomy.technical)),
+        "soft_skills": sorted(list(taxonomy.soft)),
+        "methodologies": sorted(list(taxonomy.methodologies)),
+        "total_skills": len(taxonomy.all_skills)
     }
 
 @app.post("/skills/normalize")
 def normalize_skills_endpoint(skills: List[str]):
     """[PUBLIC] Chuẩn hóa danh sách skills"""
-    normalized = normalize_skill_list(skills)
+    taxonomy = skill_snapshot.taxonomy
+    normalized = taxonomy.normalize_list(skills)
     return {
         "original": skills,
         "normalized": sorted(list(normalized)),
+        # Chỉ skill đã có trong vocab (taxonomy + catalog); chuỗi lạ không được thêm vào
+        "skill_ids": {s: taxonomy.vocab.ids[s] for s in sorted(normalized) if s in taxonomy.vocab.ids},
         "count": len(normalized)
     }
 
+@app.post("/admin/skills/reload")
+def reload_skill_taxonomy(admin: User = Depends(get_admin_user)):
+    """
+    [ADMIN] Nạp lại data/skill_taxonomy.json (hoặc artifact đã compile) và thay
+    taxonomy + skill index của catalog trong process này, không load lại bge-m3.
+    Mỗi uvicorn worker cần được gọi riêng.
+    """
+    global skill_snapshot
+    previous = skill_snapshot.taxonomy.stats()
+    try:
+        snapshot = SkillSnapshot(load_taxonomy())
+    except Exception as e:
+        logger.error(f"❌ Skill taxonomy reload failed: {e}")
+        raise HTTPException(400, f"Taxonomy không hợp lệ, giữ nguyên bản cũ: {str(e)}")
+
+    # Snapshot đã build xong mới thay, một phép gán → request không thấy taxonomy dở dang.
+    # set_taxonomy cho các service đọc taxonomy trực tiếp (normalize_skill, ...)
+    set_taxonomy(snapshot.taxonomy)
+    skill_snapshot = snapshot
+    taxonomy = snapshot.taxonomy
+    logger.info(f"✅ Skill taxonomy reloaded by {admin.email}: {taxonomy.stats()}")
+    return {"previous": previous, "current": taxonomy.stats(), "vocabulary": len(taxonomy.vocab)}
+
 # ==================================================
 # RUN
 # ==================================================
@@ -0,0 +1,35 @@
+import os, sys, time
+
+# ============================
+# PATHS
+# ============================
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))     # backend/scripts
+BACKEND_DIR = os.path.dirname(SCRIPT_DIR)                  # backend
+sys.path.insert(0, BACKEND_DIR)
+
+from services.skill_taxonomy import (
+    TAXONOMY_FILE, COMPILED_TAXONOMY_FILE, compile_taxonomy, load_taxonomy
+)
+
+# ============================
+# COMPILE
+# ============================
+# data/skill_taxonomy.json → data/skill_taxonomy.compiled.json (tables của matcher
+# + bảng alias). Server nạp artifact này lúc start hoặc qua POST /admin/skills/reload
+print(f"📖 Source: {TAXONOMY_FILE}")
+started = time.perf_counter()
+taxonomy = compile_taxonomy()
+print(f"✅ Compiled in {(time.perf_counter() - started) * 1000:.1f} ms → {COMPILED_TAXONOMY_FILE}")
+for key, value in taxonomy.stats().items():
+    print(f"   {key}: {value}")
+
+# ============================
+# VERIFY
+# ============================
+started = time.perf_counter()
+loaded = load_taxonomy()
+ms = (time.perf_counter() - started) * 1000
+assert loaded.source_hash == taxonomy.source_hash and loaded.matcher.skills == taxonomy.matcher.skills
+print(f"✅ Artifact loads in {ms:.1f} ms")
+
+print("\n🎉 DONE — call POST /admin/skills/reload on each worker to apply")
@@ -0,0 +1,77 @@
+import os, sys, time
+import numpy as np
+
+# ============================
+# PATHS
+# ============================
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))     # backend/scripts
+BACKEND_DIR = os.path.dirname(SCRIPT_DIR)                  # backend
+sys.path.insert(0, BACKEND_DIR)
+
+from services.embedding_manifest import manifest_hash, manifest_path
+from services.embedding_store import EmbeddingMatrix
+from services.vector_index import ExactIndex, build_vector_index, load_vector_index
+
+EMB_DIR = os.path.join(BACKEND_DIR, "embeddings")
+META_DIR = os.path.join(BACKEND_DIR, "metadata")
+
+# (matrix, manifest kind): index được gắn hash manifest của matrix nguồn
+MATRIX_FILES = [
+    (os.path.join(EMB_DIR, "course_embeddings.npy"), "course"),
+    (os.path.join(EMB_DIR, "job_embeddings.npy"), "job"),
+    (os.path.join(EMB_DIR, "cv_embeddings.npy"), "cv"),
+]
+
+# Loại index cần build: "ivf" | "hnsw" (cần hnswlib) | "pca"
+KINDS = [k.strip() for k in os.getenv("VECTOR_INDEX_KINDS", "ivf,hnsw").split(",") if k.strip()]
+
+TOP_K = 5
+NUM_QUERIES = 300
+
+# ============================
+# BUILD + MEASURE
+# ============================
+# Recall@5 so với exact search, truy vấn = trung bình 2 row ngẫu nhiên
+rng = np.random.default_rng(0)
+
+def measure(index, exact, queries):
+    hits = 0
+    for q in queries:
+        hits += len(set(index.search(q, TOP_K)[0]) & set(exact.search(q, TOP_K)[0]))
+    # Đo thời gian riêng cho index (vòng trên có cả exact search)
+    started = time.perf_counter()
+    for q in queries:
+        index.search(q, TOP_K)
+    ms = (time.perf_counter() - started) / len(queries) * 1000
+    return hits / (len(queries) * min(TOP_K, len(index))), ms
+
+print(f"{'matrix':<26} {'index':<20} {'build s':>8} {'ms/query':>9} {'recall@5':>9}")
+for emb_path, kind in MATRIX_FILES:
+    if not os.path.exists(emb_path):
+        print(f"⚠️ Skipping {os.path.basename(emb_path)}: not found")
+        continue
+
+    matrix = EmbeddingMatrix(np.load(emb_path, mmap_mode="r"))
+    source_hash = manifest_hash(manifest_path(META_DIR, kind))
+    picks = rng.integers(0, len(matrix), size=(NUM_QUERIES, 2))
+    queries = matrix[picks.reshape(-1)].reshape(NUM_QUERIES, 2, -1).mean(axis=1)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    exact = ExactIndex(matrix)
+    name = os.path.basename(emb_path)
+    recall, ms = measure(exact, exact, queries)
+    print(f"{name:<26} {'exact':<20} {0.0:>8.1f} {ms:>9.3f} {recall:>9.4f}")
+
+    for index_kind in KINDS:
+        started = time.perf_counter()
+        try:
+            build_vector_index(emb_path, index_kind, source_hash)
+        except ImportError:
+            print(f"{'':<26} {index_kind:<20} ⚠️ pip install hnswlib")
+            continue
+        seconds = time.perf_counter() - started
+        index = load_vector_index(emb_path, matrix, index_kind, source_hash=source_hash)
+        recall, ms = measure(index, exact, queries)
+        print(f"{'':<26} {index.describe():<20} {seconds:>8.1f} {ms:>9.3f} {recall:>9.4f}")
+
+print("\n🎉 DONE — VECTOR_INDEX=auto serves hnsw → ivf → pca (first usable file)")
@@ -0,0 +1,112 @@
+import os, sys, json, time
+import numpy as np
+
+# ============================
+# PATHS
+# ============================
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))     # backend/scripts
+BACKEND_DIR = os.path.dirname(SCRIPT_DIR)                  # backend
+sys.path.insert(0, BACKEND_DIR)
+
+from services.encoder_service import DEFAULT_ONNX_DIR, load_embedding_model
+from services.embedding_texts import build_course_text
+from services.onnx_encoder import MODEL_FILE, QUANTIZED_MODEL_FILE
+
+DATA_DIR = os.path.join(BACKEND_DIR, "data")
+EMB_DIR  = os.path.join(BACKEND_DIR, "embeddings")
+
+COURSES_FILE = os.path.join(DATA_DIR, "courses.json")
+COURSE_EMB_FILE = os.path.join(EMB_DIR, "course_embeddings.npy")
+
+SAMPLE_SIZE = int(os.getenv("PARITY_SAMPLE", "200"))
+ONNX_DIR = os.getenv("ONNX_MODEL_DIR", DEFAULT_ONNX_DIR)
+TOP_K = 5
+
+# Truy vấn ngắn giống /recommend-courses để đo latency 1 request
+QUERIES = [
+    "python sql", "react javascript html css", "docker kubernetes aws",
+    "machine learning pandas numpy", "java spring boot", "excel power bi",
+    "figma ui ux", "node.js express mongodb", "c++ linux", "agile scrum jira",
+]
+
+# ============================
+# LOAD DATA
+# ============================
+courses = json.load(open(COURSES_FILE, encoding="utf-8"))[:SAMPLE_SIZE]
+texts = [build_course_text(c) for c in courses]
+stored = np.load(COURSE_EMB_FILE) if os.path.exists(COURSE_EMB_FILE) else None
+print(f"📄 Courses sampled: {len(texts)}")
+
+# ============================
+# HELPERS
+# ============================
+def time_batch(model):
+    start = time.perf_counter()
+    vectors = model.encode(texts, batch_size=32, normalize_embeddings=True)
+    return vectors, time.perf_counter() - start
+
+def time_queries(model, rounds=5):
+    latencies = []
+    for _ in range(rounds):
+        for q in QUERIES:
+            start = time.perf_counter()
+            model.encode(q, normalize_embeddings=True)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return float(np.percentile(latencies, 50)), float(np.percentile(latencies, 95))
+
+def topk_overlap(query_vecs, a, b):
+    """Trung bình |top-k(a) ∩ top-k(b)| / k trên các truy vấn"""
+    overlaps = []
+    for q in query_vecs:
+        top_a = set(np.argpartition(-(a @ q), TOP_K)[:TOP_K])
+        top_b = set(np.argpartition(-(b @ q), TOP_K)[:TOP_K])
+        overlaps.append(len(top_a & top_b) / TOP_K)
+    return float(np.mean(overlaps))
+
+# ============================
+# REFERENCE (PYTORCH)
+# ============================
+print("\n🔧 Loading torch backend ...")
+torch_model = load_embedding_model("torch")
+ref_vectors, ref_batch_s = time_batch(torch_model)
+ref_p50, ref_p95 = time_queries(torch_model)
+
+rows = [("torch fp32", ref_batch_s, ref_p50, ref_p95, 1.0, 1.0)]
+if stored is not None:
+    stored_sample = stored[:len(texts)]
+    print(f"  stored course_embeddings.npy vs torch: mean cos = "
+          f"{float(np.mean(np.sum(stored_sample * ref_vectors, axis=1))):.4f}")
+
+# ============================
+# ONNX VARIANTS
+# ============================
+for quantized, filename in ((False, MODEL_FILE), (True, QUANTIZED_MODEL_FILE)):
+    if not os.path.exists(os.path.join(ONNX_DIR, filename)):
+        print(f"⚠️ Skipping {filename}: not found in {ONNX_DIR}")
+        continue
+
+    label = "onnx int8" if quantized else "onnx fp32"
+    print(f"\n🔧 Loading {label} ...")
+    model = load_embedding_model("onnx", onnx_dir=ONNX_DIR, quantized=quantized)
+    vectors, batch_s = time_batch(model)
+    p50, p95 = time_queries(model)
+
+    cos = np.sum(vectors * ref_vectors, axis=1)
+    overlap = topk_overlap(model.encode(QUERIES, normalize_embeddings=True), vectors, ref_vectors)
+    rows.append((label, batch_s, p50, p95, float(cos.mean()), overlap))
+    print(f"  cos vs torch: mean={cos.mean():.4f} min={cos.min():.4f}")
+
+    if stored is not None:
+        stored_cos = np.sum(stored[:len(texts)] * vectors, axis=1)
+        print(f"  cos vs stored course_embeddings.npy: mean={stored_cos.mean():.4f} "
+              f"min={stored_cos.min():.4f}")
+
+# ============================
+# SUMMARY
+# ============================
+print("\n📊 Backend comparison")
+print(f"{'backend':<12} {'batch (s)':>10} {'recs/s':>8} {'q p50 ms':>9} {'q p95 ms':>9} "
+      f"{'cos':>7} {'top5':>6}")
+for label, batch_s, p50, p95, cos, overlap in rows:
+    print(f"{label:<12} {batch_s:>10.2f} {len(texts) / batch_s:>8.1f} {p50:>9.1f} {p95:>9.1f} "
+          f"{cos:>7.4f} {overlap:>6.2f}")
@@ -0,0 +1,80 @@
+import os, sys
+import numpy as np
+
+# ============================
+# PATHS
+# ============================
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))     # backend/scripts
+BACKEND_DIR = os.path.dirname(SCRIPT_DIR)                  # backend
+sys.path.insert(0, BACKEND_DIR)
+
+from services.embedding_manifest import manifest_hash, manifest_path
+from services.embedding_store import load_embedding_matrix, save_compact_matrix
+
+EMB_DIR = os.path.join(BACKEND_DIR, "embeddings")
+META_DIR = os.path.join(BACKEND_DIR, "metadata")
+
+# (matrix, manifest kind): bản compact được gắn hash manifest của matrix nguồn
+MATRIX_FILES = [
+    (os.path.join(EMB_DIR, "job_embeddings.npy"), "job"),
+    (os.path.join(EMB_DIR, "course_embeddings.npy"), "course"),
+    (os.path.join(EMB_DIR, "cv_embeddings.npy"), "cv"),
+    (os.path.join(EMB_DIR, "user_cv_embeddings.npy"), None),
+]
+SKILL_EMB_FILE = os.path.join(EMB_DIR, "skill_embeddings.npy")
+
+TOP_K = 5
+NUM_QUERIES = 500
+
+# ============================
+# QUERIES
+# ============================
+# Truy vấn thật của /recommend-courses là vector tập skills → dùng bảng vector
+# skill (scripts/embed_skills.py) nếu có, nếu không thì trộn ngẫu nhiên 2 row
+rng = np.random.default_rng(0)
+
+def build_queries(matrix):
+    if os.path.exists(SKILL_EMB_FILE):
+        skills = np.load(SKILL_EMB_FILE)
+        if skills.shape[1] == matrix.shape[1]:
+            picks = rng.integers(0, len(skills), size=(NUM_QUERIES, 3))
+            queries = skills[picks].mean(axis=1)
+            return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+    picks = rng.integers(0, len(matrix), size=(NUM_QUERIES, 2))
+    queries = matrix[picks].mean(axis=1)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+def topk(scores, k):
+    k = min(k, len(scores))
+    return set(np.argpartition(-scores, k - 1)[:k])
+
+def recall_at_k(reference, compact, queries):
+    hits = 0
+    for q in queries:
+        hits += len(topk(reference @ q, TOP_K) & topk(compact.scores(q), TOP_K))
+    return hits / (len(queries) * min(TOP_K, len(reference)))
+
+# ============================
+# CONVERT + MEASURE
+# ============================
+print(f"{'matrix':<28} {'format':<8} {'MB':>8} {'recall@5':>9} {'max |err|':>10}")
+for emb_path, kind in MATRIX_FILES:
+    if not os.path.exists(emb_path):
+        print(f"⚠️ Skipping {os.path.basename(emb_path)}: not found")
+        continue
+
+    reference = np.load(emb_path).astype(np.float32)
+    source_hash = manifest_hash(manifest_path(META_DIR, kind)) if kind else None
+    queries = build_queries(reference)
+    name = os.path.basename(emb_path)
+    print(f"{name:<28} {'float32':<8} {reference.nbytes / 1e6:>8.2f} {1.0:>9.4f} {0.0:>10.5f}")
+
+    for storage in ("float16", "int8"):
+        save_compact_matrix(emb_path, reference, storage, source_hash)
+        compact = load_embedding_matrix(emb_path, storage, mmap=True, source_hash=source_hash)
+        err = float(np.abs(compact.to_float32() - reference).max())
+        recall = recall_at_k(reference, compact, queries)
+        print(f"{'':<28} {storage:<8} {compact.nbytes / 1e6:>8.2f} {recall:>9.4f} {err:>10.5f}")
+
+print("\n🎉 DONE — set EMBEDDING_STORAGE=float16|int8 to serve the compact copies")
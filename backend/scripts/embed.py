@@ -1,13 +1,19 @@
 import json
-import numpy as np
-from sentence_transformers import SentenceTransformer
 import os
+import sys
 
 # ============================
 # CONFIG (FIXED FOR YOUR STRUCTURE)
 # ============================
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))   # backend/scripts
 BACKEND_DIR = os.path.dirname(SCRIPT_DIR)                # backend
+sys.path.insert(0, BACKEND_DIR)
+
+from services.encoder_service import EMBEDDING_MODEL_NAME, load_embedding_model
+from services.embedding_manifest import incremental_encode, manifest_hash, manifest_path
+from services.embedding_store import refresh_compact_copies
+from services.embedding_texts import build_job_text, build_course_text
+from services.vector_index import refresh_vector_indexes
 
 DATA_DIR = os.path.join(BACKEND_DIR, "data")
 EMB_DIR = os.path.join(BACKEND_DIR, "embeddings")
@@ -26,12 +32,33 @@ COURSE_EMB_FILE = os.path.join(EMB_DIR, "course_embeddings.npy")
 JOB_META_FILE = os.path.join(META_DIR, "job_metadata.json")
 COURSE_META_FILE = os.path.join(META_DIR, "course_metadata.json")
 
+# Manifest (content hash từng record) → chỉ encode lại record mới/đã sửa
+JOB_MANIFEST_FILE = manifest_path(META_DIR, "job")
+COURSE_MANIFEST_FILE = manifest_path(META_DIR, "course")
+
+# PCA index của course được build đúng số chiều server đọc
+COURSE_INDEX_DIMS = int(os.getenv("COURSE_INDEX_DIMS", "256"))
+# ANN index cho job / course (server VECTOR_INDEX=auto dùng nó): "ivf" | "hnsw" | "" (không build)
+ANN_INDEX = os.getenv("ANN_INDEX", "ivf").strip().lower()
+
 # ============================
-# 1) LOAD MODEL
+# 1) LOAD MODEL (LAZY)
 # ============================
-print("🔧 Loading embedding model: BAAI/bge-m3 ...")
-model = SentenceTransformer("BAAI/bge-m3")
-print("✔ Model loaded!")
+# Model chỉ được load khi có record cần encode (sửa 1 dòng catalog ≠ chạy lại từ đầu)
+model = None
+
+def encode(texts):
+    global model
+    if model is None:
+        print("🔧 Loading embedding model: BAAI/bge-m3 ...")
+        model = load_embedding_model()  # EMBEDDING_BACKEND=torch|onnx
+        print("✔ Model loaded!")
+    return model.encode(
+        texts,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=True
+    )
 
 # ============================
 # 2) LOAD DATA
@@ -52,47 +79,9 @@ print(f"📄 Loaded {len(jobs)} jobs")
 print(f"📄 Loaded {len(courses)} courses")
 
 # ============================
-# 3) BUILD TEXT
-# ============================
-def build_job_text(job: dict) -> str:
-    title = job.get("title", "")
-    company = job.get("company", "")
-    location = job.get("location", "")
-    desc = job.get("job_description", "")
-
-    req = job.get("requirements", {})
-    skills_required = req.get("skills_required", [])
-    nice_to_have = req.get("nice_to_have", [])
-
-    return (
-        f"Job title: {title}. "
-        f"Company: {company}. "
-        f"Location: {location}. "
-        f"Description: {desc}. "
-        f"Required skills: {', '.join(skills_required)}. "
-        f"Nice to have skills: {', '.join(nice_to_have)}."
-    )
-
-# ⚠️ Course ưu tiên field "text" nếu có
-def build_course_text(course: dict) -> str:
-    if course.get("text"):
-        return course["text"]
-
-    name = course.get("name", "")
-    desc = course.get("description", "")
-    provider = course.get("provider", "")
-    skills = course.get("skills_outcomes", [])
-
-    return (
-        f"Course name: {name}. "
-        f"Description: {desc}. "
-        f"Skills outcomes: {', '.join(skills)}. "
-        f"Provider: {provider}."
-    )
-
-# ============================
-# 4) EMBEDDING JOBS
+# 3) EMBEDDING JOBS
 # ============================
+# Text builders dùng chung (services/embedding_texts.py) → hash trong manifest ổn định
 print("\n📌 Embedding JOBS...")
 
 job_texts = []
@@ -107,17 +96,19 @@ for job in jobs:
         "text": text
     })
 
-job_vectors = model.encode(
+job_vectors, job_stats = incremental_encode(
+    [m["job_id"] for m in job_metadata],
     job_texts,
-    convert_to_numpy=True,
-    normalize_embeddings=True,
-    show_progress_bar=True
+    JOB_EMB_FILE,
+    JOB_MANIFEST_FILE,
+    encode,
+    EMBEDDING_MODEL_NAME
 )
 
-print(f"✔ Embedded {len(job_vectors)} JOB vectors")
+print(f"✔ {len(job_vectors)} JOB vectors (encoded {job_stats['encoded']}, reused {job_stats['reused']})")
 
 # ============================
-# 5) EMBEDDING COURSES
+# 4) EMBEDDING COURSES
 # ============================
 print("\n📌 Embedding COURSES...")
 
@@ -133,20 +124,30 @@ for course in courses:
         "text": text
     })
 
-course_vectors = model.encode(
+course_vectors, course_stats = incremental_encode(
+    [m["course_id"] for m in course_metadata],
     course_texts,
-    convert_to_numpy=True,
-    normalize_embeddings=True,
-    show_progress_bar=True
+    COURSE_EMB_FILE,
+    COURSE_MANIFEST_FILE,
+    encode,
+    EMBEDDING_MODEL_NAME
 )
 
-print(f"✔ Embedded {len(course_vectors)} COURSE vectors")
+print(f"✔ {len(course_vectors)} COURSE vectors (encoded {course_stats['encoded']}, reused {course_stats['reused']})")
 
 # ============================
-# 6) SAVE FILES
+# 5) SAVE FILES
 # ============================
-np.save(JOB_EMB_FILE, job_vectors)
-np.save(COURSE_EMB_FILE, course_vectors)
+# Bản float16/int8 và index (PCA/IVF/HNSW) phải khớp matrix mới: server bỏ qua
+# file lệch hash manifest. PCA course (search 2 bước) và ANN_INDEX luôn được build
+derived_files = []
+for emb_file, manifest_file, pca_dims in [
+    (JOB_EMB_FILE, JOB_MANIFEST_FILE, None),
+    (COURSE_EMB_FILE, COURSE_MANIFEST_FILE, COURSE_INDEX_DIMS),
+]:
+    source_hash = manifest_hash(manifest_file)
+    derived_files += refresh_compact_copies(emb_file, source_hash)
+    derived_files += refresh_vector_indexes(emb_file, source_hash, pca_dims, ANN_INDEX or None)
 
 with open(JOB_META_FILE, "w", encoding="utf-8") as f:
     json.dump(job_metadata, f, ensure_ascii=False, indent=2)
@@ -154,8 +155,10 @@ with open(JOB_META_FILE, "w", encoding="utf-8") as f:
 with open(COURSE_META_FILE, "w", encoding="utf-8") as f:
     json.dump(course_metadata, f, ensure_ascii=False, indent=2)
 
-print("\n🎉 DONE — Embedding regenerated successfully!")
-print(f"💾 Saved: {JOB_EMB_FILE}")
-print(f"💾 Saved: {COURSE_EMB_FILE}")
+print("\n🎉 DONE — Embeddings up to date!")
+print(f"💾 Saved: {JOB_EMB_FILE} + {JOB_MANIFEST_FILE}")
+print(f"💾 Saved: {COURSE_EMB_FILE} + {COURSE_MANIFEST_FILE}")
+for path in derived_files:
+    print(f"💾 Refreshed: {path}")
 print(f"💾 Saved: {JOB_META_FILE}")
 print(f"💾 Saved: {COURSE_META_FILE}")
@@ -0,0 +1,68 @@
+import os, sys, json
+import numpy as np
+
+# ============================
+# PATHS
+# ============================
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))     # backend/scripts
+BACKEND_DIR = os.path.dirname(SCRIPT_DIR)                  # backend
+sys.path.insert(0, BACKEND_DIR)
+
+from services.encoder_service import load_embedding_model
+from services.skill_taxonomy import get_taxonomy, normalize_skill, normalize_skill_list
+
+DATA_DIR = os.path.join(BACKEND_DIR, "data")
+EMB_DIR  = os.path.join(BACKEND_DIR, "embeddings")
+META_DIR = os.path.join(BACKEND_DIR, "metadata")
+
+os.makedirs(EMB_DIR, exist_ok=True)
+os.makedirs(META_DIR, exist_ok=True)
+
+JOBS_FILE = os.path.join(DATA_DIR, "jobs.json")
+COURSES_FILE = os.path.join(DATA_DIR, "courses.json")
+CVS_FILE = os.path.join(DATA_DIR, "cvs.json")
+
+SKILL_EMB_FILE = os.path.join(EMB_DIR, "skill_embeddings.npy")
+SKILL_META_FILE = os.path.join(META_DIR, "skill_metadata.json")
+
+# ============================
+# BUILD VOCABULARY
+# ============================
+# Skill được lưu ở dạng đã chuẩn hóa (normalize_skill) — đúng key mà backend tra cứu
+jobs = json.load(open(JOBS_FILE, encoding="utf-8"))
+courses = json.load(open(COURSES_FILE, encoding="utf-8"))
+cvs = json.load(open(CVS_FILE, encoding="utf-8"))
+
+vocab = {normalize_skill(s) for s in get_taxonomy().all_skills}
+for job in jobs:
+    req = job.get("requirements", {})
+    vocab |= normalize_skill_list(req.get("skills_required", []))
+    vocab |= normalize_skill_list(req.get("nice_to_have", []))
+for course in courses:
+    vocab |= normalize_skill_list(course.get("skills_outcomes", []))
+for cv in cvs:
+    vocab |= normalize_skill_list(cv.get("skills", []))
+
+skills = sorted(s for s in vocab if s)
+print(f"📄 Skill vocabulary: {len(skills)} skills")
+
+# ============================
+# LOAD MODEL
+# ============================
+print("🔧 Loading embedding model: BAAI/bge-m3 ...")
+model = load_embedding_model()  # EMBEDDING_BACKEND=torch|onnx
+print("✅ Model loaded!")
+
+# ============================
+# ENCODE + SAVE
+# ============================
+print("\n🚀 Encoding SKILL embeddings...")
+skill_vectors = model.encode(skills, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=True)
+np.save(SKILL_EMB_FILE, skill_vectors)
+print("✅ Saved:", SKILL_EMB_FILE, skill_vectors.shape)
+
+with open(SKILL_META_FILE, "w", encoding="utf-8") as f:
+    json.dump([{"skill": s} for s in skills], f, ensure_ascii=False, indent=2)
+print("✅ Saved:", SKILL_META_FILE)
+
+print("\n🎉 DONE — Skill embedding table generated!")
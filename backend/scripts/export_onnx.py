@@ -0,0 +1,67 @@
+import os, sys
+import torch
+from transformers import AutoModel, AutoTokenizer
+from onnxruntime.quantization import QuantType, quantize_dynamic
+
+# ============================
+# PATHS
+# ============================
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))     # backend/scripts
+BACKEND_DIR = os.path.dirname(SCRIPT_DIR)                  # backend
+sys.path.insert(0, BACKEND_DIR)
+
+from services.encoder_service import DEFAULT_ONNX_DIR, EMBEDDING_MODEL_NAME
+from services.onnx_encoder import MODEL_FILE, QUANTIZED_MODEL_FILE
+
+OUT_DIR = os.getenv("ONNX_MODEL_DIR", DEFAULT_ONNX_DIR)
+os.makedirs(OUT_DIR, exist_ok=True)
+
+MODEL_PATH = os.path.join(OUT_DIR, MODEL_FILE)
+QUANTIZED_PATH = os.path.join(OUT_DIR, QUANTIZED_MODEL_FILE)
+
+# ============================
+# LOAD MODEL
+# ============================
+print(f"🔧 Loading {EMBEDDING_MODEL_NAME} (transformer only, no pooling) ...")
+tokenizer = AutoTokenizer.from_pretrained(EMBEDDING_MODEL_NAME)
+model = AutoModel.from_pretrained(EMBEDDING_MODEL_NAME)
+model.eval()
+tokenizer.save_pretrained(OUT_DIR)
+print("✅ Model loaded!")
+
+# ============================
+# EXPORT FP32 ONNX
+# ============================
+# fp32 bge-m3 > 2GB → torch ghi weights ra file external data cạnh model.onnx
+print("\n🚀 Exporting ONNX (fp32)...")
+dummy = tokenizer(["python sql docker"], return_tensors="pt")
+with torch.no_grad():
+    torch.onnx.export(
+        model,
+        (dummy["input_ids"], dummy["attention_mask"]),
+        MODEL_PATH,
+        input_names=["input_ids", "attention_mask"],
+        output_names=["last_hidden_state"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "last_hidden_state": {0: "batch", 1: "sequence"},
+        },
+        opset_version=17,
+        do_constant_folding=True,
+    )
+print("✅ Saved:", MODEL_PATH)
+
+# ============================
+# INT8 DYNAMIC QUANTIZATION
+# ============================
+print("\n🚀 Quantizing (int8 dynamic)...")
+quantize_dynamic(
+    MODEL_PATH,
+    QUANTIZED_PATH,
+    weight_type=QuantType.QInt8,
+    use_external_data_format=False,
+)
+print("✅ Saved:", QUANTIZED_PATH)
+
+print("\n🎉 DONE — run scripts/check_onnx_parity.py to validate the export")
@@ -1,12 +1,18 @@
-import os, json
-import numpy as np
-from sentence_transformers import SentenceTransformer
+import os, sys, json, time
 
 # ============================
 # PATHS
 # ============================
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))     # backend/scripts
 BACKEND_DIR = os.path.dirname(SCRIPT_DIR)                  # backend
+sys.path.insert(0, BACKEND_DIR)
+
+from services.encoder_service import EMBEDDING_MODEL_NAME, load_embedding_model
+from services.embedding_manifest import incremental_encode, manifest_hash, manifest_path
+from services.embedding_store import refresh_compact_copies
+from services.bulk_embedding import DEFAULT_SHARD_SIZE, ShardedEncoder, checkpoint_dir
+from services.embedding_texts import build_job_text, build_course_text, build_cv_text
+from services.vector_index import refresh_vector_indexes
 
 DATA_DIR = os.path.join(BACKEND_DIR, "data")
 EMB_DIR  = os.path.join(BACKEND_DIR, "embeddings")
@@ -23,69 +29,113 @@ JOB_EMB_FILE = os.path.join(EMB_DIR, "job_embeddings.npy")
 COURSE_EMB_FILE = os.path.join(EMB_DIR, "course_embeddings.npy")
 CV_EMB_FILE = os.path.join(EMB_DIR, "cv_embeddings.npy")
 
-# ============================
-# LOAD MODEL
-# ============================
-print("🔧 Loading embedding model: BAAI/bge-m3 ...")
-model = SentenceTransformer("BAAI/bge-m3")
-print("✅ Model loaded!")
+# Metadata giữ id theo đúng thứ tự row → backend tra cứu vector theo id
+JOB_META_FILE = os.path.join(META_DIR, "job_metadata.json")
+COURSE_META_FILE = os.path.join(META_DIR, "course_metadata.json")
 
-# ============================
-# LOAD DATA
-# ============================
-jobs = json.load(open(JOBS_FILE, encoding="utf-8"))
-courses = json.load(open(COURSES_FILE, encoding="utf-8"))
-cvs = json.load(open(CVS_FILE, encoding="utf-8"))
+# Manifest: content hash từng record → lần chạy sau chỉ encode record mới/đã sửa
+JOB_MANIFEST_FILE = manifest_path(META_DIR, "job")
+COURSE_MANIFEST_FILE = manifest_path(META_DIR, "course")
+CV_MANIFEST_FILE = manifest_path(META_DIR, "cv")
 
-print(f"📄 Jobs: {len(jobs)}")
-print(f"📄 Courses: {len(courses)}")
-print(f"📄 CVs: {len(cvs)}")
+# PCA index của course được build đúng số chiều server đọc
+COURSE_INDEX_DIMS = int(os.getenv("COURSE_INDEX_DIMS", "256"))
+# ANN index cho job / course (server VECTOR_INDEX=auto dùng nó): "ivf" | "hnsw" | "" (không build)
+ANN_INDEX = os.getenv("ANN_INDEX", "ivf").strip().lower()
 
-# ============================
-# BUILD TEXT
-# ============================
-def build_job_text(job):
-    title = job.get("title", "")
-    desc = job.get("job_description", job.get("description", ""))
-    req = job.get("requirements", {})
-    skills_required = req.get("skills_required", [])
-    nice = req.get("nice_to_have", [])
-    return f"{title}. {desc}. Required: {', '.join(skills_required)}. Nice: {', '.join(nice)}"
-
-def build_course_text(course):
-    name = course.get("name", "")
-    desc = course.get("description", "")
-    skills = course.get("skills_outcomes", [])
-    provider = course.get("provider", "")
-    return f"{name}. {desc}. Outcomes: {', '.join(skills)}. Provider: {provider}"
-
-def build_cv_text(cv):
-    skills = ", ".join(cv.get("skills", []))
-    summary = cv.get("summary", "")
-    exp = cv.get("experiences", "")
-    edu = cv.get("education", "")
-    return f"Skills: {skills}. Summary: {summary}. Experience: {exp}. Education: {edu}"
-
-job_texts = [build_job_text(j) for j in jobs]
-course_texts = [build_course_text(c) for c in courses]
-cv_texts = [build_cv_text(cv) for cv in cvs]
+# Bulk mode: EMBED_WORKERS>=1 → chia record thành shard cho N process, checkpoint
+# từng shard trong <matrix>.shards/ → chạy lại sau khi bị ngắt sẽ tiếp tục từ đó
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "0"))
+EMBED_SHARD_SIZE = int(os.getenv("EMBED_SHARD_SIZE", str(DEFAULT_SHARD_SIZE)))
 
 # ============================
-# ENCODE + SAVE
+# LOAD MODEL (LAZY)
 # ============================
-print("\n🚀 Encoding JOB embeddings...")
-job_vectors = model.encode(job_texts, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=True)
-np.save(JOB_EMB_FILE, job_vectors)
-print("✅ Saved:", JOB_EMB_FILE, job_vectors.shape)
-
-print("\n🚀 Encoding COURSE embeddings...")
-course_vectors = model.encode(course_texts, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=True)
-np.save(COURSE_EMB_FILE, course_vectors)
-print("✅ Saved:", COURSE_EMB_FILE, course_vectors.shape)
-
-print("\n🚀 Encoding CV embeddings...")
-cv_vectors = model.encode(cv_texts, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=True)
-np.save(CV_EMB_FILE, cv_vectors)
-print("✅ Saved:", CV_EMB_FILE, cv_vectors.shape)
-
-print("\n🎉 DONE — All embeddings regenerated successfully!")
+# Chỉ load model khi thực sự có record cần encode
+model = None
+
+def encode(texts):
+    global model
+    if model is None:
+        print("🔧 Loading embedding model: BAAI/bge-m3 ...")
+        model = load_embedding_model()  # EMBEDDING_BACKEND=torch|onnx
+        print("✅ Model loaded!")
+    return model.encode(texts, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=True)
+
+sharded = ShardedEncoder(EMBED_WORKERS, EMBED_SHARD_SIZE) if EMBED_WORKERS > 0 else None
+
+def build(label, ids, texts, emb_file, manifest_file, pca_dims=None, ann_kind=None):
+    print(f"\n🚀 Encoding {label} embeddings (incremental)...")
+    if sharded is not None:
+        encode_fn = lambda todo: sharded.encode(todo, checkpoint_dir(emb_file))
+    else:
+        encode_fn = encode
+    started = time.perf_counter()
+    vectors, stats = incremental_encode(ids, texts, emb_file, manifest_file, encode_fn, EMBEDDING_MODEL_NAME)
+    seconds = time.perf_counter() - started
+    rate = stats["encoded"] / seconds if seconds else 0.0
+    print(f"✅ Saved: {emb_file} {vectors.shape} | "
+          f"encoded={stats['encoded']} reused={stats['reused']} removed={stats['removed']} | "
+          f"{seconds:.1f}s, {rate:.1f} records/s")
+    # Bản float16/int8 và index (PCA/IVF/HNSW) phải khớp matrix mới: server bỏ qua file lệch hash manifest
+    source_hash = manifest_hash(manifest_file)
+    for path in refresh_compact_copies(emb_file, source_hash) + refresh_vector_indexes(emb_file, source_hash, pca_dims, ann_kind):
+        print("✅ Refreshed:", path)
+
+def main():
+    # ============================
+    # LOAD DATA
+    # ============================
+    jobs = json.load(open(JOBS_FILE, encoding="utf-8"))
+    courses = json.load(open(COURSES_FILE, encoding="utf-8"))
+    cvs = json.load(open(CVS_FILE, encoding="utf-8"))
+
+    print(f"📄 Jobs: {len(jobs)}")
+    print(f"📄 Courses: {len(courses)}")
+    print(f"📄 CVs: {len(cvs)}")
+
+    # ============================
+    # BUILD TEXT
+    # ============================
+    job_texts = [build_job_text(j) for j in jobs]
+    course_texts = [build_course_text(c) for c in courses]
+    cv_texts = [build_cv_text(cv) for cv in cvs]
+
+    # ============================
+    # ENCODE + SAVE
+    # ============================
+    build("JOB", [j.get("job_id") for j in jobs], job_texts, JOB_EMB_FILE, JOB_MANIFEST_FILE,
+          ann_kind=ANN_INDEX or None)
+
+    job_metadata = [
+        {"job_id": j.get("job_id"), "title": j.get("title"), "text": t}
+        for j, t in zip(jobs, job_texts)
+    ]
+    with open(JOB_META_FILE, "w", encoding="utf-8") as f:
+        json.dump(job_metadata, f, ensure_ascii=False, indent=2)
+    print("✅ Saved:", JOB_META_FILE)
+
+    # PCA index cho course search 2 bước + ANN index
+    build("COURSE", [c.get("course_id") for c in courses], course_texts, COURSE_EMB_FILE, COURSE_MANIFEST_FILE,
+          pca_dims=COURSE_INDEX_DIMS, ann_kind=ANN_INDEX or None)
+
+    course_metadata = [
+        {"course_id": c.get("course_id"), "name": c.get("name"), "text": t}
+        for c, t in zip(courses, course_texts)
+    ]
+    with open(COURSE_META_FILE, "w", encoding="utf-8") as f:
+        json.dump(course_metadata, f, ensure_ascii=False, indent=2)
+    print("✅ Saved:", COURSE_META_FILE)
+
+    build("CV", [cv.get("cv_id") for cv in cvs], cv_texts, CV_EMB_FILE, CV_MANIFEST_FILE)
+
+    print("\n🎉 DONE — All embeddings up to date!")
+
+    if sharded is not None:
+        print(f"📊 Bulk build: {sharded.summary()}")
+        sharded.close()
+
+
+# Guard bắt buộc: worker process (spawn) import lại module này
+if __name__ == "__main__":
+    main()
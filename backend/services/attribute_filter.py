@@ -0,0 +1,91 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class AttributeBitmaps:
+    """
+    Boolean row masks of catalog attributes, built once at load.
+
+    Categorical fields (level, provider, ...) get one mask per distinct value,
+    matched case-insensitively; numeric fields (rating, ...) are kept as a
+    float column where missing values take the field's entry in ``defaults``,
+    or stay NaN (never passing a minimum) if it has none.
+    A filter is the AND of a few masks, cheap enough to hand to a vector
+    search before its top-k.
+    """
+
+    def __init__(
+        self,
+        records: Sequence[dict],
+        categorical: Iterable[str] = (),
+        numeric: Iterable[str] = (),
+        defaults: Optional[Dict[str, float]] = None
+    ):
+        self.size = len(records)
+        self.categories: Dict[str, Dict[str, np.ndarray]] = {}
+        for field in categorical:
+            rows = defaultdict(list)
+            for i, record in enumerate(records):
+                value = record.get(field)
+                if value not in (None, ""):
+                    rows[self._key(value)].append(i)
+            masks = {}
+            for value, idx in rows.items():
+                mask = np.zeros(self.size, dtype=bool)
+                mask[idx] = True
+                masks[value] = mask
+            self.categories[field] = masks
+        defaults = defaults or {}
+        self.numbers: Dict[str, np.ndarray] = {}
+        for field in numeric:
+            column = np.array([_to_float(r.get(field)) for r in records], dtype=np.float64)
+            if field in defaults:
+                column[np.isnan(column)] = defaults[field]
+            self.numbers[field] = column
+
+    @staticmethod
+    def _key(value) -> str:
+        return str(value).strip().lower()
+
+    def values(self, field: str) -> List[str]:
+        """Distinct (lowercased) values of a categorical field."""
+        return sorted(self.categories.get(field, {}))
+
+    def mask(
+        self,
+        equals: Optional[Dict[str, Optional[str]]] = None,
+        minimum: Optional[Dict[str, Optional[float]]] = None
+    ) -> Optional[np.ndarray]:
+        """
+        Rows passing every given filter; None / empty values are ignored.
+
+        Args:
+            equals: Categorical field → required value
+            minimum: Numeric field → smallest accepted value
+
+        Returns:
+            Boolean mask, or None if no filter was given (every row passes)
+        """
+        result = None
+        for field, value in (equals or {}).items():
+            if value in (None, ""):
+                continue
+            mask = self.categories[field].get(self._key(value))
+            if mask is None:
+                mask = np.zeros(self.size, dtype=bool)
+            result = mask if result is None else result & mask
+        for field, value in (minimum or {}).items():
+            if value is None:
+                continue
+            mask = self.numbers[field] >= value
+            result = mask if result is None else result & mask
+        return result
@@ -0,0 +1,166 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHARD_SIZE = 512
+
+# Model of the current worker process (set by _init_worker)
+_worker_model = None
+
+
+def checkpoint_dir(emb_path: str) -> str:
+    """``course_embeddings.npy`` → ``course_embeddings.shards/``"""
+    base = emb_path[:-4] if emb_path.endswith(".npy") else emb_path
+    return f"{base}.shards"
+
+
+def shard_digest(texts: Sequence[str]) -> str:
+    """Content hash of a shard, so a checkpoint is only reused for the same texts."""
+    h = hashlib.sha256()
+    for text in texts:
+        h.update(text.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()[:16]
+
+
+def plan_shards(texts: Sequence[str], shard_size: int = DEFAULT_SHARD_SIZE) -> List[np.ndarray]:
+    """
+    Split texts into shards of similar length.
+
+    Texts are sorted by length (longest first) before cutting, so every batch
+    a worker encodes pads to roughly the same length.
+
+    Returns:
+        Per shard, the positions of its texts in ``texts``
+    """
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+    order = np.argsort(-lengths, kind="stable")
+    shard_size = max(1, shard_size)
+    return [order[i:i + shard_size] for i in range(0, len(order), shard_size)]
+
+
+def _init_worker(num_threads: int) -> None:
+    global _worker_model
+    from services.encoder_service import load_embedding_model
+
+    _worker_model = load_embedding_model(num_threads=num_threads)
+
+
+def _encode_shard(path: str, texts: List[str]) -> Tuple[str, int, float]:
+    started = time.perf_counter()
+    vectors = _worker_model.encode(
+        texts, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False
+    )
+    # Ghi file tạm rồi rename: shard bị ngắt giữa chừng không bao giờ bị coi là xong
+    tmp_path = f"{path}.tmp.npy"
+    np.save(tmp_path, np.asarray(vectors, dtype=np.float32))
+    os.replace(tmp_path, path)
+    return path, len(texts), time.perf_counter() - started
+
+
+class ShardedEncoder:
+    """
+    Encode large text lists across worker processes with per-shard checkpoints.
+
+    Each worker loads its own model once (``load_embedding_model``, so
+    ``EMBEDDING_BACKEND`` applies) with the cores split evenly between
+    workers. Finished shards are saved as ``shard_<n>_<digest>.npy`` in the
+    checkpoint directory; a rerun after a crash loads them instead of
+    encoding again. The directory is removed once the full matrix is built.
+    """
+
+    def __init__(self, num_workers: int = 1, shard_size: int = DEFAULT_SHARD_SIZE):
+        self.num_workers = max(1, num_workers)
+        self.shard_size = max(1, shard_size)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.records = 0
+        self.resumed = 0
+        self.seconds = 0.0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            threads = max(1, (os.cpu_count() or 1) // self.num_workers)
+            # spawn: an unguarded fork after torch has started threads can deadlock
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.num_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(threads,)
+            )
+        return self._pool
+
+    def encode(self, texts: Sequence[str], checkpoint: str) -> np.ndarray:
+        """
+        Encode ``texts`` (normalized vectors, in input order).
+
+        Args:
+            texts: Texts to encode
+            checkpoint: Directory for shard checkpoints of this matrix
+
+        Returns:
+            float32 matrix with one row per text
+        """
+        started = time.perf_counter()
+        os.makedirs(checkpoint, exist_ok=True)
+
+        shards = plan_shards(texts, self.shard_size)
+        paths = []
+        pending: Dict[str, List[str]] = {}
+        for n, rows in enumerate(shards):
+            shard_texts = [texts[i] for i in rows]
+            path = os.path.join(checkpoint, f"shard_{n:05d}_{shard_digest(shard_texts)}.npy")
+            paths.append(path)
+            if os.path.exists(path):
+                self.resumed += len(rows)
+            else:
+                pending[path] = shard_texts
+
+        if len(pending) < len(shards):
+            print(f"♻️ Resuming: {len(shards) - len(pending)}/{len(shards)} shards already done")
+
+        if pending:
+            pool = self._get_pool()
+            futures = [pool.submit(_encode_shard, path, t) for path, t in pending.items()]
+            done = 0
+            for future in as_completed(futures):
+                _, count, seconds = future.result()
+                done += 1
+                print(f"   shard {done}/{len(pending)}: {count} records in {seconds:.1f}s")
+
+        dim = None
+        matrix = None
+        for rows, path in zip(shards, paths):
+            vectors = np.load(path)
+            if matrix is None:
+                dim = vectors.shape[1]
+                matrix = np.empty((len(texts), dim), dtype=np.float32)
+            matrix[rows] = vectors
+        if matrix is None:
+            matrix = np.empty((0, 0), dtype=np.float32)
+
+        shutil.rmtree(checkpoint, ignore_errors=True)
+        self.records += len(texts)
+        self.seconds += time.perf_counter() - started
+        return matrix
+
+    def summary(self) -> str:
+        encoded = self.records - self.resumed
+        rate = encoded / self.seconds if self.seconds else 0.0
+        return (
+            f"{self.records} records ({encoded} encoded, {self.resumed} from checkpoints) "
+            f"in {self.seconds:.1f}s → {rate:.1f} records/s with {self.num_workers} workers"
+        )
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
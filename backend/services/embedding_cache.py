@@ -0,0 +1,91 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+import numpy as np
+
+
+def canonical_skill_key(skills: Iterable[str]) -> Tuple[str, ...]:
+    """
+    Build an order-independent cache key for a bag of skills.
+
+    Skills are lowercased, stripped, deduplicated and sorted, so the same
+    set always produces the same key (and the same text to encode).
+    """
+    return tuple(sorted({
+        s.strip().lower() for s in skills
+        if isinstance(s, str) and s.strip()
+    }))
+
+
+class EmbeddingCache:
+    """
+    Bounded, thread-safe LRU cache of query embeddings.
+
+    Cached vectors are marked read-only so callers cannot mutate a shared
+    entry in place.
+    """
+
+    def __init__(self, max_size: int = 2048):
+        self.max_size = max(1, max_size)
+        self._data: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[np.ndarray]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: np.ndarray) -> np.ndarray:
+        value = np.asarray(value)
+        value.setflags(write=False)
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], np.ndarray]
+    ) -> np.ndarray:
+        """
+        Return the cached vector for ``key``, computing it on a miss.
+
+        The computation runs outside the lock, so two threads missing on the
+        same key may both compute it; the last result wins.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        return self.put(key, compute())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
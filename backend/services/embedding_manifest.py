@@ -0,0 +1,290 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.embedding_texts import TEXT_BUILDER_VERSION
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+
+class EmbeddingManifestError(Exception):
+    """Raised when an embedding matrix does not match its manifest"""
+    pass
+
+
+def text_hash(text: str) -> str:
+    """Content hash of the text a record was embedded from."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def manifest_path(meta_dir: str, kind: str) -> str:
+    """``metadata/<kind>_manifest.json`` (next to ``<kind>_metadata.json``)."""
+    return os.path.join(meta_dir, f"{kind}_manifest.json")
+
+
+def load_manifest(path: str) -> Optional[dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(path: str, manifest: dict) -> None:
+    """Write a manifest atomically (tmp + rename)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def matrix_hash(emb_path: str) -> str:
+    """
+    Content hash of a matrix file. The manifest records it, so a matrix
+    replaced without its manifest (crash between the two writes) is detected.
+    """
+    digest = hashlib.sha256()
+    with open(emb_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def manifest_hash(manifest_file: str) -> Optional[str]:
+    """
+    Content hash of a manifest file, or None if there is none.
+
+    The manifest lists every record id, text hash and the model, so its hash
+    changes whenever any row of the matrix does. Files derived from a matrix
+    (compact copies, vector indexes) are stamped with it.
+    """
+    if not os.path.exists(manifest_file):
+        return None
+    with open(manifest_file, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def source_stamp_path(path: str) -> str:
+    """``course_embeddings.f16.npy`` → ``course_embeddings.f16.npy.source.json``"""
+    return f"{path}.source.json"
+
+
+def write_source_stamp(path: str, source_hash: Optional[str]) -> None:
+    """Record the manifest hash a derived file was built from (no-op without one)."""
+    if source_hash is None:
+        return
+    with open(source_stamp_path(path), "w", encoding="utf-8") as f:
+        json.dump({"manifest_hash": source_hash}, f)
+
+
+def matches_source(path: str, source_hash: Optional[str]) -> bool:
+    """
+    Whether a derived file was built from the matrix identified by
+    ``source_hash``. A file without a stamp does not match; with no
+    ``source_hash`` (matrix built without a manifest) nothing can be checked.
+    """
+    if source_hash is None:
+        return True
+    stamp = source_stamp_path(path)
+    if not os.path.exists(stamp):
+        return False
+    try:
+        with open(stamp, encoding="utf-8") as f:
+            return json.load(f).get("manifest_hash") == source_hash
+    except (OSError, ValueError):
+        return False
+
+
+def build_manifest(
+    ids: Sequence[str],
+    hashes: Sequence[str],
+    model_name: str,
+    dim: int,
+    builder_version: str = TEXT_BUILDER_VERSION,
+    matrix_digest: Optional[str] = None
+) -> dict:
+    return {
+        "manifest_version": MANIFEST_VERSION,
+        "model": model_name,
+        "text_builder_version": builder_version,
+        "dim": int(dim),
+        "rows": len(ids),
+        "matrix_hash": matrix_digest,
+        "records": [{"id": rid, "hash": h} for rid, h in zip(ids, hashes)],
+    }
+
+
+def _matrix_matches(manifest: dict, emb_path: str) -> bool:
+    """Whether ``emb_path`` is the matrix the manifest was written for (unknown for old manifests)."""
+    recorded = manifest.get("matrix_hash")
+    return recorded is None or recorded == matrix_hash(emb_path)
+
+
+def _compatible(manifest: dict, model_name: str, builder_version: str) -> bool:
+    return (
+        manifest.get("manifest_version") == MANIFEST_VERSION
+        and manifest.get("model") == model_name
+        and manifest.get("text_builder_version") == builder_version
+    )
+
+
+def incremental_encode(
+    ids: Sequence[str],
+    texts: Sequence[str],
+    emb_path: str,
+    manifest_file: str,
+    encode: Callable[[List[str]], np.ndarray],
+    model_name: str,
+    builder_version: str = TEXT_BUILDER_VERSION
+) -> Tuple[np.ndarray, Dict[str, int]]:
+    """
+    Re-encode only new or changed records and splice them into the matrix.
+
+    A row of the existing matrix is reused when the manifest has the same
+    record id with the same text hash, and the model name and text-builder
+    version match, and the manifest's ``matrix_hash`` is that of the matrix
+    on disk. Everything else is encoded in one ``encode`` call. The matrix
+    and manifest are rewritten in the order of ``ids``, matrix first; the
+    manifest commits the pair by recording the new matrix's hash. When no
+    record is re-encoded and the order is unchanged nothing is rewritten.
+
+    Returns:
+        (matrix, stats) where stats counts ``total``, ``reused``,
+        ``encoded`` and ``removed`` records
+    """
+    hashes = [text_hash(t) for t in texts]
+
+    previous: Dict[str, Tuple[int, str]] = {}
+    old_matrix = None
+    old = load_manifest(manifest_file)
+    if old is not None and os.path.exists(emb_path):
+        old_matrix = np.load(emb_path, mmap_mode="r")
+        if not _compatible(old, model_name, builder_version):
+            logger.info(f"Manifest {manifest_file} is for another model/builder, rebuilding")
+        elif old.get("rows") != len(old_matrix) or not _matrix_matches(old, emb_path):
+            logger.warning(f"⚠️ {emb_path} does not match its manifest, rebuilding")
+        else:
+            previous = {
+                r["id"]: (row, r["hash"]) for row, r in enumerate(old["records"])
+            }
+
+    todo = [
+        i for i, (rid, h) in enumerate(zip(ids, hashes))
+        if previous.get(rid, (None, None))[1] != h
+    ]
+
+    stats = {
+        "total": len(ids),
+        "reused": len(ids) - len(todo),
+        "encoded": len(todo),
+        "removed": len(set(previous) - set(ids)),
+    }
+
+    if not todo and old_matrix is not None and [r["id"] for r in old["records"]] == list(ids) \
+            and previous and old.get("matrix_hash") is not None:
+        logger.info(f"{emb_path} is up to date ({len(ids)} records)")
+        return np.array(old_matrix, dtype=np.float32), stats
+
+    encoded = None
+    if todo:
+        encoded = np.asarray(encode([texts[i] for i in todo]), dtype=np.float32)
+        dim = encoded.shape[1]
+    elif old_matrix is not None:
+        dim = old_matrix.shape[1]
+    else:
+        dim = 0
+
+    matrix = np.empty((len(ids), dim), dtype=np.float32)
+    todo_set = set(todo)
+    reuse_rows = [i for i in range(len(ids)) if i not in todo_set]
+    if reuse_rows:
+        matrix[reuse_rows] = old_matrix[[previous[ids[i]][0] for i in reuse_rows]]
+    if todo:
+        matrix[todo] = encoded
+
+    # Ghi ra file tạm rồi rename: matrix cũ có thể đang được mmap để đọc.
+    # Manifest ghi sau cùng, kèm hash của matrix mới → crash giữa hai bước để lại
+    # manifest cũ với hash cũ, lần chạy sau / server phát hiện được
+    tmp_path = f"{emb_path}.tmp.npy"
+    np.save(tmp_path, matrix)
+    digest = matrix_hash(tmp_path)
+    os.replace(tmp_path, emb_path)
+    save_manifest(manifest_file, build_manifest(ids, hashes, model_name, dim, builder_version, digest))
+    return matrix, stats
+
+
+def validate_manifest(
+    emb_path: str,
+    num_rows: int,
+    manifest_file: str,
+    ids: Sequence[str],
+    model_name: str,
+    texts: Optional[Sequence[str]] = None,
+    builder_version: str = TEXT_BUILDER_VERSION
+) -> int:
+    """
+    Check that a loaded matrix is aligned with its manifest and the data file.
+
+    Matrices without a manifest (built before manifests existed) are accepted
+    with a warning. A manifest that records a ``matrix_hash`` must match the
+    matrix file on disk.
+
+    Args:
+        emb_path: Matrix path (for messages)
+        num_rows: Rows in the loaded matrix
+        manifest_file: Manifest path
+        ids: Record ids in the data file, in order
+        model_name: Model the server encodes queries with
+        texts: Optional current texts, to count records edited since the build
+
+    Returns:
+        Number of records whose text changed since the build (0 if not checked)
+
+    Raises:
+        EmbeddingManifestError: If rows, ids, model, builder version or matrix hash disagree
+    """
+    manifest = load_manifest(manifest_file)
+    if manifest is None:
+        logger.warning(f"⚠️ No manifest for {emb_path}; row alignment not verified")
+        return 0
+
+    if manifest.get("model") != model_name:
+        raise EmbeddingManifestError(
+            f"{emb_path} was built with {manifest.get('model')}, server uses {model_name}"
+        )
+    if manifest.get("text_builder_version") != builder_version:
+        raise EmbeddingManifestError(
+            f"{emb_path} was built with text builder v{manifest.get('text_builder_version')}, "
+            f"expected v{builder_version}"
+        )
+    if manifest.get("rows") != num_rows:
+        raise EmbeddingManifestError(
+            f"{emb_path} has {num_rows} rows, manifest lists {manifest.get('rows')}"
+        )
+
+    if os.path.exists(emb_path) and not _matrix_matches(manifest, emb_path):
+        raise EmbeddingManifestError(
+            f"{emb_path} is not the matrix its manifest was written for "
+            "(interrupted build?); rebuild embeddings"
+        )
+
+    manifest_ids = [r["id"] for r in manifest["records"]]
+    if manifest_ids != list(ids):
+        raise EmbeddingManifestError(
+            f"{emb_path} rows are not aligned with the data file "
+            f"({len(manifest_ids)} manifest ids vs {len(ids)} records); rebuild embeddings"
+        )
+
+    stale = 0
+    if texts is not None:
+        stale = sum(
+            r["hash"] != text_hash(t) for r, t in zip(manifest["records"], texts)
+        )
+        if stale:
+            logger.warning(f"⚠️ {emb_path}: {stale} records changed since the last build")
+    return stale
@@ -0,0 +1,270 @@
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.embedding_manifest import matches_source, write_source_stamp
+
+logger = logging.getLogger(__name__)
+
+# On-disk formats: "float32" is the plain .npy written by the scripts,
+# "float16"/"int8" are compact copies written by scripts/compact_embeddings.py
+# (and refreshed by the embedding build scripts once they exist)
+STORAGE_FORMATS = ("float32", "float16", "int8")
+COMPACT_FORMATS = ("float16", "int8")
+
+# Rows dequantized per step when scoring compact matrices
+SCORE_CHUNK_ROWS = 4096
+
+
+def compact_paths(emb_path: str, storage: str) -> Tuple[str, Optional[str]]:
+    """
+    Return (matrix path, scale path) of a storage format for an ``.npy`` file.
+
+    ``course_embeddings.npy`` → ``course_embeddings.f16.npy`` or
+    ``course_embeddings.i8.npy`` + ``course_embeddings.i8.scale.npy``.
+    """
+    base = emb_path[:-4] if emb_path.endswith(".npy") else emb_path
+    if storage == "float16":
+        return f"{base}.f16.npy", None
+    if storage == "int8":
+        return f"{base}.i8.npy", f"{base}.i8.scale.npy"
+    return emb_path, None
+
+
+def quantize_int8(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8 quantization: ``row ≈ q * scale``."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    scale = np.abs(matrix).max(axis=1) / 127.0
+    scale[scale == 0] = 1.0
+    q = np.clip(np.rint(matrix / scale[:, None]), -127, 127).astype(np.int8)
+    return q, scale.astype(np.float32)
+
+
+def save_compact_matrix(
+    emb_path: str,
+    matrix: np.ndarray,
+    storage: str,
+    source_hash: Optional[str] = None
+) -> List[str]:
+    """
+    Write a compact copy of an embedding matrix next to ``emb_path``.
+
+    Args:
+        source_hash: Manifest hash of the matrix, stamped on the copy so a
+            stale copy is not served after the matrix is rebuilt
+
+    Returns:
+        Paths of the files written
+    """
+    data_path, scale_path = compact_paths(emb_path, storage)
+    if storage == "float16":
+        np.save(data_path, np.asarray(matrix, dtype=np.float16))
+        written = [data_path]
+    elif storage == "int8":
+        q, scale = quantize_int8(matrix)
+        np.save(data_path, q)
+        np.save(scale_path, scale)
+        written = [data_path, scale_path]
+    else:
+        np.save(data_path, np.asarray(matrix, dtype=np.float32))
+        written = [data_path]
+    write_source_stamp(data_path, source_hash)
+    return written
+
+
+def refresh_compact_copies(emb_path: str, source_hash: Optional[str]) -> List[str]:
+    """
+    Rewrite the compact copies of ``emb_path`` that exist but were built from
+    another version of the matrix (called by the build scripts after encoding).
+
+    Returns:
+        Paths of the files written
+    """
+    stale = [
+        storage for storage in COMPACT_FORMATS
+        if os.path.exists(compact_paths(emb_path, storage)[0])
+        and not matches_source(compact_paths(emb_path, storage)[0], source_hash)
+    ]
+    if not stale:
+        return []
+    matrix = np.load(emb_path)
+    written = []
+    for storage in stale:
+        written += save_compact_matrix(emb_path, matrix, storage, source_hash)
+        logger.info(f"✅ Refreshed {storage} copy of {emb_path}")
+    return written
+
+
+class EmbeddingMatrix:
+    """
+    Read-only embedding matrix in float32, float16 or int8 (+ per-row scale).
+
+    Data is usually a read-only memory map, so several worker processes share
+    the same page-cache pages. ``scores`` computes ``matrix @ query`` directly
+    on the stored dtype, dequantizing bounded row chunks instead of keeping a
+    float32 copy of the whole matrix.
+    """
+
+    def __init__(self, data: np.ndarray, scale: Optional[np.ndarray] = None):
+        if scale is not None and len(scale) != len(data):
+            raise ValueError(f"Scale has {len(scale)} rows, matrix has {len(data)}")
+        self.data = data
+        self.scale = scale
+
+    @property
+    def storage(self) -> str:
+        return "int8" if self.scale is not None else str(self.data.dtype)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.data.shape
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes + (self.scale.nbytes if self.scale is not None else 0)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, rows) -> np.ndarray:
+        """Dequantized float32 row(s)."""
+        values = np.asarray(self.data[rows], dtype=np.float32)
+        if self.scale is not None:
+            scale = self.scale[rows]
+            values = values * (scale[..., None] if np.ndim(scale) else scale)
+        return values
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """Dot product of every row with ``query`` (cosine for normalized vectors)."""
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        if self.data.dtype == np.float32:
+            return self.data @ query
+
+        out = np.empty(len(self.data), dtype=np.float32)
+        for start in range(0, len(self.data), SCORE_CHUNK_ROWS):
+            chunk = self.data[start:start + SCORE_CHUNK_ROWS].astype(np.float32)
+            out[start:start + len(chunk)] = chunk @ query
+        if self.scale is not None:
+            out *= self.scale
+        return out
+
+    def to_float32(self) -> np.ndarray:
+        return self[:]
+
+
+def load_embedding_matrix(
+    emb_path: str,
+    storage: str = "float32",
+    mmap: bool = True,
+    source_hash: Optional[str] = None
+) -> Optional[EmbeddingMatrix]:
+    """
+    Open an embedding matrix in the requested storage format.
+
+    Falls back to the float32 ``.npy`` when the compact copy has not been
+    built yet, or was built from another version of the matrix than the
+    one ``source_hash`` (its manifest hash) identifies.
+
+    Returns:
+        The matrix, or None if no file exists
+    """
+    mmap_mode = "r" if mmap else None
+    data_path, scale_path = compact_paths(emb_path, storage)
+
+    if storage != "float32" and not os.path.exists(data_path):
+        logger.warning(f"⚠️ {data_path} not found, falling back to float32")
+        data_path, scale_path = emb_path, None
+    elif storage != "float32" and not matches_source(data_path, source_hash):
+        logger.warning(
+            f"⚠️ {data_path} is stale (built from another version of {emb_path}), "
+            f"falling back to float32; rerun the embedding build or scripts/compact_embeddings.py"
+        )
+        data_path, scale_path = emb_path, None
+
+    if not os.path.exists(data_path):
+        return None
+
+    data = np.load(data_path, mmap_mode=mmap_mode)
+    scale = np.load(scale_path) if scale_path else None
+    return EmbeddingMatrix(data, scale)
+
+
+class EmbeddingStore:
+    """
+    Embedding matrix addressed by record id instead of row position.
+
+    Rows of the matrix are aligned with the metadata file written next to it
+    by the embedding scripts (one entry per row, carrying the record id).
+    """
+
+    def __init__(self, ids: List[str], matrix: np.ndarray):
+        if len(ids) != len(matrix):
+            raise ValueError(
+                f"Embedding store misaligned: {len(ids)} ids vs {len(matrix)} rows"
+            )
+        self.ids = list(ids)
+        self.matrix = matrix
+        self._rows: Dict[str, int] = {rid: i for i, rid in enumerate(self.ids)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, rid: str) -> bool:
+        return rid in self._rows
+
+    def row_of(self, rid: str) -> Optional[int]:
+        """Return the matrix row of a record id, or None if unknown."""
+        return self._rows.get(rid)
+
+    def get(self, rid: str) -> Optional[np.ndarray]:
+        """Return the stored vector of a record id, or None if unknown."""
+        row = self._rows.get(rid)
+        if row is None:
+            return None
+        return self.matrix[row]
+
+
+def load_embedding_store(
+    emb_path: str,
+    meta_path: str,
+    id_field: str,
+    storage: str = "float32",
+    mmap: bool = False,
+    source_hash: Optional[str] = None
+) -> Optional[EmbeddingStore]:
+    """
+    Load an ``EmbeddingStore`` from a ``.npy`` matrix and its metadata file.
+
+    Args:
+        emb_path: Path to the embedding matrix
+        meta_path: Path to the metadata JSON list aligned with the matrix rows
+        id_field: Key holding the record id in each metadata entry
+        storage: On-disk format to open (see ``STORAGE_FORMATS``)
+        mmap: Open the matrix as a read-only memory map
+        source_hash: Manifest hash of the matrix (see ``load_embedding_matrix``)
+
+    Returns:
+        The store, or None if a file is missing or rows and ids disagree
+    """
+    if not os.path.exists(emb_path) or not os.path.exists(meta_path):
+        logger.warning(f"⚠️ Embedding store not available: {emb_path}")
+        return None
+
+    try:
+        if storage == "float32" and not mmap:
+            matrix = np.load(emb_path)
+        else:
+            matrix = load_embedding_matrix(emb_path, storage, mmap, source_hash)
+        with open(meta_path, encoding="utf-8") as f:
+            metadata = json.load(f)
+        ids = [m.get(id_field) for m in metadata]
+        store = EmbeddingStore(ids, matrix)
+    except Exception as e:
+        logger.error(f"❌ Failed to load embedding store {emb_path}: {e}")
+        return None
+
+    logger.info(f"✅ Embedding store loaded: {emb_path} ({len(store)} rows)")
+    return store
@@ -0,0 +1,50 @@
+# Bump when a builder's output changes: manifests recorded with another
+# version are rebuilt from scratch by the incremental embedding scripts
+# v2: jobs / courses use the scripts/embed.py format (the job store's source)
+TEXT_BUILDER_VERSION = "2"
+
+
+def build_job_text(job: dict) -> str:
+    title = job.get("title", "")
+    company = job.get("company", "")
+    location = job.get("location", "")
+    desc = job.get("job_description", "")
+
+    req = job.get("requirements", {})
+    skills_required = req.get("skills_required", [])
+    nice_to_have = req.get("nice_to_have", [])
+
+    return (
+        f"Job title: {title}. "
+        f"Company: {company}. "
+        f"Location: {location}. "
+        f"Description: {desc}. "
+        f"Required skills: {', '.join(skills_required)}. "
+        f"Nice to have skills: {', '.join(nice_to_have)}."
+    )
+
+
+# ⚠️ Course ưu tiên field "text" nếu có
+def build_course_text(course: dict) -> str:
+    if course.get("text"):
+        return course["text"]
+
+    name = course.get("name", "")
+    desc = course.get("description", "")
+    provider = course.get("provider", "")
+    skills = course.get("skills_outcomes", [])
+
+    return (
+        f"Course name: {name}. "
+        f"Description: {desc}. "
+        f"Skills outcomes: {', '.join(skills)}. "
+        f"Provider: {provider}."
+    )
+
+
+def build_cv_text(cv: dict) -> str:
+    skills = ", ".join(cv.get("skills", []))
+    summary = cv.get("summary", "")
+    exp = cv.get("experiences", "")
+    edu = cv.get("education", "")
+    return f"Skills: {skills}. Summary: {summary}. Experience: {exp}. Education: {edu}"
@@ -0,0 +1,356 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Defaults (overridable via environment in main.py)
+DEFAULT_MAX_BATCH_SIZE = 32
+DEFAULT_MAX_WAIT_MS = 5.0
+WARMUP_TEXT = "python sql docker"
+
+EMBEDDING_MODEL_NAME = "BAAI/bge-m3"
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_ONNX_DIR = os.path.join(BACKEND_DIR, "models", "bge-m3-onnx")
+
+
+class EncoderNotReadyError(Exception):
+    """Raised when an embedding is requested before the model has loaded"""
+    pass
+
+
+def configure_torch_threads(num_threads: Optional[int] = None) -> int:
+    """
+    Pin torch intra-op threads for the process.
+
+    With a single batching worker doing all forward passes, intra-op
+    parallelism can use every core without request threads oversubscribing
+    them. Inter-op parallelism is pinned to one thread.
+
+    Returns:
+        The number of intra-op threads in effect (0 if torch is unavailable)
+    """
+    try:
+        import torch
+    except ImportError:
+        return 0
+
+    num_threads = num_threads or os.cpu_count() or 1
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Can only be set once, before any inter-op work has started
+        pass
+
+    logger.info(f"🧵 Torch intra-op threads: {torch.get_num_threads()}")
+    return torch.get_num_threads()
+
+
+def load_embedding_model(
+    backend: Optional[str] = None,
+    onnx_dir: Optional[str] = None,
+    quantized: Optional[bool] = None,
+    num_threads: Optional[int] = None
+):
+    """
+    Load the bge-m3 encoder for the selected inference backend.
+
+    Both backends expose ``encode(texts, normalize_embeddings=True)``.
+    Defaults come from the environment:
+
+    - ``EMBEDDING_BACKEND``: ``torch`` (SentenceTransformer) or ``onnx``
+    - ``ONNX_MODEL_DIR``: directory written by scripts/export_onnx.py
+    - ``ONNX_QUANTIZED``: ``1`` to use the int8 dynamic-quantized model
+
+    Raises:
+        ValueError: If the backend name is unknown
+    """
+    backend = (backend or os.getenv("EMBEDDING_BACKEND", "torch")).lower()
+
+    if backend == "onnx":
+        from services.onnx_encoder import OnnxEncoder
+
+        onnx_dir = onnx_dir or os.getenv("ONNX_MODEL_DIR", DEFAULT_ONNX_DIR)
+        if quantized is None:
+            quantized = os.getenv("ONNX_QUANTIZED", "1") != "0"
+        return OnnxEncoder(onnx_dir, quantized=quantized, num_threads=num_threads)
+
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+
+        configure_torch_threads(num_threads)
+        return SentenceTransformer(EMBEDDING_MODEL_NAME)
+
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+
+class BatchingEncoder:
+    """
+    Coalesce concurrent ``encode`` calls into batched forward passes.
+
+    Callers block on a future while a single worker thread drains the queue,
+    flushing a batch once it holds ``max_batch_size`` texts or the oldest
+    queued text has waited ``max_wait_ms``. Exposes the same
+    ``encode(..., normalize_embeddings=...)`` call shape as SentenceTransformer.
+
+    After ``close`` new calls raise ``RuntimeError``; texts still queued when
+    the worker stops fail with the same error instead of blocking forever.
+    """
+
+    def __init__(
+        self,
+        model,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS
+    ):
+        self.model = model
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._closed = False
+        # Check-and-enqueue vs close: nothing is queued behind the stop sentinel
+        self._submit_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+
+        self._worker = threading.Thread(
+            target=self._run, name="batching-encoder", daemon=True
+        )
+        self._worker.start()
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        normalize_embeddings: bool = False,
+        **kwargs
+    ) -> np.ndarray:
+        """
+        Encode one text (returns a 1-D vector) or a list (returns a 2-D array).
+
+        Extra keyword arguments (``convert_to_numpy``, ``show_progress_bar``,
+        ``batch_size``) are accepted for interface compatibility and ignored.
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        futures = []
+        with self._submit_lock:
+            if self._closed:
+                raise RuntimeError("BatchingEncoder is closed")
+            for text in texts:
+                future: Future = Future()
+                self._queue.put((text, bool(normalize_embeddings), future))
+                futures.append(future)
+
+        vectors = [f.result() for f in futures]
+        if single:
+            return vectors[0]
+        if not vectors:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.vstack(vectors)
+
+    def close(self) -> None:
+        """Flush pending requests, stop the worker thread and fail what it left queued."""
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._worker.join(timeout=5)
+        self._fail_pending()
+
+    def _fail_pending(self) -> None:
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None:
+                item[2].set_exception(RuntimeError("BatchingEncoder is closed"))
+
+    def stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+            }
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._flush(batch)
+        self._fail_pending()
+
+    def _flush(self, batch) -> None:
+        # normalize_embeddings is a per-call flag → one forward pass per value
+        for normalize in (True, False):
+            group = [b for b in batch if b[1] == normalize]
+            if not group:
+                continue
+
+            try:
+                vectors = self.model.encode(
+                    [text for text, _, _ in group],
+                    batch_size=len(group),
+                    convert_to_numpy=True,
+                    normalize_embeddings=normalize,
+                    show_progress_bar=False
+                )
+            except Exception as e:
+                logger.error(f"❌ Batched encode failed ({len(group)} texts): {e}")
+                for _, _, future in group:
+                    future.set_exception(e)
+                continue
+
+            for (_, _, future), vector in zip(group, vectors):
+                future.set_result(vector)
+
+            with self._stats_lock:
+                self.batches += 1
+                self.items += len(group)
+
+
+class LazyEncoder:
+    """
+    Load the embedding model in a background thread and serve it once warm.
+
+    Until the model is loaded and a warm-up encode has run, ``encode`` raises
+    ``EncoderNotReadyError`` so the API can answer 503 instead of blocking.
+    State goes ``not_started`` → ``loading`` → ``ready`` (or ``failed``).
+    Callbacks registered with ``on_ready`` run once, in the loader thread,
+    right after the model becomes ready.
+    """
+
+    def __init__(
+        self,
+        load_model: Callable[[], Any],
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS
+    ):
+        self._load_model = load_model
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._encoder: Optional[BatchingEncoder] = None
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._ready_lock = threading.Lock()
+        self._ready_callbacks: List[Callable[[], None]] = []
+        self.state = "not_started"
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def start(self) -> None:
+        """Start loading in the background (no-op if already started)."""
+        if self._thread is not None:
+            return
+        self.state = "loading"
+        self._thread = threading.Thread(
+            target=self._load, name="embedding-model-loader", daemon=True
+        )
+        self._thread.start()
+
+    def on_ready(self, callback: Callable[[], None]) -> None:
+        """Run ``callback`` once the model is ready (immediately if it already is)."""
+        with self._ready_lock:
+            if not self.ready:
+                self._ready_callbacks.append(callback)
+                return
+        self._run_callback(callback)
+
+    @staticmethod
+    def _run_callback(callback: Callable[[], None]) -> None:
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"❌ Encoder ready callback failed: {e}")
+
+    def encode(self, sentences: Union[str, List[str]], **kwargs) -> np.ndarray:
+        if not self.ready:
+            raise EncoderNotReadyError(f"Embedding model is {self.state}")
+        return self._encoder.encode(sentences, **kwargs)
+
+    def close(self) -> None:
+        """Stop the batching thread (a load still running stops it once it finishes)."""
+        self._closed = True
+        if self._encoder is not None:
+            self._encoder.close()
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {
+            "state": self.state,
+            "load_seconds": self.load_seconds,
+        }
+        if self.error:
+            stats["error"] = self.error
+        if self._encoder is not None:
+            stats.update(self._encoder.stats())
+        return stats
+
+    def _load(self) -> None:
+        started = time.monotonic()
+        encoder = None
+        try:
+            model = self._load_model()
+            encoder = BatchingEncoder(
+                model,
+                max_batch_size=self.max_batch_size,
+                max_wait_ms=self.max_wait_ms
+            )
+            # Warm-up: first forward pass allocates buffers / JIT paths
+            encoder.encode(WARMUP_TEXT, normalize_embeddings=True)
+        except Exception as e:
+            # Warm-up failed after the batching thread started → stop it
+            if encoder is not None:
+                encoder.close()
+            self.error = str(e)
+            self.state = "failed"
+            logger.error(f"❌ Failed to load embedding model: {e}")
+            return
+
+        if self._closed:
+            # Shut down while loading: nothing will call close() again
+            encoder.close()
+            self.state = "closed"
+            return
+        self._encoder = encoder
+        self.load_seconds = round(time.monotonic() - started, 2)
+        with self._ready_lock:
+            self.state = "ready"
+            callbacks, self._ready_callbacks = self._ready_callbacks, []
+        logger.info(f"✅ Embedding model ready in {self.load_seconds}s")
+        for callback in callbacks:
+            self._run_callback(callback)
@@ -0,0 +1,107 @@
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+
+DEFAULT_THRESHOLD = 0.7
+# Shorter / longer compacted length of a query and a surface: below this a
+# high Dice is mostly a shared prefix ("reactive" ~ "reactnative",
+# "machinelearningops" ~ "machinelearning"), not a misspelling
+DEFAULT_MIN_LENGTH_RATIO = 0.85
+MIN_FUZZY_LENGTH = 3
+
+# Spaces and punctuation do not tell skills apart ("java script", "Postgre SQL",
+# "node.js"); + and # do ("c++", "c#")
+_NOISE = re.compile(r"[^\w+#]")
+# Standalone version numbers ("ReactJS 18", "Python 3.11", "SQL Server 2019")
+_VERSION = re.compile(r"\b\d+(?:\.\d+)*\b")
+
+
+def compact(skill: str) -> str:
+    return _NOISE.sub("", skill.lower())
+
+
+def trigrams(key: str) -> Set[str]:
+    padded = f" {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramSkillResolver:
+    """
+    Resolve near-miss skill strings to known skills through a character
+    trigram inverted index.
+
+    Known surface forms (canonical names and aliases) are indexed by the
+    trigrams of their compacted form (lowercase, spaces and punctuation
+    removed). A query counts shared trigrams per surface with one
+    ``bincount`` over the posting lists of its own trigrams and accepts the
+    best Dice similarity ``2·|A∩B| / (|A| + |B|)`` above ``threshold``, so
+    the cost follows the query length, not an edit-distance scan of the
+    vocabulary. Only surfaces whose compacted length is within
+    ``min_length_ratio`` of the query's can match, so a query that merely
+    shares a prefix with a longer or shorter skill stays unresolved.
+
+    Standalone version numbers are dropped from the query first.
+    """
+
+    def __init__(
+        self,
+        surfaces: Dict[str, str],
+        threshold: float = DEFAULT_THRESHOLD,
+        min_length_ratio: float = DEFAULT_MIN_LENGTH_RATIO
+    ):
+        """
+        Args:
+            surfaces: Known surface form → canonical skill name
+            threshold: Minimum Dice similarity of a fuzzy match
+            min_length_ratio: Minimum shorter / longer compacted length of a match
+        """
+        self.threshold = threshold
+        self.min_length_ratio = min_length_ratio
+        self.known: Set[str] = set(surfaces) | set(surfaces.values())
+        self.exact: Dict[str, str] = {}
+        for surface, canonical in sorted(surfaces.items()):
+            key = compact(surface)
+            # A canonical name wins over an alias with the same key
+            if key and (key not in self.exact or surface == canonical):
+                self.exact[key] = canonical
+
+        self.keys: List[str] = sorted(self.exact)
+        postings = defaultdict(list)
+        for i, key in enumerate(self.keys):
+            for gram in trigrams(key):
+                postings[gram].append(i)
+        self.postings = {gram: np.array(rows, dtype=np.int32) for gram, rows in postings.items()}
+        self.sizes = np.array([len(trigrams(k)) for k in self.keys], dtype=np.float64)
+        self.lengths = np.array([len(k) for k in self.keys], dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.known
+
+    def resolve(self, skill: str) -> Optional[str]:
+        """Canonical skill closest to ``skill``, or None below the threshold."""
+        key = compact(skill)
+        if key in self.exact:
+            return self.exact[key]
+        key = compact(_VERSION.sub(" ", skill))
+        if key in self.exact:
+            return self.exact[key]
+        if len(key) < MIN_FUZZY_LENGTH or not self.keys:
+            return None
+
+        grams = trigrams(key)
+        lists = [self.postings[g] for g in grams if g in self.postings]
+        if not lists:
+            return None
+        shared = np.bincount(np.concatenate(lists), minlength=len(self.keys))
+        dice = 2 * shared / (len(grams) + self.sizes)
+        ratio = np.minimum(self.lengths, len(key)) / np.maximum(self.lengths, len(key))
+        dice[ratio < self.min_length_ratio] = 0
+        best = int(np.argmax(dice))
+        if dice[best] < self.threshold:
+            return None
+        return self.exact[self.keys[best]]
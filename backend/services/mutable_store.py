@@ -0,0 +1,437 @@
+import logging
+import os
+import struct
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Compact once tombstones make up this share of the rows (and at least COMPACT_MIN)
+DEFAULT_COMPACT_RATIO = 0.25
+DEFAULT_COMPACT_MIN = 64
+INITIAL_CAPACITY = 16
+
+# Log records appended before the log is folded into a new snapshot
+DEFAULT_CHECKPOINT_RECORDS = 256
+
+# Log record: op, id length, vector dim, then id (utf-8) and float32 vector
+_LOG_HEADER = struct.Struct("<BHI")
+OP_PUT = 1
+OP_DELETE = 2
+
+
+def _tmp_npz(path: str) -> str:
+    """Per-writer tmp name next to ``path`` (np.savez keeps a ``.npz`` suffix as is)."""
+    return f"{path}.{os.getpid()}-{threading.get_ident()}.tmp.npz"
+
+
+def snapshot_path(emb_path: str) -> str:
+    """``user_cv_embeddings.npy`` → ``user_cv_embeddings.npz`` (ids + vectors)"""
+    base = emb_path[:-4] if emb_path.endswith(".npy") else emb_path
+    return f"{base}.npz"
+
+
+def log_path(emb_path: str) -> str:
+    """``user_cv_embeddings.npy`` → ``user_cv_embeddings.log``"""
+    base = emb_path[:-4] if emb_path.endswith(".npy") else emb_path
+    return f"{base}.log"
+
+
+class MutableEmbeddingStore:
+    """
+    Embedding matrix addressed by record id, with O(1) append and delete.
+
+    Every row carries its record id; an ``id → row`` map gives O(1) lookup.
+    Deleting a record only tombstones its row, and re-putting an id
+    tombstones the old row and appends a new one, so a row is never written
+    after it is appended. Appends go into a buffer with spare capacity
+    (amortized O(1)).
+
+    Tombstoned rows are reclaimed by ``compact()``, which a background thread
+    runs once tombstones pass ``compact_ratio`` of the rows. The copy is made
+    outside the lock; only the final swap (plus rows appended meanwhile)
+    holds it.
+    """
+
+    def __init__(
+        self,
+        ids: Optional[Sequence[Optional[str]]] = None,
+        matrix: Optional[np.ndarray] = None,
+        compact_ratio: float = DEFAULT_COMPACT_RATIO,
+        compact_min: int = DEFAULT_COMPACT_MIN
+    ):
+        ids = list(ids or [])
+        if matrix is not None and len(ids) != len(matrix):
+            raise ValueError(
+                f"Embedding store misaligned: {len(ids)} ids vs {len(matrix)} rows"
+            )
+
+        self.compact_ratio = compact_ratio
+        self.compact_min = compact_min
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()  # one compaction at a time
+        self._compacting = False
+        self.compactions = 0
+
+        self._size = len(ids)
+        self._ids: List[Optional[str]] = ids
+        self._data: Optional[np.ndarray] = None
+        if matrix is not None and len(matrix):
+            self._data = np.array(matrix, dtype=np.float32)
+        self._rows: Dict[str, int] = {}
+        for row, rid in enumerate(ids):
+            if rid is not None:
+                old = self._rows.get(rid)
+                if old is not None:
+                    self._ids[old] = None
+                self._rows[rid] = row
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, rid: str) -> bool:
+        return rid in self._rows
+
+    @property
+    def dim(self) -> Optional[int]:
+        return None if self._data is None else self._data.shape[1]
+
+    @property
+    def tombstones(self) -> int:
+        return self._size - len(self._rows)
+
+    def get(self, rid: str) -> Optional[np.ndarray]:
+        """Return the vector of a record id, or None if unknown or deleted."""
+        with self._lock:
+            row = self._rows.get(rid)
+            if row is None:
+                return None
+            return self._data[row]
+
+    def items(self) -> Tuple[List[str], np.ndarray]:
+        """Live ids and their vectors (a copy), in row order."""
+        with self._lock:
+            rows = sorted(self._rows.values())
+            ids = [self._ids[r] for r in rows]
+            if self._data is None:
+                return ids, np.empty((0, 0), dtype=np.float32)
+            return ids, self._data[rows]
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    def _reserve(self, dim: int) -> None:
+        if self._data is None:
+            self._data = np.empty((INITIAL_CAPACITY, dim), dtype=np.float32)
+        elif self._size == len(self._data):
+            grown = np.empty((max(INITIAL_CAPACITY, 2 * len(self._data)), dim), dtype=np.float32)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+
+    def put(self, rid: str, vector: np.ndarray) -> None:
+        """Append the vector of ``rid`` (replacing any previous one)."""
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        with self._lock:
+            if self._data is not None and vector.shape[0] != self._data.shape[1]:
+                raise ValueError(
+                    f"Vector of {rid} has dim {vector.shape[0]}, store has {self._data.shape[1]}"
+                )
+            self._reserve(vector.shape[0])
+            old = self._rows.get(rid)
+            if old is not None:
+                self._ids[old] = None
+            row = self._size
+            self._data[row] = vector
+            self._ids.append(rid)
+            self._rows[rid] = row
+            self._size += 1
+        if old is not None:
+            self.maybe_compact()
+
+    def delete(self, rid: str) -> bool:
+        """Tombstone the row of ``rid``. Returns False if the id is unknown."""
+        with self._lock:
+            row = self._rows.pop(rid, None)
+            if row is None:
+                return False
+            self._ids[row] = None
+        self.maybe_compact()
+        return True
+
+    # ------------------------------------------------------------------
+    # Compaction
+    # ------------------------------------------------------------------
+    def needs_compaction(self) -> bool:
+        dead = self.tombstones
+        return dead >= self.compact_min and dead >= self.compact_ratio * self._size
+
+    def maybe_compact(self) -> bool:
+        """Start a background compaction if enough rows are tombstoned."""
+        with self._lock:
+            if self._compacting or not self.needs_compaction():
+                return False
+            self._compacting = True
+        threading.Thread(target=self._compact_worker, name="store-compaction", daemon=True).start()
+        return True
+
+    def _compact_worker(self) -> None:
+        try:
+            self.compact()
+        except Exception as e:
+            logger.error(f"❌ Embedding store compaction failed: {e}")
+        finally:
+            with self._lock:
+                self._compacting = False
+
+    def compact(self) -> int:
+        """
+        Drop tombstoned rows.
+
+        Returns:
+            Number of rows reclaimed
+        """
+        with self._compact_lock:
+            return self._compact()
+
+    def _compact(self) -> int:
+        with self._lock:
+            if self._data is None or not self.tombstones:
+                return 0
+            size = self._size
+            data = self._data
+            live = [r for r in range(size) if self._ids[r] is not None]
+
+        # Rows below ``size`` are never written again → copy without the lock
+        copied = data[live]
+
+        with self._lock:
+            # Rows appended or deleted while copying
+            keep = [i for i, r in enumerate(live) if self._ids[r] is not None]
+            tail = [r for r in range(size, self._size) if self._ids[r] is not None]
+            dim = copied.shape[1]
+            total = len(keep) + len(tail)
+            new_data = np.empty((max(INITIAL_CAPACITY, total), dim), dtype=np.float32)
+            new_data[:len(keep)] = copied[keep]
+            new_data[len(keep):total] = self._data[tail]
+
+            new_ids = [self._ids[live[i]] for i in keep] + [self._ids[r] for r in tail]
+            reclaimed = self._size - total
+            self._data = new_data
+            self._ids = new_ids
+            self._size = total
+            self._rows = {rid: row for row, rid in enumerate(new_ids)}
+            self.compactions += 1
+
+        logger.info(f"🧹 Embedding store compacted: {reclaimed} rows reclaimed, {total} live")
+        return reclaimed
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def save(self, path: str) -> None:
+        """Write the live rows and their ids to one ``.npz`` snapshot, atomically."""
+        ids, matrix = self.items()
+        tmp_path = _tmp_npz(path)
+        np.savez(tmp_path, ids=np.array(ids, dtype=str), vectors=matrix)
+        os.replace(tmp_path, path)
+
+    def stats(self) -> dict:
+        return {
+            "rows": len(self),
+            "tombstones": self.tombstones,
+            "compactions": self.compactions,
+        }
+
+
+class LoggedEmbeddingStore(MutableEmbeddingStore):
+    """
+    ``MutableEmbeddingStore`` persisted as a snapshot plus an append-only log.
+
+    ``put``/``delete`` append one small record to ``<name>.log`` instead of
+    rewriting the matrix, so a write costs O(dim) however many rows are
+    stored. Once the log holds ``checkpoint_every`` records, a background
+    checkpoint rotates it to ``<name>.log.old``, writes a fresh snapshot of
+    the live rows and deletes the old log. Loading replays snapshot, then
+    ``.log.old`` (left by an interrupted checkpoint), then ``.log``; replaying
+    a record twice is harmless. Only one checkpoint runs at a time, whether it
+    was started in the background or called directly (e.g. at shutdown).
+    """
+
+    def __init__(
+        self,
+        emb_path: str,
+        ids: Optional[Sequence[Optional[str]]] = None,
+        matrix: Optional[np.ndarray] = None,
+        checkpoint_every: int = DEFAULT_CHECKPOINT_RECORDS,
+        **kwargs
+    ):
+        super().__init__(ids, matrix, **kwargs)
+        self.snapshot_file = snapshot_path(emb_path)
+        self.log_file = log_path(emb_path)
+        self.checkpoint_every = max(1, checkpoint_every)
+        self._log_lock = threading.Lock()
+        self._checkpoint_lock = threading.Lock()  # one checkpoint at a time
+        self._checkpointing = False
+        self.log_records = 0
+        self.checkpoints = 0
+
+    def _append(self, op: int, rid: str, vector: Optional[np.ndarray] = None) -> None:
+        key = rid.encode("utf-8")
+        body = b"" if vector is None else vector.astype("<f4").tobytes()
+        dim = 0 if vector is None else len(vector)
+        # Một lệnh write cho cả record → record dở dang chỉ có thể nằm ở cuối log
+        with open(self.log_file, "ab") as f:
+            f.write(_LOG_HEADER.pack(op, len(key), dim) + key + body)
+        self.log_records += 1
+
+    def put(self, rid: str, vector: np.ndarray) -> None:
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        with self._log_lock:
+            super().put(rid, vector)
+            self._append(OP_PUT, rid, vector)
+        self.maybe_checkpoint()
+
+    def delete(self, rid: str) -> bool:
+        with self._log_lock:
+            if not super().delete(rid):
+                return False
+            self._append(OP_DELETE, rid)
+        self.maybe_checkpoint()
+        return True
+
+    def replay(self, path: str) -> int:
+        """
+        Apply the records of a log file (without logging them again).
+
+        A torn record at the end (crash during a write) is cut off.
+
+        Returns:
+            Number of records applied
+        """
+        if not os.path.exists(path):
+            return 0
+        with open(path, "rb") as f:
+            data = f.read()
+
+        offset = applied = 0
+        while offset + _LOG_HEADER.size <= len(data):
+            op, key_len, dim = _LOG_HEADER.unpack_from(data, offset)
+            end = offset + _LOG_HEADER.size + key_len + 4 * dim
+            if end > len(data) or op not in (OP_PUT, OP_DELETE):
+                break
+            start = offset + _LOG_HEADER.size
+            rid = data[start:start + key_len].decode("utf-8")
+            if op == OP_PUT:
+                vector = np.frombuffer(data, dtype="<f4", count=dim, offset=start + key_len)
+                MutableEmbeddingStore.put(self, rid, vector)
+            else:
+                MutableEmbeddingStore.delete(self, rid)
+            offset = end
+            applied += 1
+
+        if offset < len(data):
+            logger.warning(f"⚠️ Truncating torn record at the end of {path} ({len(data) - offset} bytes)")
+            with open(path, "r+b") as f:
+                f.truncate(offset)
+        return applied
+
+    def maybe_checkpoint(self) -> bool:
+        """Start a background checkpoint once the log is long enough."""
+        with self._log_lock:
+            if self._checkpointing or self.log_records < self.checkpoint_every:
+                return False
+            self._checkpointing = True
+        threading.Thread(target=self._checkpoint_worker, name="store-checkpoint", daemon=True).start()
+        return True
+
+    def _checkpoint_worker(self) -> None:
+        try:
+            self.checkpoint()
+        except Exception as e:
+            logger.error(f"❌ Embedding store checkpoint failed: {e}")
+        finally:
+            with self._log_lock:
+                self._checkpointing = False
+
+    def checkpoint(self) -> None:
+        """Fold the log into a new snapshot of the live rows (waits for a running checkpoint)."""
+        with self._checkpoint_lock:
+            self._checkpoint()
+
+    def _checkpoint(self) -> None:
+        old_log = f"{self.log_file}.old"
+        with self._log_lock:
+            if os.path.exists(old_log):
+                # Checkpoint trước bị ngắt: ghép phần còn lại vào .old rồi làm lại
+                if os.path.exists(self.log_file):
+                    with open(self.log_file, "rb") as src, open(old_log, "ab") as dst:
+                        dst.write(src.read())
+                    os.remove(self.log_file)
+            elif os.path.exists(self.log_file):
+                os.replace(self.log_file, old_log)
+            ids, matrix = self.items()
+            self.log_records = 0
+
+        # Ghi snapshot ngoài lock: upload mới vẫn append vào .log mới
+        tmp_path = _tmp_npz(self.snapshot_file)
+        np.savez(tmp_path, ids=np.array(ids, dtype=str), vectors=matrix)
+        os.replace(tmp_path, self.snapshot_file)
+        if os.path.exists(old_log):
+            os.remove(old_log)
+        self.checkpoints += 1
+        logger.info(f"💾 Embedding store checkpoint: {self.snapshot_file} ({len(ids)} rows)")
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["log_records"] = self.log_records
+        stats["checkpoints"] = self.checkpoints
+        return stats
+
+
+def load_logged_store(
+    emb_path: str,
+    legacy_ids: Optional[Sequence[str]] = None,
+    checkpoint_every: int = DEFAULT_CHECKPOINT_RECORDS
+) -> LoggedEmbeddingStore:
+    """
+    Load an id-addressed store from its snapshot and log.
+
+    Without a snapshot, a plain ``.npy`` (written before rows carried ids)
+    is adopted only if its row count equals ``legacy_ids``; otherwise its
+    rows cannot be attributed to records, so the file is left on disk and
+    the caller re-encodes the records that have no vector.
+
+    Returns:
+        The store (empty if nothing usable is on disk)
+    """
+    ids, matrix = None, None
+    snapshot = snapshot_path(emb_path)
+    if os.path.exists(snapshot):
+        with np.load(snapshot) as data:
+            ids, matrix = data["ids"].tolist(), data["vectors"]
+        if not len(ids):
+            matrix = None
+    elif os.path.exists(emb_path):
+        legacy = np.load(emb_path)
+        if legacy_ids is not None and len(legacy_ids) == len(legacy):
+            logger.info(f"✅ Adopting legacy {emb_path} by row position ({len(legacy)} rows)")
+            ids, matrix = list(legacy_ids), legacy
+        else:
+            logger.warning(
+                f"⚠️ Ignoring legacy {emb_path}: {len(legacy)} rows but "
+                f"{len(legacy_ids or [])} records, rows cannot be attributed to records "
+                "(records without a vector must be re-encoded)"
+            )
+
+    store = LoggedEmbeddingStore(emb_path, ids, matrix, checkpoint_every=checkpoint_every)
+    replayed = store.replay(f"{store.log_file}.old") + store.replay(store.log_file)
+    store.log_records = replayed
+    logger.info(
+        f"✅ Embedding store loaded: {emb_path} ({len(store)} rows, {replayed} log records replayed)"
+    )
+    return store
@@ -0,0 +1,104 @@
+import logging
+import os
+from typing import List, Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# File names written by scripts/export_onnx.py
+MODEL_FILE = "model.onnx"
+QUANTIZED_MODEL_FILE = "model_quantized.onnx"
+
+# bge-m3 supports up to 8192 tokens (same limit as SentenceTransformer)
+DEFAULT_MAX_SEQ_LENGTH = 8192
+
+
+class OnnxEncoder:
+    """
+    ONNX Runtime drop-in for ``SentenceTransformer("BAAI/bge-m3")`` on CPU.
+
+    Runs the exported transformer, takes the CLS token as the sentence
+    embedding (bge-m3 pooling) and optionally L2-normalizes it, so
+    ``encode(..., normalize_embeddings=True)`` returns the same kind of
+    vectors as the PyTorch model.
+    """
+
+    def __init__(
+        self,
+        model_dir: str,
+        quantized: bool = True,
+        max_seq_length: int = DEFAULT_MAX_SEQ_LENGTH,
+        num_threads: Optional[int] = None
+    ):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        path = os.path.join(model_dir, QUANTIZED_MODEL_FILE if quantized else MODEL_FILE)
+        if not os.path.exists(path):
+            raise FileNotFoundError(
+                f"ONNX model not found: {path} (run scripts/export_onnx.py first)"
+            )
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+
+        self.session = ort.InferenceSession(
+            path, options, providers=["CPUExecutionProvider"]
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.max_seq_length = max_seq_length
+        self.model_path = path
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+        logger.info(f"✅ ONNX encoder loaded: {path}")
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+        convert_to_numpy: bool = True,
+        show_progress_bar: bool = False,
+        **kwargs
+    ) -> np.ndarray:
+        """
+        Encode one text (returns a 1-D vector) or a list (returns a 2-D array).
+
+        Texts are sorted by length before batching to reduce padding, then
+        restored to input order.
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        chunks = []
+        for start in range(0, len(texts), batch_size):
+            batch = [texts[i] for i in order[start:start + batch_size]]
+            encoded = self.tokenizer(
+                batch,
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            feeds = {
+                name: value.astype(np.int64)
+                for name, value in encoded.items()
+                if name in self._input_names
+            }
+            last_hidden_state = self.session.run(None, feeds)[0]
+            chunks.append(last_hidden_state[:, 0].astype(np.float32))
+
+        vectors = np.empty((len(texts), chunks[0].shape[1]), dtype=np.float32)
+        vectors[order] = np.vstack(chunks)
+
+        if normalize_embeddings:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors /= np.maximum(norms, 1e-12)
+
+        return vectors[0] if single else vectors
@@ -0,0 +1,164 @@
+import logging
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+from services.embedding_manifest import matches_source, write_source_stamp
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIMS = 256
+DEFAULT_CANDIDATES = 100
+
+
+def reduced_index_path(emb_path: str, dims: int = DEFAULT_DIMS) -> str:
+    """``course_embeddings.npy`` → ``course_embeddings.pca256.npz``"""
+    base = emb_path[:-4] if emb_path.endswith(".npy") else emb_path
+    return f"{base}.pca{dims}.npz"
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the ``k`` largest scores, best first (argpartition + small sort)."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+class ReducedIndex:
+    """
+    PCA projection of an embedding matrix for a cheap first-pass scan.
+
+    For a query ``q`` and row ``x ≈ mean + Pᵀ r``, ``q·x ≈ q·mean + (P q)·r``.
+    ``q·mean`` is the same for every row, so rows can be ranked by
+    ``reduced @ (P q)`` in ``dims`` instead of the full dimension.
+    """
+
+    def __init__(self, mean: np.ndarray, components: np.ndarray, reduced: np.ndarray):
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.components = np.asarray(components, dtype=np.float32)
+        self.reduced = np.asarray(reduced, dtype=np.float32)
+
+    @property
+    def dims(self) -> int:
+        return self.components.shape[0]
+
+    def __len__(self) -> int:
+        return len(self.reduced)
+
+    @classmethod
+    def fit(cls, matrix: np.ndarray, dims: int = DEFAULT_DIMS) -> "ReducedIndex":
+        """Learn the top-``dims`` principal components of ``matrix``."""
+        matrix = np.asarray(matrix, dtype=np.float32)
+        dims = min(dims, matrix.shape[1], len(matrix))
+        mean = matrix.mean(axis=0)
+        centered = matrix - mean
+        # d×d covariance + eigh: cheap for d=1024 regardless of row count
+        cov = centered.T @ centered
+        eigvals, eigvecs = np.linalg.eigh(cov)
+        components = eigvecs[:, np.argsort(eigvals)[::-1][:dims]].T
+        return cls(mean, components, centered @ components.T)
+
+    def explained_variance(self, matrix: np.ndarray) -> float:
+        """Share of the matrix variance kept by the projection."""
+        centered = np.asarray(matrix, dtype=np.float32) - self.mean
+        total = float(np.sum(centered ** 2))
+        return float(np.sum(self.reduced ** 2)) / total if total else 1.0
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """Approximate ranking scores (shifted by the constant ``q·mean``)."""
+        return self.reduced @ (self.components @ np.asarray(query, dtype=np.float32))
+
+    def save(self, path: str) -> None:
+        np.savez(path, mean=self.mean, components=self.components, reduced=self.reduced)
+
+    @classmethod
+    def load(cls, path: str) -> "ReducedIndex":
+        with np.load(path) as data:
+            return cls(data["mean"], data["components"], data["reduced"])
+
+
+def build_reduced_index(emb_path: str, dims: int = DEFAULT_DIMS, source_hash: Optional[str] = None) -> str:
+    """
+    Fit and save the PCA index of an embedding matrix next to it, stamped
+    with the manifest hash ``source_hash`` of the matrix.
+
+    Returns:
+        Path of the saved ``.npz``
+    """
+    matrix = np.load(emb_path)
+    index = ReducedIndex.fit(matrix, dims)
+    path = reduced_index_path(emb_path, dims)
+    index.save(path)
+    write_source_stamp(path, source_hash)
+    logger.info(
+        f"✅ Reduced index saved: {path} ({index.dims} dims, "
+        f"{index.explained_variance(matrix):.1%} variance)"
+    )
+    return path
+
+
+def load_reduced_index(
+    emb_path: str,
+    num_rows: int,
+    dims: int = DEFAULT_DIMS,
+    source_hash: Optional[str] = None
+) -> Optional[ReducedIndex]:
+    """
+    Load the PCA index of an embedding matrix if it exists and is aligned.
+
+    Returns:
+        The index, or None if missing, built from another version of the
+        matrix (manifest hash) or for a different row count
+    """
+    path = reduced_index_path(emb_path, dims)
+    if not os.path.exists(path):
+        return None
+    if not matches_source(path, source_hash):
+        logger.warning(f"⚠️ Ignoring {path}: built from another version of {emb_path}")
+        return None
+    index = ReducedIndex.load(path)
+    if len(index) != num_rows:
+        logger.warning(
+            f"⚠️ Ignoring {path}: {len(index)} rows vs {num_rows} in the matrix"
+        )
+        return None
+    logger.info(f"✅ Reduced index loaded: {path} ({index.dims} dims)")
+    return index
+
+
+def two_stage_search(
+    query: np.ndarray,
+    full,
+    reduced: ReducedIndex,
+    k: int,
+    candidates: int = DEFAULT_CANDIDATES,
+    mask: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Scan the reduced space, then rerank the best candidates exactly.
+
+    Args:
+        query: Normalized query vector (full dimension)
+        full: Full-dimension matrix (ndarray or EmbeddingMatrix)
+        reduced: PCA index aligned with ``full``
+        k: Number of results
+        candidates: Rows kept from the reduced scan for exact reranking
+        mask: Optional boolean row filter, applied before the reduced top-k
+
+    Returns:
+        (row indices, exact scores), best first
+    """
+    query = np.asarray(query, dtype=np.float32)
+    approx = reduced.scores(query)
+    limit = max(k, candidates)
+    if mask is not None:
+        approx = np.where(mask, approx, -np.inf)
+        limit = min(limit, int(np.count_nonzero(mask)))
+    candidate_rows = top_k_indices(approx, limit)
+    candidate_rows = np.sort(candidate_rows)  # sequential reads on mmap
+    exact = np.asarray(full[candidate_rows], dtype=np.float32) @ query
+    order = top_k_indices(exact, k)
+    return candidate_rows[order], exact[order]
@@ -0,0 +1,68 @@
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from services.skill_matrix import popcount_rows
+
+
+def greedy_weighted_cover(
+    candidate_bits: np.ndarray,
+    weights: np.ndarray,
+    target_bits: np.ndarray,
+    time_budget_ms: float = 20.0,
+    max_picks: Optional[int] = None
+) -> dict:
+    """
+    Greedy weighted set cover over skill bitsets.
+
+    Each round picks the candidate maximising ``new skills covered × weight``
+    (equivalently the lowest cost per new skill with ``cost = 1 / weight``),
+    which is the classic ln(n)-approximation of the minimum-cost cover.
+    A round is one ``&`` + popcount over all candidates, so gaps of tens of
+    skills finish in a few milliseconds.
+
+    Args:
+        candidate_bits: uint64 bitsets of the candidates, shape ``(n, words)``
+        weights: Positive quality of each candidate (higher is preferred)
+        target_bits: Bitset of the skills to cover, same word layout
+        time_budget_ms: Stop picking once this much time has been spent
+        max_picks: Optional cap on the number of candidates picked
+
+    Returns:
+        ``{"picks": [(candidate index, bitset of skills it newly covers)],
+        "uncovered": bitset of skills left, "timed_out": bool, "truncated": bool,
+        "elapsed_ms": float}``; ``truncated`` means ``max_picks`` or the time
+        budget stopped the cover while a candidate could still cover a skill
+    """
+    started = time.perf_counter()
+    deadline = started + time_budget_ms / 1000
+    remaining = np.array(target_bits, dtype=np.uint64, copy=True)
+    weights = np.asarray(weights, dtype=np.float64)
+    picks: List[tuple] = []
+    timed_out = capped = False
+
+    while remaining.any() and len(candidate_bits):
+        if max_picks is not None and len(picks) >= max_picks:
+            capped = True
+            break
+        if time.perf_counter() > deadline:
+            timed_out = True
+            break
+        gain = popcount_rows(candidate_bits & remaining)
+        score = gain * weights
+        best = int(np.argmax(score))
+        if gain[best] == 0:
+            break
+        newly = candidate_bits[best] & remaining
+        picks.append((best, newly))
+        remaining &= ~candidate_bits[best]
+
+    truncated = (timed_out or capped) and bool((candidate_bits & remaining).any())
+    return {
+        "picks": picks,
+        "uncovered": remaining,
+        "timed_out": timed_out,
+        "truncated": truncated,
+        "elapsed_ms": (time.perf_counter() - started) * 1000
+    }
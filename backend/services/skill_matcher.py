@@ -0,0 +1,104 @@
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Set
+
+_WORD_RUN = re.compile(r"\w+")
+_WORD_CHAR = re.compile(r"\w")
+# A token is a \w+ run or a single symbol: "ci/cd" → ci / cd, "c++" → c + +
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+def _is_word(ch: str) -> bool:
+    return bool(_WORD_CHAR.match(ch))
+
+
+class SkillMatcher:
+    """
+    All taxonomy skills matched in one pass over a text.
+
+    Equivalent to running ``re.search(r'(?<!\\w)' + re.escape(skill) + r'(?!\\w)', text)``
+    for every skill: a match may not be preceded or followed by a word
+    character, whatever the skill's own edge characters are, so ``c++`` is
+    found in ``c++ developer``, ``skills: c#`` and ``c++`` but not in
+    ``c++17``.
+
+    A skill that starts with a word character can only match at the start of
+    a ``\\w+`` run, and that run must equal the skill's leading run, so skills
+    are bucketed by leading run and the text is scanned run by run with one
+    dict lookup each. The few skills starting with a non-word character are
+    located with ``str.find``.
+
+    ``lookup`` matches short phrases token by token instead: every span of up
+    to ``max_tokens`` consecutive tokens is looked up in a hash set of the
+    skills, so a skill only matches on token boundaries (no ``r`` inside
+    ``react``, no ``go`` inside ``google``).
+    """
+
+    def __init__(self, skills: Iterable[str]):
+        self.skills: List[str] = sorted({s for s in skills if s})
+        self.by_head: Dict[str, List[str]] = defaultdict(list)
+        self.other: List[str] = []
+        for skill in self.skills:
+            head = _WORD_RUN.match(skill)
+            if head:
+                self.by_head[head.group()].append(skill)
+            else:
+                self.other.append(skill)
+        self.by_head = dict(self.by_head)
+        self.skill_set = set(self.skills)
+        self.max_tokens = max((len(_TOKEN.findall(s)) for s in self.skills), default=0)
+
+    def __len__(self) -> int:
+        return len(self.skills)
+
+    def to_dict(self) -> dict:
+        """JSON-serializable tables, reloaded by ``from_dict`` without recompiling."""
+        return {"by_head": self.by_head, "other": self.other, "max_tokens": self.max_tokens}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SkillMatcher":
+        matcher = cls.__new__(cls)
+        matcher.by_head = {head: list(skills) for head, skills in data["by_head"].items()}
+        matcher.other = list(data["other"])
+        matcher.skills = sorted([s for skills in matcher.by_head.values() for s in skills] + matcher.other)
+        matcher.skill_set = set(matcher.skills)
+        matcher.max_tokens = data["max_tokens"]
+        return matcher
+
+    @staticmethod
+    def _ends_ok(text: str, end: int) -> bool:
+        return end >= len(text) or not _is_word(text[end])
+
+    def find(self, text: str) -> Set[str]:
+        """Skills occurring in ``text`` as whole words (case-sensitive: pass lowercased text)."""
+        found = set()
+        for run in _WORD_RUN.finditer(text):
+            candidates = self.by_head.get(run.group())
+            if not candidates:
+                continue
+            start = run.start()
+            for skill in candidates:
+                if skill not in found and text.startswith(skill, start) \
+                        and self._ends_ok(text, start + len(skill)):
+                    found.add(skill)
+
+        for skill in self.other:
+            start = text.find(skill)
+            while start != -1:
+                if (start == 0 or not _is_word(text[start - 1])) and self._ends_ok(text, start + len(skill)):
+                    found.add(skill)
+                    break
+                start = text.find(skill, start + 1)
+        return found
+
+    def lookup(self, phrase: str) -> Set[str]:
+        """Skills spelled exactly by a run of whole tokens of ``phrase`` (pass lowercased text)."""
+        tokens = list(_TOKEN.finditer(phrase))
+        found = set()
+        for i, first in enumerate(tokens):
+            start = first.start()
+            for last in tokens[i:i + self.max_tokens]:
+                span = phrase[start:last.end()]
+                if span in self.skill_set:
+                    found.add(span)
+        return found
@@ -0,0 +1,225 @@
+from typing import Dict, Iterable, List, Sequence, Set
+
+import numpy as np
+
+
+class SkillVocabulary:
+    """Canonical (normalized) skill name ↔ dense integer id."""
+
+    def __init__(self, skills: Iterable[str] = ()):
+        self.skills: List[str] = []
+        self.ids: Dict[str, int] = {}
+        for skill in skills:
+            self.add(skill)
+
+    def __len__(self) -> int:
+        return len(self.skills)
+
+    def add(self, skill: str) -> int:
+        sid = self.ids.get(skill)
+        if sid is None:
+            sid = len(self.skills)
+            self.ids[skill] = sid
+            self.skills.append(skill)
+        return sid
+
+    def encode(self, skills: Iterable[str]) -> np.ndarray:
+        """Sorted ids of the known skills in ``skills`` (unknown ones are skipped)."""
+        ids = {self.ids[s] for s in skills if s in self.ids}
+        return np.array(sorted(ids), dtype=np.int32)
+
+    def decode(self, ids: Iterable[int]) -> List[str]:
+        return [self.skills[i] for i in ids]
+
+
+class SkillIncidence:
+    """
+    Record × skill incidence matrix in CSR form.
+
+    Row ``r`` holds the skill ids ``indices[indptr[r]:indptr[r + 1]]``; it is
+    the intermediate form ``SkillPostings`` transposes into skill → records.
+    """
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, num_skills: int):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.num_skills = num_skills
+        self.row_sizes = np.diff(self.indptr)
+        self._row_of = np.repeat(np.arange(len(self.row_sizes)), self.row_sizes)
+
+    @classmethod
+    def from_sets(cls, skill_sets: Sequence[Set[str]], vocab: SkillVocabulary) -> "SkillIncidence":
+        """Build rows from normalized skill sets, adding new skills to ``vocab``."""
+        rows = [sorted({vocab.add(s) for s in skills}) for skills in skill_sets]
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(r) for r in rows])
+        indices = np.fromiter((sid for r in rows for sid in r), dtype=np.int32, count=int(indptr[-1]))
+        return cls(indptr, indices, len(vocab))
+
+    def __len__(self) -> int:
+        return len(self.row_sizes)
+
+
+class SkillPostings:
+    """
+    Inverted index skill id → records that have it (the CSR transpose of a
+    ``SkillIncidence``).
+
+    Candidate generation only touches the posting lists of the query skills,
+    so its cost follows how many records teach those skills, not catalog size.
+    """
+
+    def __init__(self, indptr: np.ndarray, records: np.ndarray):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.records = np.asarray(records, dtype=np.int64)
+
+    @classmethod
+    def from_incidence(cls, incidence: SkillIncidence) -> "SkillPostings":
+        order = np.argsort(incidence.indices, kind="stable")
+        counts = np.bincount(incidence.indices, minlength=incidence.num_skills)
+        indptr = np.zeros(len(counts) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum(counts)
+        return cls(indptr, incidence._row_of[order])
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    def postings(self, skill_id: int) -> np.ndarray:
+        if skill_id >= len(self):
+            return np.empty(0, dtype=np.int64)
+        return self.records[self.indptr[skill_id]:self.indptr[skill_id + 1]]
+
+    def candidates(self, skill_ids: np.ndarray):
+        """
+        Records having at least one of ``skill_ids``.
+
+        Returns:
+            (record indices ascending, number of query skills each one has)
+        """
+        lists = [self.postings(int(s)) for s in skill_ids]
+        if not lists:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(lists), return_counts=True)
+
+
+# popcount per byte, for NumPy versions without np.bitwise_count (< 2.0)
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount_rows(words: np.ndarray) -> np.ndarray:
+    """Number of set bits in each row of a uint64 bit matrix."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+    return _POPCOUNT8[words.view(np.uint8)].sum(axis=-1, dtype=np.int64)
+
+
+class SkillBitsets:
+    """
+    Record skill sets packed as bitsets, one uint64 word per 64 skill ids.
+
+    Intersections between one skill set and every record are a broadcast
+    ``&`` plus a popcount, normalized in either direction:
+
+    - ``coverage(q)``: share of each record's skills that are in ``q``
+      (one CV against the requirements of every job)
+    - ``covers(q)``: share of ``q`` that each record has
+      (every CV against the requirements of one job)
+    """
+
+    def __init__(self, words: np.ndarray, num_skills: int):
+        self.words = np.ascontiguousarray(words, dtype=np.uint64)
+        self.num_skills = num_skills
+        self.row_sizes = popcount_rows(self.words)
+
+    @staticmethod
+    def num_words(num_skills: int) -> int:
+        return max(1, (num_skills + 63) // 64)
+
+    @classmethod
+    def from_sets(cls, skill_sets: Sequence[Set[str]], vocab: SkillVocabulary) -> "SkillBitsets":
+        """Pack normalized skill sets, adding new skills to ``vocab`` first."""
+        id_rows = [[vocab.add(s) for s in skills] for skills in skill_sets]
+        words = np.zeros((len(id_rows), cls.num_words(len(vocab))), dtype=np.uint64)
+        for r, ids in enumerate(id_rows):
+            if ids:
+                words[r] = cls._pack(np.array(ids, dtype=np.int64), words.shape[1])
+        return cls(words, len(vocab))
+
+    @staticmethod
+    def _pack(ids: np.ndarray, num_words: int) -> np.ndarray:
+        row = np.zeros(num_words, dtype=np.uint64)
+        np.bitwise_or.at(row, ids // 64, np.left_shift(np.uint64(1), (ids % 64).astype(np.uint64)))
+        return row
+
+    def pack(self, skill_ids: np.ndarray) -> np.ndarray:
+        """Bitset of a query skill-id array (ids outside this matrix are dropped)."""
+        ids = np.asarray(skill_ids, dtype=np.int64)
+        return self._pack(ids[ids < self.num_skills], self.words.shape[1])
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def matched_counts(self, query_bits: np.ndarray) -> np.ndarray:
+        """Per record, ``|record ∩ query|``."""
+        return popcount_rows(self.words & query_bits)
+
+    def coverage(self, query_bits: np.ndarray) -> np.ndarray:
+        """Per record, ``|record ∩ query| / |record|`` (0 for empty records)."""
+        return np.divide(
+            self.matched_counts(query_bits), self.row_sizes,
+            out=np.zeros(len(self), dtype=np.float64), where=self.row_sizes > 0
+        )
+
+    def covers(self, query_bits: np.ndarray) -> np.ndarray:
+        """Per record, ``|record ∩ query| / |query|`` (0 for an empty query)."""
+        size = int(popcount_rows(query_bits))
+        if size == 0:
+            return np.zeros(len(self), dtype=np.float64)
+        return self.matched_counts(query_bits) / size
+
+
+class SkillSetIndex:
+    """
+    Normalized skill sets of one catalog (jobs, CVs or courses) with their
+    bitset, CSR and inverted (skill → records) forms over a shared
+    ``SkillVocabulary``.
+    """
+
+    def __init__(self, skill_sets: Sequence[Set[str]], vocab: SkillVocabulary):
+        self.vocab = vocab
+        self.sets = [set(s) for s in skill_sets]
+        self.bits = SkillBitsets.from_sets(self.sets, vocab)
+        self.incidence = SkillIncidence.from_sets(self.sets, vocab)
+        self.postings = SkillPostings.from_incidence(self.incidence)
+
+    def __len__(self) -> int:
+        return len(self.sets)
+
+    def query(self, skills: Iterable[str]) -> np.ndarray:
+        """Bitset of an arbitrary skill set, in this index's layout."""
+        return self.bits.pack(self.vocab.encode(skills))
+
+    def coverage(self, skills: Iterable[str]) -> np.ndarray:
+        """Share of each record's skills found in ``skills`` (one CV vs all jobs)."""
+        return self.bits.coverage(self.query(skills))
+
+    def covers(self, skills: Iterable[str]) -> np.ndarray:
+        """Share of ``skills`` found in each record (all CVs vs one job)."""
+        return self.bits.covers(self.query(skills))
+
+
+def pairwise_matched_counts(a_words: np.ndarray, b_words: np.ndarray, chunk_rows: int = 256) -> np.ndarray:
+    """
+    ``|a_i ∩ b_j|`` for every pair of rows of two bitset matrices.
+
+    Both matrices must share one vocabulary layout (same word count).
+    Rows of ``a`` are processed in chunks to bound the broadcast temporary.
+
+    Returns:
+        int64 matrix of shape ``(len(a), len(b))``
+    """
+    out = np.empty((len(a_words), len(b_words)), dtype=np.int64)
+    for start in range(0, len(a_words), chunk_rows):
+        block = a_words[start:start + chunk_rows, None, :] & b_words[None, :, :]
+        out[start:start + len(block)] = popcount_rows(block)
+    return out
@@ -1,67 +1,18 @@
 import re
 from typing import List, Set
 
-# Special cases that need exact preservation
-SPECIAL_SKILLS = {
-    "c++": "c++",
-    "c#": "c#",
-    ".net": ".net",
-    "asp.net": "asp.net",
-    "node.js": "node.js",
-    "vue.js": "vue.js",
-    "react.js": "react.js",
-    "next.js": "next.js",
-    "express.js": "express.js",
-    "d3.js": "d3.js",
-    "three.js": "three.js",
-}
-
-# Common skill aliases to normalize
-SKILL_ALIASES = {
-    "nodejs": "node.js",
-    "reactjs": "react.js",
-    "vuejs": "vue.js",
-    "nextjs": "next.js",
-    "expressjs": "express.js",
-    "dotnet": ".net",
-    "c plus plus": "c++",
-    "c sharp": "c#",
-    "csharp": "c#",
-}
+from services.skill_taxonomy import get_taxonomy
 
 
 def normalize_skill(skill: str) -> str:
     """
     Normalize a single skill string.
     
-    Steps:
-    1. Lowercase and strip whitespace
-    2. Handle special cases (C++, C#, .NET, etc.)
-    3. Map common aliases
-    4. Clean special characters (except for preserved skills)
+    Delegates to the taxonomy's canonicalization (aliases, preserved names
+    such as .NET, cleanup of special characters), so LLM output, rule-based
+    extraction and catalog data all end up with the same canonical names.
     """
-    # Basic normalization
-    skill = skill.lower().strip()
-    
-    # Check if it's a special skill that needs exact preservation
-    if skill in SPECIAL_SKILLS:
-        return SPECIAL_SKILLS[skill]
-    
-    # Check for aliases
-    if skill in SKILL_ALIASES:
-        return SKILL_ALIASES[skill]
-    
-    # Remove extra whitespace
-    skill = re.sub(r'\s+', ' ', skill)
-    
-    # Remove problematic characters but keep alphanumeric, spaces, dots, plus, hash
-    # Only apply if not a special case
-    skill = re.sub(r'[^\w\s\.\+#-]', '', skill)
-    
-    # Clean up any remaining issues
-    skill = skill.strip('.-')  # Remove leading/trailing dots or dashes
-    
-    return skill
+    return get_taxonomy().normalize(skill)
 
 
 def is_valid_skill(skill: str) -> bool:
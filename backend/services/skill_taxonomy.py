@@ -0,0 +1,210 @@
+import hashlib
+import json
+import logging
+import os
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Set
+
+from services.skill_matcher import SkillMatcher
+from services.skill_matrix import SkillVocabulary
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+# Taxonomy source (edited by hand) and its compiled artifact
+# (built by scripts/build_skill_taxonomy.py)
+TAXONOMY_FILE = os.getenv("SKILL_TAXONOMY_FILE", os.path.join(DATA_DIR, "skill_taxonomy.json"))
+COMPILED_TAXONOMY_FILE = os.getenv(
+    "SKILL_TAXONOMY_COMPILED_FILE", os.path.join(DATA_DIR, "skill_taxonomy.compiled.json")
+)
+
+ARTIFACT_VERSION = 2
+
+# Số chuỗi skill thô → dạng chuẩn được nhớ (mỗi taxonomy một cache)
+CANONICAL_CACHE_SIZE = int(os.getenv("SKILL_CANONICAL_CACHE_SIZE", "65536"))
+
+_WHITESPACE = re.compile(r"\s+")
+# Ký tự bị bỏ khỏi skill ngoài taxonomy (giữ chữ, số, khoảng trắng, . / + # -)
+_UNSAFE_CHARS = re.compile(r"[^\w\s./+#-]")
+
+
+def resolve_aliases(aliases: Dict[str, str]) -> Dict[str, str]:
+    """
+    Follow alias chains to their end (``c plus plus`` → ``c++`` → ``cpp``).
+
+    Raises:
+        ValueError: if the aliases form a cycle (``a`` → ``b`` → ``a``)
+    """
+    resolved = {}
+    for key in aliases:
+        seen = [key]
+        target = aliases[key]
+        while target in aliases:
+            if target in seen:
+                raise ValueError(f"Alias cycle: {' → '.join(seen + [target])}")
+            seen.append(target)
+            target = aliases[target]
+        resolved[key] = target
+    return resolved
+
+
+class SkillTaxonomy:
+    """
+    Skill categories, aliases and the compiled matcher, as one snapshot.
+
+    It is also the single canonicalization layer: ``normalize`` maps a raw
+    string (catalog data, rule extraction or LLM output) to its canonical
+    name, memoized in a bounded cache, and canonical names have dense ids in
+    ``vocab``. Taxonomy skills get ids ``0..len(all_skills) - 1`` in sorted
+    order, so the ids of a given taxonomy are stable; the catalog skill
+    indexes built on a taxonomy append their other skills, and nothing else
+    does, so the vocabulary stays bounded by the taxonomy plus the catalog.
+
+    The active snapshot is swapped as a whole by ``set_taxonomy``, so a
+    reader that takes ``get_taxonomy()`` once sees a consistent taxonomy.
+    """
+
+    def __init__(
+        self,
+        technical: Dict[str, list],
+        soft: Iterable[str],
+        methodologies: Iterable[str],
+        aliases: Dict[str, str],
+        preserve: Iterable[str],
+        source_hash: str,
+        matcher: Optional[SkillMatcher] = None
+    ):
+        self.technical_groups = {group: list(skills) for group, skills in technical.items()}
+        self.technical: frozenset = frozenset(s for skills in technical.values() for s in skills)
+        self.soft: frozenset = frozenset(soft)
+        self.methodologies: frozenset = frozenset(methodologies)
+        self.all_skills: frozenset = self.technical | self.soft | self.methodologies
+        self.aliases = resolve_aliases(aliases)
+        self.preserve: frozenset = frozenset(preserve)
+        self.source_hash = source_hash
+        self.matcher = matcher or SkillMatcher(self.all_skills)
+
+        self.normalize = lru_cache(maxsize=CANONICAL_CACHE_SIZE)(self._canonical)
+        self.vocab = SkillVocabulary(sorted({self._canonical(s) for s in self.all_skills}))
+
+    @classmethod
+    def from_source(cls, data: dict, source_hash: str) -> "SkillTaxonomy":
+        return cls(
+            data.get("technical", {}), data.get("soft", []), data.get("methodologies", []),
+            data.get("aliases", {}), data.get("preserve", []), source_hash
+        )
+
+    def to_artifact(self) -> dict:
+        return {
+            "version": ARTIFACT_VERSION,
+            "source_hash": self.source_hash,
+            "technical": self.technical_groups,
+            "soft": sorted(self.soft),
+            "methodologies": sorted(self.methodologies),
+            "aliases": self.aliases,
+            "preserve": sorted(self.preserve),
+            "matcher": self.matcher.to_dict()
+        }
+
+    @classmethod
+    def from_artifact(cls, data: dict) -> "SkillTaxonomy":
+        return cls(
+            data["technical"], data["soft"], data["methodologies"],
+            data["aliases"], data["preserve"], data["source_hash"], SkillMatcher.from_dict(data["matcher"])
+        )
+
+    def _canonical(self, skill: str) -> str:
+        """
+        Dạng chính thức của một skill (``normalize`` = bản có cache):
+        alias / skill trong taxonomy giữ nguyên, chuỗi lạ được bỏ ký tự rác.
+        """
+        key = _WHITESPACE.sub(" ", skill.lower().strip())
+        if key in self.aliases:
+            return self.aliases[key]
+        if key in self.all_skills or key in self.preserve:
+            return key
+        cleaned = _UNSAFE_CHARS.sub("", key).strip(".-").strip()
+        return self.aliases.get(cleaned, cleaned)
+
+    def normalize_list(self, skills: list) -> Set[str]:
+        """Chuẩn hóa danh sách skills thành set"""
+        normalized = (self.normalize(s) for s in skills if s and isinstance(s, str))
+        return {s for s in normalized if s}
+
+    def skill_id(self, skill: str) -> Optional[int]:
+        """Id của dạng chính thức của ``skill``, None nếu skill chưa có trong vocab."""
+        return self.vocab.ids.get(self.normalize(skill))
+
+    def stats(self) -> dict:
+        return {
+            "source_hash": self.source_hash[:12],
+            "technical_skills": len(self.technical),
+            "soft_skills": len(self.soft),
+            "methodologies": len(self.methodologies),
+            "total_skills": len(self.all_skills),
+            "aliases": len(self.aliases),
+            "interned_skills": len(self.vocab),
+            "canonical_cache": self.normalize.cache_info()._asdict()
+        }
+
+
+def _read_source(path: str):
+    with open(path, "rb") as f:
+        raw = f.read()
+    return json.loads(raw.decode("utf-8")), hashlib.sha256(raw).hexdigest()
+
+
+def compile_taxonomy(source_path: str = TAXONOMY_FILE, out_path: str = COMPILED_TAXONOMY_FILE) -> SkillTaxonomy:
+    """Compile the taxonomy source and write the artifact atomically (tmp + rename)."""
+    data, source_hash = _read_source(source_path)
+    taxonomy = SkillTaxonomy.from_source(data, source_hash)
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(taxonomy.to_artifact(), f, ensure_ascii=False)
+    os.replace(tmp_path, out_path)
+    logger.info(f"✅ Skill taxonomy compiled: {out_path} ({len(taxonomy.all_skills)} skills)")
+    return taxonomy
+
+
+def load_taxonomy(source_path: str = TAXONOMY_FILE, compiled_path: str = COMPILED_TAXONOMY_FILE) -> SkillTaxonomy:
+    """
+    Load the compiled artifact if it was built from the current source,
+    otherwise compile the source in memory.
+    """
+    data, source_hash = _read_source(source_path)
+    if os.path.exists(compiled_path):
+        try:
+            with open(compiled_path, encoding="utf-8") as f:
+                artifact = json.load(f)
+            if artifact.get("version") == ARTIFACT_VERSION and artifact.get("source_hash") == source_hash:
+                return SkillTaxonomy.from_artifact(artifact)
+            logger.warning(f"⚠️ {compiled_path} is stale, compiling {source_path}")
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"❌ Failed to load {compiled_path}: {e}")
+    return SkillTaxonomy.from_source(data, source_hash)
+
+
+_taxonomy = load_taxonomy()
+
+
+def get_taxonomy() -> SkillTaxonomy:
+    """The active taxonomy snapshot."""
+    return _taxonomy
+
+
+def set_taxonomy(taxonomy: SkillTaxonomy) -> None:
+    """Make ``taxonomy`` active (one reference assignment, atomic for readers)."""
+    global _taxonomy
+    _taxonomy = taxonomy
+
+
+def normalize_skill(skill: str) -> str:
+    """Chuẩn hóa skill về dạng chính thức"""
+    return _taxonomy.normalize(skill)
+
+
+def normalize_skill_list(skills: list) -> set:
+    """Chuẩn hóa danh sách skills thành set"""
+    return _taxonomy.normalize_list(skills)
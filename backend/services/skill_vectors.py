@@ -0,0 +1,55 @@
+import logging
+from typing import Callable, Iterable, List, Optional
+
+import numpy as np
+
+from services.embedding_store import EmbeddingStore
+
+logger = logging.getLogger(__name__)
+
+
+def compose_skill_set_vector(
+    table: EmbeddingStore,
+    skills: Iterable[str],
+    encode_oov: Optional[Callable[[List[str]], np.ndarray]] = None
+) -> Optional[np.ndarray]:
+    """
+    Build a skill-set vector by mean-pooling per-skill embeddings.
+
+    Skills found in the table are read from its matrix; out-of-vocabulary
+    skills are passed to ``encode_oov`` (expected to return one normalized
+    row per skill) or dropped when no encoder is given.
+
+    Args:
+        table: Per-skill embedding table keyed by canonical skill
+        skills: Canonical skill strings
+        encode_oov: Optional fallback encoder for unknown skills
+
+    Returns:
+        L2-normalized pooled vector, or None if no skill could be embedded
+    """
+    rows = []
+    oov = []
+    for skill in skills:
+        row = table.row_of(skill)
+        if row is None:
+            oov.append(skill)
+        else:
+            rows.append(row)
+
+    parts = []
+    if rows:
+        parts.append(np.asarray(table.matrix[rows], dtype=np.float32))
+    if oov and encode_oov is not None:
+        parts.append(np.asarray(encode_oov(oov), dtype=np.float32).reshape(len(oov), -1))
+    elif oov:
+        logger.debug(f"Skipping {len(oov)} out-of-vocabulary skills: {oov}")
+
+    if not parts:
+        return None
+
+    pooled = np.vstack(parts).mean(axis=0)
+    norm = np.linalg.norm(pooled)
+    if norm == 0:
+        return None
+    return pooled / norm
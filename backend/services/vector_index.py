@@ -0,0 +1,394 @@
+import glob
+import logging
+import os
+import re
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from services.embedding_manifest import matches_source, write_source_stamp
+from services.reduced_index import (
+    DEFAULT_CANDIDATES, DEFAULT_DIMS, ReducedIndex, build_reduced_index,
+    load_reduced_index, reduced_index_path, top_k_indices, two_stage_search
+)
+
+logger = logging.getLogger(__name__)
+
+# "auto" = the first of AUTO_ORDER whose file is usable, exact otherwise
+INDEX_KINDS = ("auto", "exact", "pca", "ivf", "hnsw")
+AUTO_ORDER = ("hnsw", "ivf", "pca")
+
+DEFAULT_NPROBE = 8
+DEFAULT_KMEANS_ITERS = 20
+KMEANS_SAMPLE_PER_LIST = 256
+DEFAULT_HNSW_M = 16
+DEFAULT_HNSW_EF_CONSTRUCTION = 200
+DEFAULT_HNSW_EF = 64
+# HNSW với filter: khi ít hơn tỉ lệ này số row qua filter, quét thẳng các row đó
+HNSW_FILTER_EXACT_RATIO = 0.1
+
+
+def index_path(emb_path: str, kind: str, dims: int = DEFAULT_DIMS) -> str:
+    """``course_embeddings.npy`` → ``course_embeddings.ivf.npz`` / ``.hnsw.bin`` / ``.pca256.npz``"""
+    if kind == "pca":
+        return reduced_index_path(emb_path, dims)
+    base = emb_path[:-4] if emb_path.endswith(".npy") else emb_path
+    return f"{base}.hnsw.bin" if kind == "hnsw" else f"{base}.{kind}.npz"
+
+
+def _as_float32(rows) -> np.ndarray:
+    return np.asarray(rows, dtype=np.float32)
+
+
+class VectorIndex(ABC):
+    """
+    Top-k inner-product search over the rows of an embedding matrix.
+
+    ``search`` returns (row indices, scores), best first. Scores are inner
+    products, i.e. cosine similarity for the normalized bge-m3 vectors.
+
+    ``mask`` (boolean, one entry per row) restricts the search to the rows
+    it allows. It is applied before top-k, so ``min(k, mask.sum())`` rows
+    are returned.
+    """
+
+    kind = "base"
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+
+    def __len__(self) -> int:
+        return len(self.matrix)
+
+    @abstractmethod
+    def search(self, query: np.ndarray, k: int, mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-``k`` rows for ``query`` among the rows ``mask`` allows."""
+
+    def _search_rows(self, query: np.ndarray, k: int, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact top-k among ``rows`` only."""
+        exact = _as_float32(self.matrix[rows]) @ _as_float32(query).reshape(-1)
+        top = top_k_indices(exact, k)
+        return rows[top], exact[top]
+
+    def describe(self) -> str:
+        return self.kind
+
+
+class ExactIndex(VectorIndex):
+    """One matrix-vector product over every row, then ``argpartition``."""
+
+    kind = "exact"
+
+    def search(self, query, k, mask=None):
+        query = _as_float32(query).reshape(-1)
+        if hasattr(self.matrix, "scores"):
+            scores = self.matrix.scores(query)
+        else:
+            scores = self.matrix @ query
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+            k = min(k, int(np.count_nonzero(mask)))
+        rows = top_k_indices(scores, k)
+        return rows, scores[rows]
+
+
+class PCAIndex(VectorIndex):
+    """Scan a PCA projection, rerank the best ``candidates`` exactly."""
+
+    kind = "pca"
+
+    def __init__(self, matrix, reduced: ReducedIndex, candidates: int = DEFAULT_CANDIDATES):
+        super().__init__(matrix)
+        self.reduced = reduced
+        self.candidates = candidates
+
+    def search(self, query, k, mask=None):
+        return two_stage_search(query, self.matrix, self.reduced, k, self.candidates, mask)
+
+    def describe(self):
+        return f"pca{self.reduced.dims}+rerank"
+
+
+class IVFIndex(VectorIndex):
+    """
+    Inverted-file index: rows are bucketed by their nearest k-means centroid.
+
+    A query scores the centroids, scans the rows of the ``nprobe`` best
+    buckets (more if they hold fewer than ``k`` rows) and ranks them exactly
+    against the full matrix. Buckets are stored CSR-style: ``rows`` sorted by
+    bucket, bucket ``i`` spanning ``rows[offsets[i]:offsets[i + 1]]``.
+    """
+
+    kind = "ivf"
+
+    def __init__(self, matrix, centroids: np.ndarray, offsets: np.ndarray, rows: np.ndarray, nprobe: int = DEFAULT_NPROBE):
+        super().__init__(matrix)
+        self.centroids = _as_float32(centroids)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.nprobe = nprobe
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, matrix, nlist: Optional[int] = None, iters: int = DEFAULT_KMEANS_ITERS, seed: int = 0) -> "IVFIndex":
+        """Spherical k-means on a sample of rows, then assign every row."""
+        full = _as_float32(matrix[:])
+        n = len(full)
+        nlist = max(1, min(nlist or int(np.sqrt(n)), n))
+        rng = np.random.default_rng(seed)
+
+        sample_size = min(n, nlist * KMEANS_SAMPLE_PER_LIST)
+        sample = full[rng.choice(n, sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+        for _ in range(iters):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            # Bucket rỗng → lấy lại một điểm ngẫu nhiên làm tâm
+            sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+            norms[empty] = 1.0
+            centroids = sums / norms
+
+        assign = np.concatenate([
+            np.argmax(full[s:s + 8192] @ centroids.T, axis=1)
+            for s in range(0, n, 8192)
+        ])
+        rows = np.argsort(assign, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=nlist))])
+        return cls(matrix, centroids, offsets, rows)
+
+    def search(self, query, k, mask=None):
+        query = _as_float32(query).reshape(-1)
+        order = np.argsort(-(self.centroids @ query))
+        if mask is None:
+            sizes = np.diff(self.offsets)[order]
+            available = len(self)
+        else:
+            # Số row qua filter trong từng bucket → probe thêm bucket tới khi đủ k
+            allowed = np.concatenate([[0], np.cumsum(mask[self.rows])])
+            sizes = (allowed[self.offsets[1:]] - allowed[self.offsets[:-1]])[order]
+            available = int(allowed[-1])
+        probe = max(self.nprobe, int(np.searchsorted(np.cumsum(sizes), min(k, available)) + 1))
+        candidates = np.sort(np.concatenate([
+            self.rows[self.offsets[b]:self.offsets[b + 1]] for b in order[:probe]
+        ]))  # sequential reads on mmap
+        if mask is not None:
+            candidates = candidates[mask[candidates]]
+        exact = _as_float32(self.matrix[candidates]) @ query
+        top = top_k_indices(exact, k)
+        return candidates[top], exact[top]
+
+    def save(self, path: str) -> None:
+        np.savez(path, centroids=self.centroids, offsets=self.offsets, rows=self.rows)
+
+    @classmethod
+    def load(cls, path: str, matrix, nprobe: int = DEFAULT_NPROBE) -> "IVFIndex":
+        with np.load(path) as data:
+            return cls(matrix, data["centroids"], data["offsets"], data["rows"], nprobe)
+
+    def describe(self):
+        return f"ivf{self.nlist}/nprobe{self.nprobe}"
+
+
+class HNSWIndex(VectorIndex):
+    """Hierarchical navigable small-world graph (requires ``hnswlib``)."""
+
+    kind = "hnsw"
+
+    def __init__(self, matrix, graph, ef: int = DEFAULT_HNSW_EF):
+        super().__init__(matrix)
+        self.graph = graph
+        self.ef = ef
+        graph.set_ef(ef)
+
+    @classmethod
+    def build(cls, matrix, m: int = DEFAULT_HNSW_M, ef_construction: int = DEFAULT_HNSW_EF_CONSTRUCTION) -> "HNSWIndex":
+        import hnswlib
+
+        full = _as_float32(matrix[:])
+        graph = hnswlib.Index(space="ip", dim=full.shape[1])
+        graph.init_index(max_elements=len(full), M=m, ef_construction=ef_construction)
+        graph.add_items(full, np.arange(len(full)))
+        return cls(matrix, graph)
+
+    def search(self, query, k, mask=None):
+        available = len(self) if mask is None else int(np.count_nonzero(mask))
+        k = min(k, available)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if mask is not None and available < HNSW_FILTER_EXACT_RATIO * len(self):
+            # Filter rất chọn lọc: duyệt graph sẽ phải bỏ qua gần hết node
+            return self._search_rows(query, k, np.flatnonzero(mask))
+        if self.ef < k:
+            self.graph.set_ef(k)
+        try:
+            labels, distances = self.graph.knn_query(
+                _as_float32(query).reshape(1, -1), k=k,
+                filter=None if mask is None else (lambda label: bool(mask[label]))
+            )
+        except RuntimeError:
+            # hnswlib không tìm đủ k row qua filter
+            if mask is None:
+                raise
+            return self._search_rows(query, k, np.flatnonzero(mask))
+        # space="ip": distance = 1 - inner product
+        return labels[0].astype(np.int64), (1.0 - distances[0]).astype(np.float32)
+
+    def save(self, path: str) -> None:
+        self.graph.save_index(path)
+
+    @classmethod
+    def load(cls, path: str, matrix, ef: int = DEFAULT_HNSW_EF) -> "HNSWIndex":
+        import hnswlib
+
+        graph = hnswlib.Index(space="ip", dim=matrix.shape[1])
+        graph.load_index(path, max_elements=len(matrix))
+        return cls(matrix, graph, ef)
+
+    def describe(self):
+        return f"hnsw/ef{self.ef}"
+
+
+def build_vector_index(emb_path: str, kind: str, source_hash: Optional[str] = None, **params) -> str:
+    """
+    Build an index of an embedding matrix and save it next to the ``.npy``,
+    stamped with the manifest hash ``source_hash`` of the matrix.
+
+    Returns:
+        Path of the saved index
+    """
+    if kind == "pca":
+        return build_reduced_index(emb_path, params.get("dims", DEFAULT_DIMS), source_hash)
+
+    matrix = np.load(emb_path, mmap_mode="r")
+    path = index_path(emb_path, kind)
+    if kind == "ivf":
+        IVFIndex.build(matrix, nlist=params.get("nlist")).save(path)
+    elif kind == "hnsw":
+        HNSWIndex.build(matrix, m=params.get("m", DEFAULT_HNSW_M)).save(path)
+    else:
+        raise ValueError(f"Unknown vector index: {kind}")
+    write_source_stamp(path, source_hash)
+    logger.info(f"✅ Vector index saved: {path}")
+    return path
+
+
+def refresh_vector_indexes(
+    emb_path: str,
+    source_hash: Optional[str],
+    pca_dims: Optional[int] = None,
+    ann_kind: Optional[str] = None
+) -> List[str]:
+    """
+    Rebuild the index files of ``emb_path`` built from another version of the
+    matrix (called by the build scripts after encoding): every existing IVF,
+    HNSW and PCA file, plus the PCA index at ``pca_dims`` and the ``ann_kind``
+    ("ivf" | "hnsw") index if requested, built when missing.
+
+    Returns:
+        Paths of the indexes written
+    """
+    base = emb_path[:-4] if emb_path.endswith(".npy") else emb_path
+    targets = {("pca", pca_dims)} if pca_dims else set()
+    if ann_kind:
+        targets.add((ann_kind, None))
+    for path in glob.glob(glob.escape(base) + ".pca*.npz"):
+        found = re.fullmatch(r"\.pca(\d+)\.npz", path[len(base):])
+        if found:
+            targets.add(("pca", int(found.group(1))))
+    for kind in ("ivf", "hnsw"):
+        if os.path.exists(index_path(emb_path, kind)):
+            targets.add((kind, None))
+
+    written = []
+    for kind, dims in sorted(targets, key=lambda t: (t[0], t[1] or 0)):
+        path = index_path(emb_path, kind, dims or DEFAULT_DIMS)
+        if os.path.exists(path) and matches_source(path, source_hash):
+            continue
+        try:
+            written.append(build_vector_index(emb_path, kind, source_hash, dims=dims or DEFAULT_DIMS))
+        except ImportError:
+            logger.warning(f"⚠️ Cannot rebuild {path}: {kind} index needs hnswlib (pip install hnswlib)")
+    return written
+
+
+def load_vector_index(
+    emb_path: str,
+    matrix,
+    kind: str = "auto",
+    dims: int = DEFAULT_DIMS,
+    candidates: int = DEFAULT_CANDIDATES,
+    nprobe: int = DEFAULT_NPROBE,
+    ef: int = DEFAULT_HNSW_EF,
+    source_hash: Optional[str] = None
+) -> Optional[VectorIndex]:
+    """
+    Open the configured index over ``matrix``.
+
+    Falls back to ``ExactIndex`` when the index file is missing, was built
+    from another version of the matrix than the one ``source_hash`` (its
+    manifest hash) identifies or for a different row count, or its backend
+    is not installed.
+
+    Returns:
+        The index, or None if there is no matrix
+    """
+    if matrix is None:
+        return None
+    kind = kind.lower()
+    if kind not in INDEX_KINDS:
+        raise ValueError(f"Unknown vector index: {kind} (expected one of {INDEX_KINDS})")
+
+    for candidate in (AUTO_ORDER if kind == "auto" else (kind,)):
+        if candidate == "pca":
+            reduced = load_reduced_index(emb_path, len(matrix), dims, source_hash)
+            if reduced is not None:
+                return PCAIndex(matrix, reduced, candidates)
+        elif candidate in ("ivf", "hnsw"):
+            index = _load_ann_index(emb_path, matrix, candidate, nprobe, ef, source_hash)
+            if index is not None:
+                return index
+
+    # Không có index dùng được → quét toàn bộ matrix mỗi query (O(rows × dim))
+    if kind == "exact":
+        logger.info(f"Vector search for {emb_path}: exact ({len(matrix)} rows)")
+    else:
+        logger.warning(
+            f"⚠️ No usable {'ANN/PCA' if kind == 'auto' else kind} index for {emb_path}, "
+            f"using exact search over {len(matrix)} rows "
+            "(build one with scripts/embed.py or scripts/build_vector_index.py)"
+        )
+    return ExactIndex(matrix)
+
+
+def _load_ann_index(emb_path: str, matrix, kind: str, nprobe: int, ef: int,
+                    source_hash: Optional[str]) -> Optional[VectorIndex]:
+    """The IVF / HNSW index file of ``emb_path`` if it is usable for ``matrix``."""
+    path = index_path(emb_path, kind)
+    if not os.path.exists(path):
+        return None
+    if not matches_source(path, source_hash):
+        logger.warning(f"⚠️ Ignoring {path}: built from another version of {emb_path}")
+        return None
+    try:
+        if kind == "ivf":
+            index = IVFIndex.load(path, matrix, nprobe)
+            valid = index.offsets[-1] == len(matrix)
+        else:
+            index = HNSWIndex.load(path, matrix, ef)
+            valid = index.graph.get_current_count() == len(matrix)
+        if valid:
+            logger.info(f"✅ Vector index loaded: {path} ({index.describe()})")
+            return index
+        logger.warning(f"⚠️ Ignoring {path}: built for a different row count")
+    except ImportError:
+        logger.warning(f"⚠️ {kind} index needs hnswlib (pip install hnswlib)")
+    except Exception as e:
+        logger.error(f"❌ Failed to load vector index {path}: {e}")
+    return None